@@ -0,0 +1,167 @@
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Callable, Dict, NamedTuple, Optional
+
+
+class Rejection(NamedTuple):
+    status: int  # 429 for rate limits, 503 for full queues or overload
+    reason: str
+    retry_after: int  # seconds
+
+    def to_dict(self):
+        return {'error': self.reason, 'retryAfter': self.retry_after}
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now) -> float:
+        """Consume a token; return 0 on success or the seconds until one is available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateMeter:
+    """Event counts over a sliding window of one-second buckets"""
+
+    def __init__(self, window_seconds=60):
+        self.window = window_seconds
+        self._buckets = deque()  # [second, count]
+
+    def add(self, now, count=1):
+        second = int(now)
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([second, count])
+        self._expire(second)
+
+    def _expire(self, second):
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+    def per_minute(self, now) -> float:
+        self._expire(int(now))
+        return sum(count for _, count in self._buckets) * 60.0 / self.window
+
+
+class AdmissionController:
+    """Admission control for queue writes.
+
+    Requests are checked, cheapest first, against an in-flight limit, per-client
+    and per-user token buckets, and the queue cap for their service type and
+    location. Rejections carry a Retry-After estimate so clients back off
+    instead of piling onto a saturated queue.
+    """
+
+    def __init__(self, cap_loader: Callable[[], int], cap_ttl=30,
+                 client_rate=None, client_burst=None, user_rate=None, user_burst=None,
+                 max_inflight=None, max_buckets=10000):
+        # Rates are configured per minute and stored per second
+        self.client_rate = float(client_rate or os.getenv('ADMISSION_CLIENT_RATE', 30)) / 60
+        self.client_burst = float(client_burst or os.getenv('ADMISSION_CLIENT_BURST', 10))
+        self.user_rate = float(user_rate or os.getenv('ADMISSION_USER_RATE', 6)) / 60
+        self.user_burst = float(user_burst or os.getenv('ADMISSION_USER_BURST', 10))
+        self.max_inflight = int(max_inflight or os.getenv('ADMISSION_MAX_INFLIGHT', 64))
+        self.max_buckets = max_buckets
+
+        self._cap_loader = cap_loader
+        self._cap_ttl = cap_ttl
+        self._cap = None
+        self._cap_loaded_at = 0.0
+
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict = OrderedDict()  # key -> TokenBucket, least recently used first
+        self._inflight = 0
+        self.admitted = RateMeter()
+        self.rejected = RateMeter()
+        self.rejections_by_reason = Counter()
+
+    def queue_cap(self, service_config: Optional[Dict] = None) -> int:
+        """Queue cap for one service type: its own override or AdminSettings.max_queue_size"""
+        if service_config and service_config.get('max_queue_size'):
+            return service_config['max_queue_size']
+        now = time.monotonic()
+        if self._cap is None or now - self._cap_loaded_at > self._cap_ttl:
+            self._cap = self._cap_loader()
+            self._cap_loaded_at = now
+        return self._cap
+
+    def _bucket(self, key, rate, burst, now) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _reject(self, now, status, reason, retry_after) -> Rejection:
+        self.rejected.add(now)
+        self.rejections_by_reason[reason] += 1
+        return Rejection(status, reason, max(1, int(math.ceil(retry_after))))
+
+    def check(self, client_key, user_key, waiting, seated, cap, average_service_time) -> Optional[Rejection]:
+        """Return a Rejection, or None when the request is admitted.
+
+        Admitted requests count as in flight until release() is called.
+        waiting and seated are the current counts for the request's service
+        type and location queue. average_service_time is in minutes.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                return self._reject(now, 503, 'Server is busy, please retry shortly', 1)
+
+            client_wait = self._bucket(('client', client_key), self.client_rate, self.client_burst, now).take(now)
+            if client_wait:
+                return self._reject(now, 429, 'Too many requests from this client', client_wait)
+            if user_key:
+                user_wait = self._bucket(('user', user_key), self.user_rate, self.user_burst, now).take(now)
+                if user_wait:
+                    return self._reject(now, 429, 'Too many requests for this user', user_wait)
+
+            if waiting >= cap:
+                # One party leaves the queue roughly every service time spread over the parties being served
+                overflow = waiting - cap + 1
+                retry_after = overflow * average_service_time * 60 / max(1, seated)
+                return self._reject(now, 503, 'Queue is full', retry_after)
+
+            self.admitted.add(now)
+            self._inflight += 1
+            return None
+
+    def release(self):
+        """Mark an admitted request as finished"""
+        with self._lock:
+            self._inflight -= 1
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'admittedPerMinute': self.admitted.per_minute(now),
+                'rejectedPerMinute': self.rejected.per_minute(now),
+                'rejectionsByReason': dict(self.rejections_by_reason),
+                'inflight': self._inflight,
+                'maxInflight': self.max_inflight,
+                'trackedClients': len(self._buckets),
+                'maxQueueSize': self._cap
+            }
@@ -1,7 +1,7 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, make_response, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_socketio import SocketIO, emit
-from sklearn.ensemble import RandomForestRegressor
 import pandas as pd
 import numpy as np
 import os
@@ -9,14 +9,32 @@ from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import jwt
 from functools import wraps
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
-from models import db, User, AdminSettings, Reservation, QueueManager
-from utils import queue_manager
+from models import db, User, AdminSettings, Reservation, DEFAULT_VENUE
+from db_config import init_database, upgrade_schema
+from queue_engine import queue_engine, configured_venues, owns_venue, worker_for_venue
+from admission import AdmissionController
+from fast_json import json_response
+from forecasting import Forecaster, SLOT_MINUTES, SLOTS_PER_DAY
+from features import WaitTimeModel, SERVICE_TYPES
+from queueing import QueueingEstimator
+from retention import RollingStats, resident_bytes, peak_resident_bytes
+from services import services, location_capacity
+from bookings import SLOT_MINUTES as BOOKING_SLOT_MINUTES, VENUE_TIMEZONE, slots_for, align, as_utc, opening_window, to_utc
+from eta_engine import NEXT_IN_LINE
+from notifications import notification_service
+import queue_reads
+import routing
+from response_cache import ResponseCache
+import dashboard
+import reports
+import reservation_events
 import json
 from io import StringIO
 import uuid
-import random
+import hmac
+import hashlib
 
 # Load environment variables
 load_dotenv()
@@ -24,9 +42,12 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Reverse proxies in front of the app, each appending one X-Forwarded-For hop.
+# With 0 the header is ignored, since clients can send any value in it.
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
 
 # JWT configuration
@@ -38,31 +59,88 @@ app.config['JWT_HEADER_TYPE'] = 'Bearer'
 # Initialize JWT
 jwt = JWTManager(app)
 
-# Initialize database
-db.init_app(app)
+# Initialize database with the engine profile for DATABASE_URL
+init_database(app, db)
 
 # Configure CORS - Allow all origins during development
 CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:5173"],
          "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "X-Session-ID"],
-        "expose_headers": ["Content-Type", "X-Session-ID"]
+        "allow_headers": ["Content-Type", "X-Session-ID", "X-Venue", "X-Booking-Token"],
+        "expose_headers": ["Content-Type", "X-Session-ID", "ETag", "X-Queue-Version", "X-Venue-Worker", "Retry-After"]
     }
 })
 
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept,X-Session-ID')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept,X-Session-ID,X-Venue,X-Booking-Token')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+def request_venue():
+    """Venue shard for the current request: ?venue=, X-Venue header, JSON body, or the default"""
+    venue = request.args.get('venue') or request.headers.get('X-Venue')
+    if not venue and request.is_json:
+        venue = (request.get_json(silent=True) or {}).get('venue')
+    return venue or DEFAULT_VENUE
+
+@app.before_request
+def route_venue_shard():
+    """Reject requests for unknown venues and for venue shards pinned to another worker process"""
+    if not request.path.startswith('/api/') or request.method == 'OPTIONS':
+        return None
+    venue = request_venue()
+    if venue not in configured_venues():
+        return jsonify({'error': f'Unknown venue {venue}'}), 404
+    g.venue = venue
+    if not owns_venue(g.venue):
+        response = jsonify({'error': f'Venue {g.venue} is served by another worker'})
+        response.headers['X-Venue-Worker'] = str(worker_for_venue(g.venue))
+        return response, 421
+    return None
+
 socketio = SocketIO(app, cors_allowed_origins=["http://localhost:5174"])
 
+def publish_queue_events(venue, events):
+    """Push ETA changes and threshold crossings from a queue shard to clients.
+
+    Next-in-line notifications are sent from a background task so a slow
+    mail or SMS provider never holds up the queue write that crossed the threshold.
+    """
+    for name, payload in events:
+        socketio.emit(name, {**payload, 'venue': venue})
+        if name == 'queue_threshold' and payload['threshold'] == NEXT_IN_LINE:
+            entry = queue_engine.shard(venue).get(payload['entryId'])
+            if entry and entry['service_type'] in services:
+                socketio.start_background_task(notification_service.send_next_in_line, entry)
+
+queue_engine.subscribe(publish_queue_events)
+
+@app.before_request
+def promote_due_bookings():
+    """Move advance bookings that are about to start into the live queue"""
+    venue = getattr(g, 'venue', None)
+    if venue is None:
+        return None
+    try:
+        for entry in queue_engine.shard(venue).promote_due():
+            socketio.emit('new_reservation', {
+                'id': entry['id'],
+                'name': entry['name'],
+                'party_size': entry['party_size'],
+                'service_type': entry['service_type'],
+                'status': entry['status'],
+                'created_at': entry['created_at'],
+                'queue_position': entry['queue_position']
+            })
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error promoting bookings: {str(e)}")
+    return None
+
 # In-memory storage
-queue_data = []
-queue_counter = 0
 users = {
     'admin@example.com': {
         'password': 'admin123',
@@ -76,37 +154,71 @@ users = {
     }
 }
 
-# Service types and their configurations
-services = {
-    'dine-in': {
-        'name': 'Dine-in',
-        'max_party_size': 20,
-        'average_service_time': 45,  # minutes
-        'locations': ['Main Dining', 'Outdoor', 'Private Room']
-    },
-    'takeout': {
-        'name': 'Takeout',
-        'max_party_size': 1,
-        'average_service_time': 15,
-        'locations': ['Takeout Counter']
-    },
-    'delivery': {
-        'name': 'Delivery',
-        'max_party_size': 1,
-        'average_service_time': 30,
-        'locations': ['Delivery Station']
-    }
-}
+def load_max_queue_size():
+    settings = AdminSettings.query.first()
+    return settings.max_queue_size if settings and settings.max_queue_size else 50
 
-# Analytics data
-analytics = {
-    'daily_stats': defaultdict(lambda: {
-        'total_customers': 0,
-        'average_wait_time': 0,
-        'service_type_distribution': defaultdict(int)
-    }),
-    'hourly_stats': defaultdict(lambda: defaultdict(int))
-}
+admission_controller = AdmissionController(load_max_queue_size)
+
+# Initialize arrival forecasts, rebuilt daily from reservation history
+forecaster = Forecaster(services, app)
+
+# Bounded pool for the admin dashboard's concurrent sub-queries; each task
+# opens its own app context, so it gets its own session and connection
+dashboard_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv('DASHBOARD_WORKERS', 4)), thread_name_prefix='dashboard'
+)
+
+# Rendered responses of the polling endpoints, shared by concurrent requests
+response_cache = ResponseCache()
+
+# Background report jobs; chunks are aggregated in a pool of worker processes
+report_jobs = reports.ReportJobs(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Location value that asks check-in and reservations to pick the fastest location
+AUTO_LOCATION = 'auto'
+
+def admit_queue_write(service_type, location, user_key=None):
+    """Run admission control for a queue write; return an error response when rejected.
+
+    user_key must come from an authenticated identity, not the request body.
+    """
+    shard = queue_engine.shard(g.venue)
+    service_config = services.get(service_type, {})
+    rejection = admission_controller.check(
+        client_key=request.remote_addr,
+        user_key=user_key,
+        waiting=shard.count('waiting', service_type, location),
+        seated=shard.count('seated', service_type, location),
+        cap=admission_controller.queue_cap(service_config),
+        average_service_time=service_config.get('average_service_time', 15)
+    )
+    if rejection:
+        response = jsonify(rejection.to_dict())
+        response.headers['Retry-After'] = str(rejection.retry_after)
+        return response, rejection.status
+    g.admitted = True
+    return None
+
+def route_party(service_type, party_size, location, auto_route=False):
+    """Projected waits at every location that can take the party, and the location it joins.
+
+    With auto_route, or location 'auto', the party goes to the location with
+    the shortest projected wait; the location is None when none can seat it.
+    """
+    waits = queue_engine.shard(g.venue).location_waits(service_type, party_size)
+    if auto_route or location == AUTO_LOCATION:
+        best = routing.fastest(waits)
+        location = best['location'] if best else None
+    return waits, location
+
+@app.teardown_request
+def release_admission(exc):
+    if g.pop('admitted', False):
+        admission_controller.release()
+
+# Check-in analytics, kept per hour for the last ANALYTICS_RETENTION_DAYS
+checkin_stats = RollingStats()
 
 # Token verification decorator
 def token_required(f):
@@ -137,46 +249,85 @@ def admin_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
-# Load and prepare the model
-def load_model():
+# Closed-form M/M/c estimates per service type; the wait time model's
+# default until it has real history to train on
+queueing_model = QueueingEstimator(services)
+
+def queueing_wait(queue_length, party_size, service_type, when=None):
+    return queueing_model.predict_one(queue_length, party_size, service_type, when, venue=g.venue)
+
+# Initialize the wait time model, trained from finished reservations
+wait_model = WaitTimeModel(fallback=queueing_wait)
+
+def record_finished(entry):
+    """Add a reservation that just finished to the wait time model's training data"""
     try:
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        # Train with dummy data
-        X = np.array([[1, 2, 0], [2, 3, 1], [3, 4, 2]])
-        y = np.array([10, 15, 20])
-        model.fit(X, y)
-        return model
+        wait_model.observe(entry)
     except Exception as e:
-        print(f"Error loading model: {str(e)}")
-        return None
-
-model = load_model()
+        print(f"Error recording wait time: {str(e)}")
 
 def update_analytics(service_type, wait_time):
-    now = datetime.now()
-    date_key = now.strftime('%Y-%m-%d')
-    hour_key = now.hour
-    
-    # Update daily stats
-    analytics['daily_stats'][date_key]['total_customers'] += 1
-    analytics['daily_stats'][date_key]['service_type_distribution'][service_type] += 1
-    
-    # Update hourly stats
-    analytics['hourly_stats'][date_key][hour_key] += 1
-    
-    # Calculate new average wait time
-    total_wait_time = analytics['daily_stats'][date_key]['average_wait_time'] * (analytics['daily_stats'][date_key]['total_customers'] - 1)
-    total_wait_time += wait_time
-    analytics['daily_stats'][date_key]['average_wait_time'] = total_wait_time / analytics['daily_stats'][date_key]['total_customers']
+    checkin_stats.record(service_type, wait_time)
+
+def with_queue_version(response, token):
+    """Tag a queue response with its version token so clients can poll conditionally"""
+    response.headers['ETag'] = f'"q{token}"'
+    response.headers['X-Queue-Version'] = token
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def queue_not_modified(change_log, version):
+    """Return a 304 response when the client already holds this queue version"""
+    token = change_log.token(version)
+    if request.args.get('since') == token or request.headers.get('If-None-Match') == f'"q{token}"':
+        return with_queue_version(make_response('', 304), token)
+    return None
+
+def versioned_queue_response(change_log, version, load_entries, snapshot):
+    """Answer a queue poll with a 304, a delta since ?since=, or a snapshot.
+
+    Without ?since= the legacy full payload is returned unchanged. A client
+    that is too far behind the change log, or holds a token from before a
+    restart, gets a full snapshot instead.
+    """
+    not_modified = queue_not_modified(change_log, version)
+    if not_modified:
+        return not_modified
 
-# Store active admin sessions
+    token = change_log.token(version)
+    since = request.args.get('since')
+    if since is None:
+        return with_queue_version(json_response(snapshot()), token)
+
+    since = change_log.version_of(since)
+    delta = change_log.delta(since, load_entries) if since is not None else None
+    if delta is None:
+        delta = {'version': token, 'full': True, 'entries': snapshot()}
+    return with_queue_version(json_response(delta), delta['version'])
+
+# Store active admin sessions; idle ones are dropped at the next login
 admin_sessions = {}
+ADMIN_SESSION_IDLE = timedelta(hours=float(os.getenv('ADMIN_SESSION_IDLE_HOURS', 12)))
+
+def expire_admin_sessions(now):
+    for session_id, session in list(admin_sessions.items()):
+        if now - session['last_active'] > ADMIN_SESSION_IDLE:
+            admin_sessions.pop(session_id, None)
+
+def admin_session():
+    """The request's live admin session (X-Session-ID), marked active; None if there is none"""
+    session_id = request.headers.get('X-Session-ID')
+    session = admin_sessions.get(session_id) if session_id else None
+    now = datetime.utcnow()
+    if not session or now - session['last_active'] > ADMIN_SESSION_IDLE:
+        return None
+    session['last_active'] = now
+    return session
 
 def require_admin(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        session_id = request.headers.get('X-Session-ID')
-        if not session_id or session_id not in admin_sessions:
+        if admin_session() is None:
             return jsonify({"error": "Unauthorized"}), 401
         return f(*args, **kwargs)
     return decorated_function
@@ -190,6 +341,7 @@ def admin_login():
         return jsonify({"error": "Password is required"}), 400
         
     if password == 'admin123':  # In production, use proper password hashing
+        expire_admin_sessions(datetime.utcnow())
         session_id = str(uuid.uuid4())
         admin_sessions[session_id] = {
             'created_at': datetime.utcnow(),
@@ -224,45 +376,55 @@ def create_reservation():
         except ValueError:
             return jsonify({'error': 'Party size must be a number'}), 400
         
-        # Validate party size limits
+        # Validate service type, location and party size limits
+        service_type = data['service_type']
+        if service_type not in services:
+            return jsonify({'error': 'Invalid service type'}), 400
+        
+        location = data.get('location', services[service_type]['locations'][0])
+        auto_route = data.get('auto_route', False) or location == AUTO_LOCATION
+        if not auto_route and location not in services[service_type]['locations']:
+            return jsonify({'error': 'Invalid location for service type'}), 400
+        
         max_party_sizes = {
             'dine-in': 20,
             'takeout': 10,
             'delivery': 10
         }
         
-        if party_size > max_party_sizes.get(data['service_type'], 20):
-            return jsonify({'error': f'Party size exceeds maximum for {data["service_type"]}'}), 400
+        if party_size > max_party_sizes[service_type]:
+            return jsonify({'error': f'Party size exceeds maximum for {service_type}'}), 400
+        
+        location_waits, location = route_party(service_type, party_size, location, auto_route)
+        if location is None:
+            return jsonify({'error': 'No location can seat this party'}), 400
+
+        # Anonymous writes are limited per client address only; a phone number
+        # is client-supplied, so a per-user bucket keyed on it is trivially bypassed
+        rejected = admit_queue_write(service_type, location)
+        if rejected:
+            return rejected
         
-        # Create new reservation
-        new_reservation = Reservation(
+        # Create new reservation through the queue engine
+        new_reservation = queue_engine.enqueue(
+            venue=g.venue,
             name=data['name'],
             phone=data['phone'],
             email=data.get('email', ''),
             party_size=party_size,
-            service_type=data['service_type'],
-            location=data.get('location', 'Main Dining'),
-            status='waiting',
-            created_at=datetime.utcnow()
+            service_type=service_type,
+            location=location
         )
-        
-        db.session.add(new_reservation)
-        db.session.commit()
-        
-        # Calculate queue position
-        queue_position = Reservation.query.filter(
-            Reservation.status == 'waiting',
-            Reservation.created_at <= new_reservation.created_at
-        ).count()
+        queue_position = new_reservation['queue_position']
         
         # Emit socket event for real-time updates
         socketio.emit('new_reservation', {
-            'id': new_reservation.id,
-            'name': new_reservation.name,
-            'party_size': new_reservation.party_size,
-            'service_type': new_reservation.service_type,
-            'status': new_reservation.status,
-            'created_at': new_reservation.created_at.isoformat(),
+            'id': new_reservation['id'],
+            'name': new_reservation['name'],
+            'party_size': new_reservation['party_size'],
+            'service_type': new_reservation['service_type'],
+            'status': new_reservation['status'],
+            'created_at': new_reservation['created_at'],
             'queue_position': queue_position
         })
         
@@ -270,32 +432,156 @@ def create_reservation():
             'success': True,
             'message': 'Reservation created successfully',
             'reservation': {
-                'id': new_reservation.id,
-                'queue_position': queue_position
-            }
+                'id': new_reservation['id'],
+                'queue_position': queue_position,
+                'location': location
+            },
+            'location_waits': location_waits
         }), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def operating_window(day):
+    """Naive UTC opening and closing times of a venue-local day, from AdminSettings operating hours"""
+    settings = AdminSettings.query.first() or AdminSettings()
+    opens = datetime.strptime(settings.operating_hours_start or '09:00', '%H:%M').time()
+    closes = datetime.strptime(settings.operating_hours_end or '22:00', '%H:%M').time()
+    return opening_window(day, opens, closes)
+
+def booking_token(reservation_id):
+    """Secret that lets a guest cancel their own booking; derived from SECRET_KEY, so nothing is stored"""
+    message = f'booking:{reservation_id}'.encode('utf-8')
+    return hmac.new(app.config['SECRET_KEY'].encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+def booking_request(args):
+    """Validate service type, party size, location and duration shared by booking endpoints"""
+    service_type = args.get('service_type', 'dine-in')
+    if service_type not in services:
+        return None, (jsonify({'error': 'Invalid service type'}), 400)
+    try:
+        party_size = int(args.get('party_size', 0))
+        duration = int(args.get('duration') or services[service_type]['average_service_time'])
+    except (TypeError, ValueError):
+        return None, (jsonify({'error': 'Party size and duration must be numbers'}), 400)
+    if not 1 <= party_size <= services[service_type]['max_party_size']:
+        return None, (jsonify({'error': f'Party size must be between 1 and {services[service_type]["max_party_size"]}'}), 400)
+    location = args.get('location')
+    bookable = [name for name in services[service_type]['locations'] if name in location_capacity]
+    if location and location not in bookable:
+        return None, (jsonify({'error': 'Location does not take bookings'}), 400)
+    return {
+        'service_type': service_type,
+        'party_size': party_size,
+        'duration': duration,
+        'locations': [location] if location else bookable
+    }, None
+
+@app.route('/api/bookings/availability', methods=['GET'])
+def get_booking_availability():
+    """Free start times for a party on one venue-local day: ?date=YYYY-MM-DD&party_size=N"""
+    try:
+        booking, error = booking_request(request.args)
+        if error:
+            return error
+        try:
+            day = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+        opens, closes = operating_window(day)
+        slots = queue_engine.shard(g.venue).availability(
+            opens, closes, booking['party_size'], slots_for(booking['duration']), booking['locations']
+        )
+        for slot in slots:
+            slot['start'] = as_utc(slot['start'])
+        return json_response({
+            'date': day.isoformat(),
+            'timezone': str(VENUE_TIMEZONE),
+            'partySize': booking['party_size'],
+            'durationMinutes': booking['duration'],
+            'slotMinutes': BOOKING_SLOT_MINUTES,
+            'slots': slots
+        })
+    except Exception as e:
+        print(f"Error checking availability: {str(e)}")
+        return jsonify({'error': 'Failed to check availability'}), 500
+
+@app.route('/api/bookings', methods=['POST'])
+def create_booking():
+    """Book a future slot; the booking joins the live queue shortly before it starts"""
+    try:
+        data = request.get_json() or {}
+        for field in ('name', 'phone', 'location', 'start'):
+            if not data.get(field):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        booking, error = booking_request(data)
+        if error:
+            return error
+        try:
+            start = to_utc(data['start'])
+        except ValueError:
+            return jsonify({'error': 'start must be an ISO date and time, in UTC or with an offset'}), 400
+        if start != align(start) or start <= datetime.utcnow():
+            return jsonify({'error': f'start must be a future {BOOKING_SLOT_MINUTES}-minute slot'}), 400
+        end = start + timedelta(minutes=BOOKING_SLOT_MINUTES * slots_for(booking['duration']))
+        # Hours that run past midnight belong to the previous local day
+        local_day = as_utc(start).astimezone(VENUE_TIMEZONE).date()
+        windows = (operating_window(day) for day in (local_day, local_day - timedelta(days=1)))
+        if not any(opens <= start and end <= closes for opens, closes in windows):
+            return jsonify({'error': 'Booking must fall within operating hours'}), 400
+
+        reservation = queue_engine.shard(g.venue).book(
+            name=data['name'],
+            phone=data['phone'],
+            email=data.get('email', ''),
+            party_size=booking['party_size'],
+            service_type=booking['service_type'],
+            location=data['location'],
+            start=start,
+            end=end,
+            notes=data.get('notes')
+        )
+        if reservation is None:
+            return jsonify({'error': 'That slot is no longer available'}), 409
+        return jsonify({
+            'success': True,
+            'message': 'Booking confirmed',
+            'reservation': reservation,
+            'cancelToken': booking_token(reservation['id'])
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error creating booking: {str(e)}")
+        return jsonify({'error': 'Failed to create booking'}), 500
+
+@app.route('/api/bookings/<int:reservation_id>', methods=['DELETE'])
+def cancel_booking(reservation_id):
+    """Cancel a booking that has not joined the queue yet; needs its cancel token or an admin session"""
+    token = request.headers.get('X-Booking-Token') or request.args.get('token', '')
+    if not hmac.compare_digest(token, booking_token(reservation_id)) and admin_session() is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    reservation = Reservation.query.get(reservation_id)
+    if not reservation or reservation.venue != g.venue or reservation.status != 'booked':
+        return jsonify({'error': 'Booking not found'}), 404
+    updated = queue_engine.transition(reservation_id, 'cancelled', venue=g.venue)
+    socketio.emit('status_update', {
+        'entryId': reservation_id,
+        'newStatus': updated['status']
+    })
+    return jsonify(updated)
+
 @app.route('/api/reservations/<int:reservation_id>', methods=['GET'])
 def get_reservation(reservation_id):
     """Get reservation details and position in queue"""
     reservation = Reservation.query.get(reservation_id)
-    if not reservation:
+    if not reservation or reservation.venue != g.venue:
         return jsonify({'error': 'Reservation not found'}), 404
     
     # Convert to dictionary and add queue position
     reservation_data = reservation.to_dict()
-    
-    # Count how many waiting reservations are ahead of this one
-    position = Reservation.query.filter(
-        Reservation.status == 'waiting',
-        Reservation.created_at < reservation.created_at
-    ).count() + 1
-    
-    reservation_data['queue_position'] = position if reservation.status == 'waiting' else None
+    reservation_data['queue_position'] = queue_engine.shard(g.venue).position(reservation_id)
     
     return jsonify(reservation_data)
 
@@ -303,21 +589,17 @@ def get_reservation(reservation_id):
 @require_admin
 def get_queue():
     try:
-        # Get all reservations, ordered by creation date
-        reservations = Reservation.query.order_by(Reservation.created_at.desc()).all()
-        
-        # Convert to list of dictionaries with additional info
-        queue_data = []
-        for reservation in reservations:
-            res_data = reservation.to_dict()
-            # Calculate wait time in minutes
-            if reservation.status == 'waiting':
-                wait_time = int((datetime.utcnow() - reservation.created_at).total_seconds() / 60)
-                res_data['wait_time'] = wait_time
-            
-            queue_data.append(res_data)
-        
-        return jsonify(queue_data)
+        shard = queue_engine.shard(g.venue)
+        version = shard.changes.version
+
+        def load_entries(entry_ids):
+            return queue_reads.venue_queue(shard.venue, entry_ids)
+
+        def snapshot():
+            # Get all reservations for the venue as column tuples, newest first
+            return queue_reads.venue_queue(shard.venue)
+
+        return versioned_queue_response(shard.changes, version, load_entries, snapshot)
     except Exception as e:
         print(f"Error fetching queue data: {str(e)}")
         return jsonify({'error': 'Failed to fetch queue data'}), 500
@@ -330,13 +612,22 @@ def update_reservation_status(reservation_id):
     if 'status' not in data:
         return jsonify({'error': 'Status is required'}), 400
     
-    updated = queue_manager.mark_reservation_status(
-        reservation_id,
-        data['status'],
-        data.get('notes')
-    )
+    try:
+        updated = queue_engine.transition(
+            reservation_id,
+            data['status'],
+            data.get('notes'),
+            venue=g.venue
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     if updated:
+        record_finished(updated)
+        socketio.emit('status_update', {
+            'entryId': reservation_id,
+            'newStatus': updated['status']
+        })
         return jsonify(updated)
     return jsonify({'error': 'Reservation not found'}), 404
 
@@ -344,70 +635,18 @@ def update_reservation_status(reservation_id):
 @require_admin
 def get_analytics():
     try:
-        # Get current date
-        today = datetime.now().date()
-        
-        # Calculate total reservations
-        total_reservations = Reservation.query.count()
-        
-        # Calculate average wait time
-        waiting_reservations = Reservation.query.filter_by(status='waiting').all()
-        if waiting_reservations:
-            total_wait_time = sum(
-                (datetime.utcnow() - reservation.created_at).total_seconds() / 60
-                for reservation in waiting_reservations
-            )
-            average_wait_time = f"{int(total_wait_time / len(waiting_reservations))} min"
-        else:
-            average_wait_time = "0 min"
-        
-        # Calculate peak hours based on actual data
-        hour_counts = db.session.query(
-            db.func.extract('hour', Reservation.created_at).label('hour'),
-            db.func.count(Reservation.id).label('count')
-        ).group_by(db.func.extract('hour', Reservation.created_at)).all()
-        
-        peak_hours = sorted(hour_counts, key=lambda x: x[1], reverse=True)[:2]
-        peak_hours = [f"{int(hour):02d}:00" for hour, _ in peak_hours] if peak_hours else ["12:00", "18:00"]
-        
-        # Calculate current capacity
-        total_seated = Reservation.query.filter_by(status='seated').count()
-        max_capacity = 50  # This should come from settings
-        current_capacity = f"{int((total_seated / max_capacity) * 100)}%"
-        
-        # Get daily stats for the last 7 days
-        daily_stats = []
-        for i in range(7):
-            date = today - timedelta(days=i)
-            count = Reservation.query.filter(
-                Reservation.created_at >= datetime.combine(date, datetime.min.time()),
-                Reservation.created_at < datetime.combine(date + timedelta(days=1), datetime.min.time())
-            ).count()
-            daily_stats.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'count': count
-            })
-        daily_stats.reverse()
-        
-        # Get service type distribution
-        service_types = db.session.query(
-            Reservation.service_type,
-            db.func.count(Reservation.id).label('count')
-        ).group_by(Reservation.service_type).all()
-        
-        service_type_distribution = [
-            {'name': type_info[0], 'value': type_info[1]}
-            for type_info in service_types
-        ] if service_types else []
-        
-        return jsonify({
-            'totalReservations': total_reservations,
-            'averageWaitTime': average_wait_time,
-            'peakHours': peak_hours,
-            'currentCapacity': current_capacity,
-            'dailyStats': daily_stats,
-            'serviceTypeDistribution': service_type_distribution
-        })
+        venue = g.venue
+        hours = {}
+        forecast = forecaster.table(venue)
+        if not (forecast and forecast.peak_hours(datetime.utcnow().date())):
+            hours = dashboard.hourly_stats(venue)
+
+        return jsonify(dashboard.analytics(
+            queue_engine.shard(venue),
+            dashboard.service_totals(venue),
+            dashboard.daily_counts(venue, datetime.now().date()),
+            dashboard.peak_hours(forecast, hours, datetime.utcnow().date())
+        ))
         
     except Exception as e:
         print(f"Error generating analytics: {str(e)}")
@@ -421,7 +660,11 @@ def export_data():
     if format not in ['json', 'csv']:
         return jsonify({'error': 'Invalid format'}), 400
     
-    data = queue_manager.export_data(format)
+    reservations = [res.to_dict() for res in Reservation.query.filter_by(venue=g.venue).order_by(Reservation.created_at).all()]
+    if format == 'json':
+        data = json.dumps({'reservations': reservations}, indent=2)
+    else:
+        data = pd.DataFrame(reservations).to_csv(index=False)
     
     # Create in-memory file
     buffer = StringIO()
@@ -461,12 +704,11 @@ def register():
 
 @app.route('/api/services', methods=['GET'])
 def get_services():
-    return jsonify(services)
+    return response_cache.respond(('services',), 0, lambda: jsonify(services))
 
 @app.route('/api/check-in', methods=['POST'])
 @token_required
 def check_in(current_user):
-    global queue_counter
     data = request.json
     
     # Validate service type and location
@@ -476,31 +718,47 @@ def check_in(current_user):
     if service_type not in services:
         return jsonify({'message': 'Invalid service type'}), 400
     
-    if location not in services[service_type]['locations']:
+    auto_route = data.get('autoRoute', False) or location == AUTO_LOCATION
+    if not auto_route and location not in services[service_type]['locations']:
         return jsonify({'message': 'Invalid location for service type'}), 400
     
-    # Store in memory
-    queue_entry = {
-        'id': queue_counter,
-        'name': data['name'],
-        'party_size': data['partySize'],
-        'service_type': service_type,
-        'location': location,
-        'timestamp': datetime.now().isoformat(),
-        'status': 'waiting',
-        'user_email': current_user['email'],
-        'notifications': True
-    }
+    try:
+        party_size = int(data.get('partySize'))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Party size must be a number'}), 400
+    max_party_size = services[service_type]['max_party_size']
+    if not 1 <= party_size <= max_party_size:
+        return jsonify({'message': f'Party size must be between 1 and {max_party_size}'}), 400
     
-    queue_data.append(queue_entry)
-    queue_counter += 1
+    location_waits, location = route_party(service_type, party_size, location, auto_route)
+    if location is None:
+        return jsonify({'message': 'No location can seat this party'}), 400
+    
+    rejected = admit_queue_write(service_type, location, current_user['email'])
+    if rejected:
+        return rejected
+    
+    # Join the shared queue
+    shard = queue_engine.shard(g.venue)
+    queue_entry = shard.enqueue(
+        name=data['name'],
+        phone=data.get('phone', ''),
+        email=current_user['email'],
+        party_size=party_size,
+        service_type=service_type,
+        location=location
+    )
     
-    # Predict wait time
-    current_queue_length = len([entry for entry in queue_data if entry['status'] == 'waiting'])
-    service_type_encoded = {'dine-in': 0, 'takeout': 1, 'delivery': 2}[service_type]
+    # Predict wait time from the parties of the same service type ahead at join time
+    current_queue_length = shard.waiting_count()
+    parties_ahead = sum(
+        shard.count('waiting', service_type, name) for name in services[service_type]['locations']
+    ) - 1
+    predicted_wait_time = wait_model.predict_one(max(0, parties_ahead), party_size, service_type)
     
-    prediction_input = np.array([[current_queue_length, data['partySize'], service_type_encoded]])
-    predicted_wait_time = model.predict(prediction_input)[0]
+    # Projected wait from expected arrivals in this time slot
+    forecast = forecaster.table(g.venue)
+    forecast_wait_time = forecast.projected_wait(datetime.utcnow(), service_type) if forecast else None
     
     # Update analytics
     update_analytics(service_type, predicted_wait_time)
@@ -515,76 +773,217 @@ def check_in(current_user):
     return jsonify({
         'message': 'Successfully joined queue',
         'estimatedWaitTime': float(predicted_wait_time),
-        'queuePosition': current_queue_length,
-        'entryId': queue_counter - 1
+        'forecastWaitTime': forecast_wait_time,
+        'queuePosition': queue_entry['queue_position'],
+        'entryId': queue_entry['id'],
+        'venue': g.venue,
+        'location': location,
+        'locationWaits': location_waits
     })
 
 @app.route('/api/queue-status', methods=['GET'])
 @token_required
 def queue_status(current_user):
-    current_queue_length = len([entry for entry in queue_data if entry['status'] == 'waiting'])
-    return jsonify({
-        'queueLength': current_queue_length,
-        'estimatedWaitTime': float(model.predict([[current_queue_length, 2, 0]])[0])
-    })
+    shard = queue_engine.shard(g.venue)
+    version = shard.changes.version
+    not_modified = queue_not_modified(shard.changes, version)
+    if not_modified:
+        return not_modified
+
+    def render():
+        current_queue_length = shard.waiting_count()
+        forecast = forecaster.table(g.venue)
+        return with_queue_version(jsonify({
+            'queueLength': current_queue_length,
+            'estimatedWaitTime': wait_model.predict_one(current_queue_length, 2, 'dine-in'),
+            'forecastWaitTime': forecast.projected_wait(datetime.utcnow(), 'dine-in') if forecast else None,
+            'version': shard.changes.token(version)
+        }), shard.changes.token(version))
+
+    return response_cache.respond(('queue-status', shard.venue), version, render)
 
 @app.route('/api/admin/queue', methods=['GET'])
 @token_required
 @admin_required
 def admin_queue(current_user):
-    return jsonify({
-        'queue': queue_data,
-        'total_entries': len(queue_data),
-        'waiting_entries': len([entry for entry in queue_data if entry['status'] == 'waiting'])
-    })
+    shard = queue_engine.shard(g.venue)
+    version = shard.changes.version
+
+    def snapshot():
+        entries = shard.snapshot()
+        return {
+            'queue': entries,
+            'total_entries': len(entries),
+            'waiting_entries': shard.waiting_count()
+        }
+
+    return versioned_queue_response(shard.changes, version, shard.get_many, snapshot)
 
 @app.route('/api/admin/queue/<int:entry_id>', methods=['PUT'])
 @token_required
 @admin_required
 def update_queue_entry(current_user, entry_id):
     data = request.json
-    for entry in queue_data:
-        if entry['id'] == entry_id:
-            old_status = entry['status']
-            entry['status'] = data.get('status', entry['status'])
-            
-            # Emit notification if status changed
-            if old_status != entry['status'] and entry['notifications']:
-                socketio.emit('status_update', {
-                    'entryId': entry_id,
-                    'newStatus': entry['status']
-                })
-            
-            return jsonify({'message': 'Queue entry updated successfully'})
-    return jsonify({'message': 'Queue entry not found'}), 404
+    entry = queue_engine.get(entry_id, venue=g.venue)
+    old_status = entry['status'] if entry else None
+    if 'status' in data:
+        try:
+            entry = queue_engine.transition(entry_id, data['status'], data.get('notes'), venue=g.venue)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    if not entry:
+        return jsonify({'message': 'Queue entry not found'}), 404
+    
+    # Emit notification if status changed
+    if old_status != entry['status']:
+        record_finished(entry)
+        socketio.emit('status_update', {
+            'entryId': entry_id,
+            'newStatus': entry['status']
+        })
+    
+    return jsonify({'message': 'Queue entry updated successfully'})
 
 @app.route('/api/admin/queue/<int:entry_id>', methods=['DELETE'])
 @token_required
 @admin_required
 def delete_queue_entry(current_user, entry_id):
-    global queue_data
-    for entry in queue_data:
-        if entry['id'] == entry_id:
-            queue_data.remove(entry)
-            socketio.emit('queue_update', {
-                'removedEntry': entry_id
-            })
-            return jsonify({'message': 'Queue entry deleted successfully'})
+    if queue_engine.remove(entry_id, venue=g.venue):
+        socketio.emit('queue_update', {
+            'removedEntry': entry_id
+        })
+        return jsonify({'message': 'Queue entry deleted successfully'})
     return jsonify({'message': 'Queue entry not found'}), 404
 
+@app.route('/api/admin/search', methods=['GET'])
+@require_admin
+def search_reservations():
+    """Typeahead lookup of active and recent reservations by name, phone or email"""
+    query = request.args.get('q', '')
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    try:
+        results = queue_engine.shard(g.venue).search(query, limit)
+        return json_response({'query': query, 'results': results})
+    except Exception as e:
+        print(f"Error searching reservations: {str(e)}")
+        return jsonify({'error': 'Failed to search reservations'}), 500
+
+@app.route('/api/admin/events', methods=['GET'])
+@require_admin
+def get_reservation_events():
+    """Reservation status changes after ?after= (an event id), oldest first"""
+    try:
+        after = int(request.args.get('after', 0))
+        limit = max(1, min(int(request.args.get('limit', 500)), 5000))
+    except ValueError:
+        return jsonify({'error': 'after and limit must be numbers'}), 400
+    try:
+        events = reservation_events.events_after(g.venue, after, limit)
+        return json_response({'events': events, 'last_id': events[-1]['id'] if events else after})
+    except Exception as e:
+        print(f"Error fetching reservation events: {str(e)}")
+        return jsonify({'error': 'Failed to fetch reservation events'}), 500
+
+@app.route('/api/admin/memory', methods=['GET'])
+@require_admin
+def get_memory_usage():
+    """Resident memory of this worker and the size of its long-lived in-process state"""
+    return jsonify({
+        'pid': os.getpid(),
+        'rssBytes': resident_bytes(),
+        'peakRssBytes': peak_resident_bytes(),
+        'checkInStats': {
+            'retentionDays': checkin_stats.days,
+            'bytes': checkin_stats.nbytes,
+            'daily': checkin_stats.daily()
+        },
+        'waitModel': {
+            'rows': len(wait_model.store),
+            'maxRows': wait_model.store.max_rows,
+            'bytes': wait_model.store.nbytes
+        },
+        'adminSessions': len(admin_sessions),
+        'venues': {
+            venue: {
+                'activeEntries': len(queue_engine.shard(venue).entries()),
+                'indexedEntries': len(queue_engine.shard(venue).search_index)
+            }
+            for venue in queue_engine.venues()
+        }
+    })
+
+@app.route('/api/admin/cache', methods=['GET', 'DELETE'])
+@require_admin
+def response_cache_stats():
+    """Hit, miss and stale counts of this worker's response cache; DELETE empties it"""
+    if request.method == 'DELETE':
+        return jsonify({'dropped': response_cache.invalidate()})
+    return jsonify(response_cache.stats())
+
+@app.route('/api/admin/reports', methods=['POST'])
+@require_admin
+def create_report():
+    """Start a report for a month, quarter or date range; poll the returned id for the result"""
+    data = request.get_json(silent=True) or {}
+    try:
+        first, last = reports.parse_period(data)
+        job = report_jobs.submit(g.venue, first, last)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if job['status'] == 'done':
+        return json_response(job)
+    response = json_response(job, status=202)
+    response.headers['Location'] = f"/api/admin/reports/{job['id']}"
+    return response
+
+@app.route('/api/admin/reports/<report_id>', methods=['GET'])
+@require_admin
+def get_report(report_id):
+    """A report job's progress, with the report once it is done"""
+    job = report_jobs.status(report_id)
+    if job is None:
+        return jsonify({'error': 'Report not found'}), 404
+    return json_response(job)
+
+@app.route('/api/admin/dashboard', methods=['GET'])
+@require_admin
+def get_dashboard():
+    """Every admin dashboard panel in one response; ?panels= picks a subset"""
+    requested = request.args.get('panels')
+    panels = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(dashboard.PANELS)
+    unknown = [name for name in panels if name not in dashboard.PANELS]
+    if unknown:
+        return jsonify({'error': f"Unknown panels: {', '.join(unknown)}", 'panels': list(dashboard.PANELS)}), 400
+    try:
+        shard = queue_engine.shard(g.venue)
+        return json_response(dashboard.build(app, shard, forecaster, panels, dashboard_pool))
+    except Exception as e:
+        print(f"Error building dashboard: {str(e)}")
+        return jsonify({'error': 'Failed to build dashboard'}), 500
+
 @app.route('/api/admin/settings', methods=['GET'])
 @require_admin
 def get_admin_settings():
+    settings = AdminSettings.query.first() or AdminSettings()
     return jsonify({
         "queueEnabled": True,
-        "maxQueueSize": 50,
-        "notificationsEnabled": True,
+        "maxQueueSize": settings.max_queue_size or 50,
+        "notificationsEnabled": settings.notifications_enabled if settings.notifications_enabled is not None else True,
         "operatingHours": {
-            "start": "09:00",
-            "end": "22:00"
+            "start": settings.operating_hours_start or "09:00",
+            "end": settings.operating_hours_end or "22:00"
         }
     })
 
+@app.route('/api/admin/admission', methods=['GET'])
+@require_admin
+def get_admission_stats():
+    """Admitted and rejected queue write rates (admin only)"""
+    return jsonify(admission_controller.stats())
+
 @app.route('/api/admin/settings', methods=['PUT'])
 @jwt_required()
 def update_admin_settings():
@@ -702,155 +1101,98 @@ def init_test_data():
 @require_admin
 def get_wait_time_trends():
     try:
-        # Get wait times for each hour of the day
-        wait_times = db.session.query(
-            db.func.extract('hour', Reservation.created_at).label('hour'),
-            db.func.avg(
-                db.func.extract('epoch', Reservation.completed_at - Reservation.created_at) / 60
-            ).label('average_wait'),
-            db.func.max(
-                db.func.extract('epoch', Reservation.completed_at - Reservation.created_at) / 60
-            ).label('max_wait')
-        ).filter(
-            Reservation.status == 'completed',
-            Reservation.completed_at.isnot(None)
-        ).group_by(
-            db.func.extract('hour', Reservation.created_at)
-        ).order_by(
-            db.func.extract('hour', Reservation.created_at)
-        ).all()
-
-        # Format the data
-        trends_data = [
-            {
-                'hour': int(hour),
-                'average_wait': round(float(avg_wait or 0), 2),
-                'max_wait': round(float(max_wait or 0), 2)
-            }
-            for hour, avg_wait, max_wait in wait_times
-        ]
+        # Average and longest wait for each hour of the day, zero where none completed
+        return jsonify(dashboard.wait_time_trends(dashboard.hourly_stats(g.venue)))
+    except Exception as e:
+        print(f"Error generating wait time trends: {str(e)}")
+        return jsonify({'error': 'Failed to generate wait time trends'}), 500
 
-        # Fill in missing hours with zeros
-        all_hours = set(range(24))
-        existing_hours = {data['hour'] for data in trends_data}
-        missing_hours = all_hours - existing_hours
+@app.route('/api/analytics/forecast', methods=['GET'])
+@require_admin
+def get_forecast():
+    try:
+        service_type = request.args.get('service_type')
+        if service_type and service_type not in services:
+            return jsonify({'error': 'Invalid service type'}), 400
+        days = max(1, min(int(request.args.get('days', 1)), forecaster.horizon_days))
 
-        for hour in missing_hours:
-            trends_data.append({
-                'hour': hour,
-                'average_wait': 0,
-                'max_wait': 0
-            })
+        forecast = forecaster.table(g.venue, build=True)
+        first_slot = max(0, forecast.slot_of(datetime.utcnow()))
+        return json_response({
+            'venue': forecast.venue,
+            'generatedAt': forecast.generated_at,
+            'slotMinutes': SLOT_MINUTES,
+            'peakHours': forecast.peak_hours(datetime.utcnow().date()),
+            'slots': forecast.slots(first_slot, first_slot + days * SLOTS_PER_DAY, service_type)
+        })
+    except ValueError:
+        return jsonify({'error': 'days must be a number'}), 400
+    except Exception as e:
+        print(f"Error generating forecast: {str(e)}")
+        return jsonify({'error': 'Failed to generate forecast'}), 500
 
-        # Sort by hour
-        trends_data.sort(key=lambda x: x['hour'])
+def render_queue_status(shard, version):
+    """The /api/queue/status payload for a shard at a queue version"""
+    now = datetime.utcnow()
+    columns = queue_reads.reservations.c
 
-        return jsonify(trends_data)
-    except Exception as e:
-        print(f"Error generating wait time trends: {str(e)}")
-        return jsonify({'error': 'Failed to generate wait time trends'}), 500
+    # Get currently being served reservations
+    current_reservations = queue_reads.fetch_rows(
+        columns.venue == shard.venue,
+        columns.status == 'seated',
+        order_by=columns.created_at.desc(),
+        limit=5
+    )
+
+    # Get waiting reservations once, in arrival order; used for both
+    # the priority ranking and the wait time predictions
+    waiting_reservations = queue_reads.rows_to_dicts(queue_reads.fetch_rows(
+        columns.venue == shard.venue,
+        columns.status == 'waiting',
+        order_by=columns.created_at.asc()
+    ))
+
+    next_reservations = queue_reads.next_by_priority(waiting_reservations, now)
+
+    # Minutes until each waiting party is finished, from an M/M/c queue
+    # per service type with the servers currently in use
+    if waiting_reservations:
+        busy = np.array([
+            sum(shard.count('seated', name, location) for location in services.get(name, {}).get('locations', []))
+            for name in SERVICE_TYPES.categories
+        ] + [0])
+        waits = queueing_model.queue_waits(waiting_reservations, busy, venue=shard.venue)
+        predictions = [
+            {'reservation_id': reservation['id'], 'estimated_wait': round(float(wait), 1)}
+            for reservation, wait in zip(waiting_reservations, waits)
+        ]
+        average_wait_time = float(waits.mean())
+    else:
+        predictions = []
+        average_wait_time = 0
+
+    return with_queue_version(json_response({
+        'current': queue_reads.rows_to_dicts(current_reservations),
+        'next': next_reservations,
+        'estimated_wait_time': round(average_wait_time, 1),
+        'total_waiting': len(waiting_reservations),
+        'predictions': predictions,
+        'last_updated': now,
+        'version': shard.changes.token(version)
+    }), shard.changes.token(version))
 
 @app.route('/api/queue/status', methods=['GET'])
 def get_queue_status():
     try:
-        # Get currently being served reservations
-        current_reservations = Reservation.query.filter(
-            Reservation.status == 'seated'
-        ).order_by(Reservation.created_at.desc()).limit(5).all()
-
-        # Get next in line reservations with priority calculation
-        next_reservations = Reservation.query.filter(
-            Reservation.status == 'waiting'
-        ).order_by(Reservation.created_at.asc()).all()
-
-        # Calculate priority scores for each waiting reservation
-        for reservation in next_reservations:
-            # Base priority on wait time
-            wait_time = (datetime.utcnow() - reservation.created_at).total_seconds() / 60
-            priority_score = wait_time * 0.5  # Base score from wait time
-
-            # Adjust priority based on party size (larger parties get higher priority)
-            if reservation.party_size > 4:
-                priority_score += 10
-            elif reservation.party_size > 2:
-                priority_score += 5
-
-            # Adjust priority based on service type
-            if reservation.service_type == 'dine-in':
-                priority_score += 5
-            elif reservation.service_type == 'delivery':
-                priority_score += 3
-
-            # Add random factor to prevent exact ties
-            priority_score += random.uniform(0, 1)
-            
-            reservation.priority_score = priority_score
-
-        # Sort by priority score
-        next_reservations.sort(key=lambda x: x.priority_score, reverse=True)
-        next_reservations = next_reservations[:5]  # Take top 5
-
-        # Calculate smart wait time predictions
-        waiting_reservations = Reservation.query.filter(
-            Reservation.status == 'waiting'
-        ).all()
-        
-        if waiting_reservations:
-            # Calculate historical average service time
-            completed_reservations = Reservation.query.filter(
-                Reservation.status == 'completed',
-                Reservation.completed_at.isnot(None)
-            ).all()
-            
-            if completed_reservations:
-                total_service_time = sum(
-                    (res.completed_at - res.created_at).total_seconds() / 60
-                    for res in completed_reservations
-                )
-                avg_service_time = total_service_time / len(completed_reservations)
-            else:
-                avg_service_time = 15  # Default average service time in minutes
-
-            # Calculate current wait time predictions
-            predictions = []
-            for i, reservation in enumerate(waiting_reservations):
-                # Base prediction on position in queue and average service time
-                base_wait = (i + 1) * avg_service_time
-                
-                # Adjust based on party size
-                if reservation.party_size > 4:
-                    base_wait *= 1.2
-                elif reservation.party_size > 2:
-                    base_wait *= 1.1
-                
-                # Adjust based on service type
-                if reservation.service_type == 'dine-in':
-                    base_wait *= 1.1
-                elif reservation.service_type == 'delivery':
-                    base_wait *= 0.9
-                
-                # Add random variation
-                base_wait *= random.uniform(0.9, 1.1)
-                
-                predictions.append({
-                    'reservation_id': reservation.id,
-                    'estimated_wait': round(base_wait, 1)
-                })
-
-            total_wait_time = sum(pred['estimated_wait'] for pred in predictions)
-            average_wait_time = total_wait_time / len(predictions)
-        else:
-            predictions = []
-            average_wait_time = 0
+        shard = queue_engine.shard(g.venue)
+        version = shard.changes.version
+        not_modified = queue_not_modified(shard.changes, version)
+        if not_modified:
+            return not_modified
 
-        return jsonify({
-            'current': [res.to_dict() for res in current_reservations],
-            'next': [res.to_dict() for res in next_reservations],
-            'estimated_wait_time': round(average_wait_time, 1),
-            'total_waiting': len(waiting_reservations),
-            'predictions': predictions,
-            'last_updated': datetime.utcnow().isoformat()
-        })
+        return response_cache.respond(
+            ('queue/status', shard.venue), version, lambda: render_queue_status(shard, version)
+        )
     except Exception as e:
         print(f"Error getting queue status: {str(e)}")
         return jsonify({'error': 'Failed to get queue status'}), 500
@@ -858,6 +1200,7 @@ def get_queue_status():
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()  # Create database tables
+        upgrade_schema(db)  # Add columns missing from older databases
         # Only initialize test data if there are no reservations
         if Reservation.query.count() == 0:
             init_test_data()
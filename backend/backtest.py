@@ -0,0 +1,329 @@
+"""Walk-forward backtest of the wait-time predictors.
+
+Finished reservations are replayed in creation order. Each predictor is
+asked what it would have said when the reservation was created, using only
+reservations that had finished by then. Its answer is compared with the
+actual completed_at - created_at. Work is split by predictor and date range
+over a process pool.
+
+Run with ``python manage.py backtest``.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sqlalchemy import select
+
+from features import SERVICE_TYPES, TRAINING_STATUSES, WaitTimeModel, encode_many
+from models import db, Reservation
+from queueing import QueueingEstimator
+from services import services
+
+# Upper edges (minutes) of the calibration buckets, by predicted wait
+CALIBRATION_EDGES = (10, 20, 30, 45, 60, 90, float('inf'))
+
+
+class History(NamedTuple):
+    """Finished reservations as arrays, in creation order"""
+    created_at: np.ndarray  # datetime64[us]
+    completed_at: np.ndarray  # datetime64[us]
+    party_sizes: np.ndarray
+    service_types: np.ndarray  # str
+    queue_lengths: np.ndarray  # parties waiting ahead at creation
+    features: np.ndarray  # features.FEATURE_NAMES rows
+    waits: np.ndarray  # actual minutes from creation to completion
+    completion_order: np.ndarray  # indices sorted by completed_at
+
+    @property
+    def size(self) -> int:
+        return len(self.created_at)
+
+    def known_before(self, when) -> np.ndarray:
+        """Indices of reservations that had finished by `when`, oldest completion first"""
+        count = np.searchsorted(self.completed_at[self.completion_order], when, side='right')
+        return self.completion_order[:count]
+
+
+def load_history(venue=None, since=None) -> History:
+    """Read finished reservations into a History; needs an app context"""
+    reservations = Reservation.__table__
+    criteria = [reservations.c.status.in_(TRAINING_STATUSES), reservations.c.completed_at.isnot(None)]
+    if venue:
+        criteria.append(reservations.c.venue == venue)
+    if since:
+        criteria.append(reservations.c.created_at >= since)
+    rows = db.session.execute(
+        select(
+            reservations.c.initial_position, reservations.c.party_size, reservations.c.service_type,
+            reservations.c.created_at, reservations.c.completed_at
+        ).where(*criteria).order_by(reservations.c.created_at, reservations.c.id)
+    ).all()
+    return build_history(rows)
+
+
+def build_history(rows) -> History:
+    """History from (initial_position, party_size, service_type, created_at, completed_at) rows"""
+    positions, party_sizes, service_types, created_at, completed_at = (
+        zip(*rows) if rows else ((), (), (), (), ())
+    )
+    created_at = np.array(created_at, dtype='datetime64[us]')
+    completed_at = np.array(completed_at, dtype='datetime64[us]')
+    completion_order = np.argsort(completed_at, kind='stable')
+
+    # Rows from before tickets were issued have no initial position; estimate
+    # the queue ahead as reservations created earlier and not yet finished
+    started = np.arange(len(created_at))
+    finished = np.searchsorted(completed_at[completion_order], created_at, side='right')
+    estimated = np.maximum(0, started - finished)
+    queue_lengths = np.array(
+        [position - 1 if position else estimate for position, estimate in zip(positions, estimated)],
+        dtype=np.int64
+    )
+    party_sizes = np.array(party_sizes, dtype=np.int64)
+    service_types = np.array(service_types, dtype=str)
+    return History(
+        created_at=created_at,
+        completed_at=completed_at,
+        party_sizes=party_sizes,
+        service_types=service_types,
+        queue_lengths=queue_lengths,
+        features=encode_many(queue_lengths, party_sizes, service_types, created_at),
+        waits=((completed_at - created_at) / np.timedelta64(1, 'm')).astype(np.float64),
+        completion_order=completion_order
+    )
+
+
+class Predictor:
+    """Replays one wait estimator; fit() sees only reservations finished before the prediction"""
+
+    name = ''
+
+    def fit(self, history: History, known: np.ndarray):
+        pass
+
+    def needs_fit(self, known: np.ndarray) -> bool:
+        return False
+
+    def predict(self, history: History, index: int) -> float:
+        raise NotImplementedError
+
+
+class DefaultForest(Predictor):
+    """The forest check-in used before any history existed (dummy training data)"""
+
+    name = 'default-forest'
+
+    def __init__(self):
+        self.model = WaitTimeModel._default_model()
+
+    def predict(self, history, index):
+        return float(self.model.predict(history.features[index:index + 1])[0])
+
+
+class StoreForest(Predictor):
+    """features.WaitTimeModel: refitted on all finished reservations as they accumulate.
+
+    The live model refits every 50 new rows; each refit grows the 100-tree
+    forest over the whole history, so the replay refits every 500 to keep a
+    full backtest to seconds rather than minutes.
+    """
+
+    name = 'store-forest'
+
+    def __init__(self, min_samples=20, retrain_every=500):
+        self.min_samples = min_samples
+        self.retrain_every = retrain_every
+        self.model = WaitTimeModel._default_model()
+        self.trained_rows = 0
+
+    def needs_fit(self, known):
+        return len(known) >= self.min_samples and len(known) - self.trained_rows >= self.retrain_every
+
+    def fit(self, history, known):
+        model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=1)
+        model.fit(history.features[known], history.waits[known])
+        self.model = model
+        self.trained_rows = len(known)
+
+    def predict(self, history, index):
+        return float(self.model.predict(history.features[index:index + 1])[0])
+
+
+class RecentForest(Predictor):
+    """utils.QueueManager.estimate_wait_time: a forest on the last 50 finished reservations.
+
+    The original refits on every call; refit_every trades fidelity for speed.
+    """
+
+    name = 'recent-forest'
+
+    def __init__(self, window=50, refit_every=100):
+        self.window = window
+        self.refit_every = refit_every
+        self.model = None
+        self.calls = 0
+
+    def needs_fit(self, known):
+        self.calls += 1
+        return len(known) >= 5 and (self.model is None or self.calls % self.refit_every == 0)
+
+    def fit(self, history, known):
+        recent = known[-self.window:]
+        # party_size, service_type, hour_of_day
+        self.model = RandomForestRegressor(random_state=42).fit(history.features[recent][:, [1, 2, 3]], history.waits[recent])
+
+    def predict(self, history, index):
+        if self.model is None:
+            return float(history.queue_lengths[index] * 15)
+        return float(max(5, int(self.model.predict(history.features[index:index + 1, [1, 2, 3]])[0])))
+
+
+class PositionHeuristic(Predictor):
+    """get_queue_status: position x average time to completion x party and service multipliers"""
+
+    name = 'position-heuristic'
+
+    def __init__(self):
+        self.average_wait = 15.0
+        self.known_rows = 0
+
+    def needs_fit(self, known):
+        return len(known) != self.known_rows
+
+    def fit(self, history, known):
+        self.average_wait = float(history.waits[known].mean()) if len(known) else 15.0
+        self.known_rows = len(known)
+
+    def predict(self, history, index):
+        wait = (history.queue_lengths[index] + 1) * self.average_wait
+        party_size = history.party_sizes[index]
+        if party_size > 4:
+            wait *= 1.2
+        elif party_size > 2:
+            wait *= 1.1
+        service_type = history.service_types[index]
+        if service_type == 'dine-in':
+            wait *= 1.1
+        elif service_type == 'delivery':
+            wait *= 0.9
+        return float(wait)
+
+
+class ErlangC(Predictor):
+    """queueing.QueueingEstimator: M/M/c per service type with arrivals from the hour before"""
+
+    name = 'erlang-c'
+
+    def __init__(self, arrival_minutes=60):
+        self.estimator = QueueingEstimator(services, arrival_minutes=arrival_minutes)
+        self.window = np.timedelta64(arrival_minutes, 'm')
+        self.created_by_service = None
+
+    def predict(self, history, index):
+        if self.created_by_service is None:
+            codes = SERVICE_TYPES.encode_many(history.service_types)
+            self.created_by_service = [history.created_at[codes == code] for code in range(len(self.estimator.servers))]
+        created = history.created_at[index]
+        arrivals = np.array([
+            np.searchsorted(times, created) - np.searchsorted(times, created - self.window)
+            for times in self.created_by_service
+        ]) / self.estimator.arrival_minutes
+        code = SERVICE_TYPES.encode(history.service_types[index])
+        rates = self.estimator.make_rates(self.estimator.default_minutes, arrivals)
+        return float(self.estimator.waits([history.queue_lengths[index]], [code], rates=rates)[0])
+
+
+PREDICTORS = {cls.name: cls for cls in (DefaultForest, StoreForest, RecentForest, PositionHeuristic, ErlangC)}
+
+_history: Optional[History] = None
+
+
+def _init_worker(history):
+    global _history
+    _history = history
+
+
+def _replay(name, start, stop):
+    """Predictions, fit seconds and per-prediction latencies for rows [start, stop)"""
+    history = _history
+    predictor = PREDICTORS[name]()
+    predictions = np.empty(stop - start)
+    latencies = np.empty(stop - start)
+    fit_seconds = 0.0
+    for offset, index in enumerate(range(start, stop)):
+        known = history.known_before(history.created_at[index])
+        if predictor.needs_fit(known):
+            began = time.perf_counter()
+            predictor.fit(history, known)
+            fit_seconds += time.perf_counter() - began
+        began = time.perf_counter()
+        predictions[offset] = predictor.predict(history, index)
+        latencies[offset] = time.perf_counter() - began
+    return name, start, predictions, latencies, fit_seconds
+
+
+def date_ranges(history: History, chunks: int) -> List[tuple]:
+    """Split row indices into up to `chunks` ranges covering equal spans of time"""
+    if not history.size:
+        return []
+    edges = np.linspace(
+        history.created_at[0].astype(np.int64), history.created_at[-1].astype(np.int64) + 1, chunks + 1
+    ).astype(np.int64).astype('datetime64[us]')
+    bounds = np.searchsorted(history.created_at, edges)
+    return [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def score(predictions: np.ndarray, actual: np.ndarray, latencies: np.ndarray, fit_seconds: float) -> Dict:
+    errors = predictions - actual
+    calibration = []
+    lower = 0
+    for upper in CALIBRATION_EDGES:
+        in_bucket = (predictions >= lower) & (predictions < upper)
+        if in_bucket.any():
+            calibration.append({
+                'bucket': f'{lower}-{upper}' if upper != float('inf') else f'{lower}+',
+                'count': int(in_bucket.sum()),
+                'meanPredicted': round(float(predictions[in_bucket].mean()), 1),
+                'meanActual': round(float(actual[in_bucket].mean()), 1)
+            })
+        lower = upper
+    return {
+        'count': len(actual),
+        'mae': round(float(np.abs(errors).mean()), 2),
+        'bias': round(float(errors.mean()), 2),
+        'within10': round(float((np.abs(errors) <= 10).mean()), 3),
+        'underestimated': round(float((errors < 0).mean()), 3),
+        'p50LatencyUs': round(float(np.percentile(latencies, 50) * 1e6), 1),
+        'p99LatencyUs': round(float(np.percentile(latencies, 99) * 1e6), 1),
+        'fitSeconds': round(fit_seconds, 2),
+        'calibration': calibration
+    }
+
+
+def run_backtest(history: History, predictors=None, chunks=4, workers=None) -> Dict[str, Dict]:
+    """Replay every predictor over history and score it"""
+    names = list(predictors or PREDICTORS)
+    unknown = set(names) - set(PREDICTORS)
+    if unknown:
+        raise ValueError(f"Unknown predictors: {', '.join(sorted(unknown))}")
+    if not history.size:
+        return {}
+
+    tasks = [(name, start, stop) for name in names for start, stop in date_ranges(history, chunks)]
+    predictions = {name: np.empty(history.size) for name in names}
+    latencies = {name: np.empty(history.size) for name in names}
+    fit_seconds = dict.fromkeys(names, 0.0)
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(history,)) as pool:
+        futures = [pool.submit(_replay, *task) for task in tasks]
+        for future in futures:
+            name, start, values, times, seconds = future.result()
+            predictions[name][start:start + len(values)] = values
+            latencies[name][start:start + len(times)] = times
+            fit_seconds[name] += seconds
+
+    return {name: score(predictions[name], history.waits, latencies[name], fit_seconds[name]) for name in names}
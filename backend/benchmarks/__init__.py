@@ -0,0 +1,23 @@
+"""Performance benchmarks for the backend.
+
+Run from the backend directory, e.g. ``python -m benchmarks.engine_profiles``.
+"""
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def timed(results, key):
+    """Store the elapsed wall time of the block in results[key] (seconds)"""
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+
+def print_table(headers, rows):
+    """Print rows as a fixed-width text table"""
+    widths = [max([len(str(h))] + [len(str(r[i])) for r in rows]) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(str(v).ljust(w) for v, w in zip(row, widths)))
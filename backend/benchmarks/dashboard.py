@@ -0,0 +1,84 @@
+"""Latency of the combined admin dashboard.
+
+Builds every dashboard panel over a seeded SQLite file, once with the SQL
+sub-queries run one after another and once on a worker pool of each size,
+every worker on its own connection. No forecast table is loaded, so peak
+hours come from the hourly scan that the wait-time panel also uses.
+
+    python -m benchmarks.dashboard --rows 10000 100000 --workers 2 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
+from flask import Flask
+
+from benchmarks import print_table
+from db_config import init_database
+import dashboard
+from models import db, Reservation
+from queue_engine import QueueShard
+import seeding
+
+
+class _Inline:
+    """Executor that runs each task as it is submitted"""
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+def _seed(count):
+    for rows in seeding.batched(seeding.generate(days=count // 200 + 1), 20000):
+        db.session.execute(Reservation.__table__.insert(), rows[:count])
+        count -= len(rows)
+        if count <= 0:
+            break
+    db.session.commit()
+
+
+def _best_of(app, executor, repeat):
+    shard = QueueShard('main')
+    forecaster = SimpleNamespace(table=lambda venue: None)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dashboard.build(app, shard, forecaster, dashboard.PANELS, executor)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        app = Flask(__name__)
+        init_database(app, db, url=f"sqlite:///{os.path.join(directory, 'dashboard.db')}")
+        for count in args.rows:
+            with app.app_context():
+                db.drop_all()
+                db.create_all()
+                _seed(count)
+                sequential = _best_of(app, _Inline(), args.repeat)
+                rows.append((count, 'sequential', f'{sequential * 1e3:.0f}', '1.0x'))
+                for workers in args.workers:
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        pooled = _best_of(app, pool, args.repeat)
+                    rows.append((count, f'{workers} workers', f'{pooled * 1e3:.0f}', f'{sequential / pooled:.1f}x'))
+
+    print(f'cpus: {os.cpu_count()}')
+    print_table(['rows', 'sub-queries', 'dashboard ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
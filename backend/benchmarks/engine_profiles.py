@@ -0,0 +1,122 @@
+"""Concurrent read/write throughput of the database engine profiles.
+
+Runs against a scratch copy of the reservations table, bench_reservations,
+so pointing it at a real database never touches the app's data. It refuses
+to run if that table already holds rows.
+
+    python -m benchmarks.engine_profiles --readers 8 --writers 2 --seconds 5
+    python -m benchmarks.engine_profiles --postgres-url postgresql://...
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import MetaData, func, inspect, select
+
+from benchmarks import print_table
+from db_config import create_profiled_engine
+from models import Reservation
+
+# Same columns and indexes as the app's table, under a name the app never uses
+reservations = Reservation.__table__.to_metadata(MetaData(), name='bench_reservations')
+
+
+def _reader(engine, stop, counts):
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    select(func.count(reservations.c.id)).where(reservations.c.status == 'waiting')
+                ).scalar()
+                conn.execute(
+                    select(reservations.c.id, reservations.c.created_at)
+                    .where(reservations.c.status == 'waiting')
+                    .order_by(reservations.c.created_at)
+                    .limit(20)
+                ).fetchall()
+            counts['reads'] += 1
+        except Exception:
+            counts['errors'] += 1
+
+
+def _writer(engine, stop, counts):
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                conn.execute(reservations.insert().values(
+                    name='Bench Guest',
+                    phone='000-000-0000',
+                    party_size=2,
+                    service_type='dine-in',
+                    location='Main Dining',
+                    status='waiting',
+                    created_at=datetime.utcnow()
+                ))
+            counts['writes'] += 1
+        except Exception:
+            counts['errors'] += 1
+
+
+def run_profile(url, profile, readers, writers, seconds):
+    engine = create_profiled_engine(url, profile)
+    if inspect(engine).has_table(reservations.name):
+        with engine.connect() as conn:
+            if conn.execute(select(func.count()).select_from(reservations)).scalar():
+                engine.dispose()
+                raise SystemExit(f'{reservations.name} already holds rows; drop it before benchmarking this database')
+        reservations.drop(engine)
+    reservations.create(engine)
+
+    stop = threading.Event()
+    reader_counts = [{'reads': 0, 'writes': 0, 'errors': 0} for _ in range(readers)]
+    writer_counts = [{'reads': 0, 'writes': 0, 'errors': 0} for _ in range(writers)]
+    threads = [threading.Thread(target=_reader, args=(engine, stop, c)) for c in reader_counts]
+    threads += [threading.Thread(target=_writer, args=(engine, stop, c)) for c in writer_counts]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_counts = reader_counts + writer_counts
+    reservations.drop(engine)
+    engine.dispose()
+    return {
+        'reads_per_sec': sum(c['reads'] for c in all_counts) / elapsed,
+        'writes_per_sec': sum(c['writes'] for c in all_counts) / elapsed,
+        'errors': sum(c['errors'] for c in all_counts)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--postgres-url', default=os.getenv('BENCH_POSTGRES_URL'))
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ('sqlite-default', 'sqlite'):
+            url = f"sqlite:///{os.path.join(tmp, profile + '.db')}"
+            result = run_profile(url, profile, args.readers, args.writers, args.seconds)
+            rows.append((profile, f"{result['reads_per_sec']:.0f}", f"{result['writes_per_sec']:.0f}", result['errors']))
+
+    if args.postgres_url:
+        result = run_profile(args.postgres_url, 'postgres', args.readers, args.writers, args.seconds)
+        rows.append(('postgres', f"{result['reads_per_sec']:.0f}", f"{result['writes_per_sec']:.0f}", result['errors']))
+
+    print(f"{args.readers} readers / {args.writers} writers, {args.seconds:g}s per profile")
+    print_table(['profile', 'reads/s', 'writes/s', 'errors'], rows)
+
+
+if __name__ == '__main__':
+    main()
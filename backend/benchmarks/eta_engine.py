@@ -0,0 +1,118 @@
+"""Cost per queue mutation of keeping ETAs and "you're next" thresholds current.
+
+Compares recomputing every waiting entry's position, ETA and thresholds
+after each change with the shard's EtaTracker, which recomputes only the
+front window and sends one shift event for everyone behind it. Mutations
+are a mix of seating the front party, cancelling one from the middle and a
+new arrival at the back. No database is needed.
+
+    python -m benchmarks.eta_engine --queue 500 5000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from benchmarks import print_table
+from eta_engine import NEXT_IN_LINE, FIVE_MINUTES
+from queue_engine import QueueShard
+from queue_entries import QueueEntry, to_epoch_us
+
+
+def _entry(entry_id, created):
+    return QueueEntry.from_reservation(SimpleNamespace(
+        id=entry_id, ticket_number=entry_id, initial_position=1, name=f'Guest {entry_id}', phone='555',
+        email=None, party_size=2, service_type='dine-in', location='Main Dining', status='waiting',
+        notes=None, created_at=created, updated_at=None, completed_at=None, seated_at=None, no_show_at=None,
+        scheduled_start=None, scheduled_end=None
+    ))
+
+
+def _shard(size):
+    shard = QueueShard('bench')
+    shard._loaded = True
+    start = datetime.utcnow() - timedelta(hours=2)
+    for index in range(size):
+        shard._cache(_entry(index + 1, start + timedelta(seconds=index)), track=False)
+    return shard
+
+
+def _mutations(count, seed=3):
+    rng = random.Random(seed)
+    # Arrivals keep pace with departures so the queue length holds steady
+    return rng.choices(('seat', 'cancel', 'arrive'), weights=(0.4, 0.1, 0.5), k=count), rng
+
+
+def _run(shard, kinds, rng, on_change):
+    """Apply the mutations through the shard cache; returns events published"""
+    next_id = len(shard._entries) + 1
+    now = datetime.utcnow()
+    events = 0
+    for kind in kinds:
+        if kind == 'arrive' or not shard._waiting:
+            shard._cache(_entry(next_id, now))
+            next_id += 1
+        else:
+            index = 0 if kind == 'seat' else rng.randrange(len(shard._waiting))
+            entry_id = shard._waiting[index][1]
+            shard._uncache(entry_id)
+            if kind == 'seat':
+                shard.eta.departed(to_epoch_us(now), shard._waiting)
+            shard.eta.forget(entry_id)
+        events += on_change(shard)
+        # About one change a minute, so departures come at a realistic pace
+        now += timedelta(minutes=1)
+    return events
+
+
+def _incremental(shard):
+    return len(shard.eta.drain())
+
+
+def _full_recompute(fired):
+    def recompute(shard):
+        # What the queue would do without the tracker: every entry, every time
+        shard.eta.drain()
+        tracker = shard.eta
+        events = 0
+        for index, (_, entry_id) in enumerate(shard._waiting):
+            position = index + 1
+            eta = tracker.eta(position)
+            events += 1
+            sent = fired.setdefault(entry_id, set())
+            for threshold, crossed in ((NEXT_IN_LINE, position <= tracker.next_positions),
+                                       (FIVE_MINUTES, eta <= tracker.soon_minutes)):
+                if crossed and threshold not in sent:
+                    sent.add(threshold)
+                    events += 1
+        return events
+    return recompute
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queue', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--mutations', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for size in args.queue:
+        for name, make in (('full recompute', lambda: _full_recompute({})), ('EtaTracker', lambda: _incremental)):
+            shard = _shard(size)
+            kinds, rng = _mutations(args.mutations)
+            start = time.perf_counter()
+            events = _run(shard, kinds, rng, make())
+            elapsed = time.perf_counter() - start
+            rows.append((
+                size,
+                name,
+                f'{elapsed / args.mutations * 1e6:.1f}',
+                f'{events / args.mutations:.1f}'
+            ))
+
+    print_table(['queue', 'strategy', 'us per mutation', 'events per mutation'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Micro-benchmarks of the queue-manager and analytics internals, with regression checks.
+
+Each case is timed at every --sizes data size (rows in the store or queue)
+as the best of --repeat autoranged loops, in microseconds per call. --save
+records the results in a baseline file; --check compares against it and
+exits with status 1 when any case is more than --threshold slower. The
+committed baseline.json records the host it was measured on; timings depend
+on the machine, so re-record it with --save on a different host before
+checking a change against it. No database is needed.
+
+    python -m benchmarks.micro --save
+    python -m benchmarks.micro --check --threshold 0.25
+    python -m benchmarks.micro --case queue_position --sizes 100 1000
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks import print_table
+from models import Reservation
+from queueing import QueueingEstimator
+import queue_reads
+from services import services
+from utils import QueueManager
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SERVICES = ('dine-in', 'takeout', 'delivery')
+
+
+def _reservations(size, seed=11):
+    """Reservation dicts over the last 30 days, oldest first; the newest 1% still waiting"""
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    minutes_ago = np.sort(rng.uniform(0, 30 * 24 * 60, size))[::-1].tolist()
+    service_types = rng.choice(SERVICES, size, p=[0.6, 0.25, 0.15]).tolist()
+    party_sizes = rng.integers(1, 9, size).tolist()
+    finished = rng.choice(['served', 'no-show'], size, p=[0.94, 0.06]).tolist()
+    waiting_from = size - max(1, size // 100)
+    return [
+        {
+            'id': index + 1,
+            'name': f'Guest {index}',
+            'phone': f'555-{index:07d}',
+            'service_type': service_types[index],
+            'party_size': party_sizes[index],
+            'status': 'waiting' if index >= waiting_from else finished[index],
+            'created_at': now - timedelta(minutes=minutes_ago[index])
+        }
+        for index in range(size)
+    ]
+
+
+def _queue_manager(size, directory):
+    """A QueueManager holding size reservations and a service history entry for each finished one"""
+    manager = QueueManager(os.path.join(directory, f'queue_{size}.json'))
+    manager.reservations = []
+    manager.service_history = []
+    for reservation in _reservations(size):
+        created_at = reservation['created_at']
+        stored = dict(reservation, created_at=created_at.isoformat(), estimated_wait=15)
+        manager.reservations.append(stored)
+        if stored['status'] != 'waiting':
+            manager.service_history.append({
+                'reservation_id': stored['id'],
+                'party_size': stored['party_size'],
+                'service_type': stored['service_type'],
+                'service_type_encoded': SERVICES.index(stored['service_type']),
+                'hour_of_day': created_at.hour,
+                'actual_wait_time': 20 + stored['id'] % 40,
+                'status': stored['status']
+            })
+    return manager
+
+
+def add_reservation(size, directory):
+    manager = _queue_manager(size, directory)
+
+    def run():
+        manager.add_reservation({'name': 'Guest', 'phone': '555', 'service_type': 'dine-in', 'party_size': 2})
+        # Drop the new row so every call sees a store of exactly size rows
+        manager.reservations.pop()
+    return run
+
+
+def queue_position(size, directory):
+    manager = _queue_manager(size, directory)
+    last_id = manager.reservations[-1]['id']
+    return lambda: manager.get_queue_position(last_id)
+
+
+def estimate_wait_time(size, directory):
+    manager = _queue_manager(size, directory)
+    return lambda: manager.estimate_wait_time({'service_type': 'dine-in', 'party_size': 2})
+
+
+def analytics(size, directory):
+    manager = _queue_manager(size, directory)
+    return manager.get_analytics
+
+
+def export_json(size, directory):
+    manager = _queue_manager(size, directory)
+    return lambda: manager.export_data('json')
+
+
+def export_csv(size, directory):
+    manager = _queue_manager(size, directory)
+    return lambda: manager.export_data('csv')
+
+
+def reservation_to_dict(size, directory):
+    rows = [
+        Reservation(
+            id=reservation['id'], venue='main', ticket_number=reservation['id'], name=reservation['name'],
+            phone=reservation['phone'], party_size=reservation['party_size'],
+            service_type=reservation['service_type'], location='main-hall', status=reservation['status'],
+            created_at=reservation['created_at']
+        )
+        for reservation in _reservations(size)
+    ]
+    return lambda: [row.to_dict() for row in rows]
+
+
+def queue_priority(size, directory):
+    waiting = _reservations(size)
+    now = datetime.now()
+    return lambda: queue_reads.next_by_priority(waiting, now)
+
+
+def queue_predictions(size, directory):
+    waiting = _reservations(size)
+    estimator = QueueingEstimator(services)
+    busy = np.append(estimator.servers[:-1], 0)
+
+    def run():
+        waits = estimator.queue_waits(waiting, busy)
+        return [
+            {'reservation_id': reservation['id'], 'estimated_wait': round(float(wait), 1)}
+            for reservation, wait in zip(waiting, waits)
+        ]
+    return run
+
+
+CASES = {
+    'add_reservation': add_reservation,
+    'queue_position': queue_position,
+    'estimate_wait_time': estimate_wait_time,
+    'analytics': analytics,
+    'export_json': export_json,
+    'export_csv': export_csv,
+    'reservation_to_dict': reservation_to_dict,
+    'queue_priority': queue_priority,
+    'queue_predictions': queue_predictions
+}
+
+
+def measure(func, repeat) -> float:
+    """Best microseconds per call over repeat loops long enough to time reliably"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(path, results):
+    merged = dict(load_baseline(path), **results)
+    with open(path, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'saved': datetime.now().isoformat(timespec='seconds'),
+            'results': dict(sorted(merged.items()))
+        }, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help='case to run (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='record the results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='exit 1 if a case regressed beyond --threshold')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results, rows, regressed = {}, [], []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.case or CASES:
+            for size in args.sizes:
+                key = f'{name}/{size}'
+                micros = results[key] = measure(CASES[name](size, directory), args.repeat)
+                before = baseline.get(key)
+                if before is None:
+                    change, status = '', 'new'
+                else:
+                    ratio = micros / before
+                    change = f'{(ratio - 1) * 100:+.0f}%'
+                    status = 'REGRESSED' if ratio > 1 + args.threshold else 'ok'
+                    if status == 'REGRESSED':
+                        regressed.append(key)
+                rows.append((name, size, f'{micros:,.1f}', f'{before:,.1f}' if before else '', change, status))
+                print(f'  {key}: {micros:,.1f} us', file=sys.stderr)
+
+    print_table(['case', 'size', 'us per call', 'baseline us', 'change', 'status'], rows)
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f'Saved {len(results)} results to {args.baseline}')
+    if args.check and regressed:
+        print(f"{len(regressed)} regressed beyond {args.threshold:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
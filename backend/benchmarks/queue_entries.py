@@ -0,0 +1,139 @@
+"""Memory per entry and scan time for the in-memory queue representation.
+
+Compares Reservation.to_dict()-style dicts, as the queue used to be kept,
+with the compact QueueEntry records and incrementally maintained counts the
+queue shards use now. No database is needed.
+
+    python -m benchmarks.queue_entries --entries 10000 100000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from benchmarks import print_table
+from queue_engine import QueueShard
+from queue_entries import QueueEntry, STATUSES
+
+_SERVICE_TYPES = ('dine-in', 'takeout', 'delivery')
+_LOCATIONS = ('Main Dining', 'Outdoor', 'Private Room', 'Takeout Counter')
+
+
+def _reservations(count):
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=index + 1,
+            ticket_number=index + 1,
+            initial_position=index + 1,
+            name=f'Guest {index}',
+            phone=f'555-{index:07d}',
+            email=f'guest{index}@example.com',
+            party_size=index % 8 + 1,
+            service_type=_SERVICE_TYPES[index % 3],
+            location=_LOCATIONS[index % 4],
+            status='waiting' if index % 5 else 'seated',
+            notes=None,
+            created_at=now - timedelta(seconds=count - index),
+            updated_at=None,
+            completed_at=None,
+            seated_at=now - timedelta(seconds=count - index) if index % 5 == 0 else None,
+            no_show_at=None,
+            scheduled_start=None,
+            scheduled_end=None
+        )
+        for index in range(count)
+    ]
+
+
+def _as_dict(reservation):
+    return {
+        'id': reservation.id,
+        'venue': 'main',
+        'ticket_number': reservation.ticket_number,
+        'initial_position': reservation.initial_position,
+        'name': reservation.name,
+        'phone': reservation.phone,
+        'email': reservation.email,
+        'party_size': reservation.party_size,
+        'service_type': reservation.service_type,
+        'location': reservation.location,
+        'status': reservation.status,
+        'notes': reservation.notes,
+        'created_at': reservation.created_at.isoformat(),
+        'updated_at': None,
+        'completed_at': None,
+        'seated_at': reservation.seated_at.isoformat() if reservation.seated_at else None,
+        'no_show_at': None,
+        'scheduled_start': None,
+        'scheduled_end': None,
+        'wait_time': None
+    }
+
+
+def _measure(build):
+    """(result, bytes allocated by build)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    memory_rows, scan_rows = [], []
+    for count in args.entries:
+        reservations = _reservations(count)
+
+        dicts, dict_bytes = _measure(lambda: {r.id: _as_dict(r) for r in reservations})
+        entries, entry_bytes = _measure(lambda: {r.id: QueueEntry.from_reservation(r) for r in reservations})
+        # Names and contact details are the same strings in both forms, so this
+        # is the per-entry overhead the representation itself adds
+        memory_rows.append((
+            count,
+            f'{dict_bytes / count:,.0f}',
+            f'{entry_bytes / count:,.0f}',
+            f'{dict_bytes / entry_bytes:.1f}x'
+        ))
+
+        shard = QueueShard('main')
+        shard._loaded = True
+        for entry in entries.values():
+            shard._cache(entry)
+        waiting = STATUSES.code('waiting')
+
+        dict_scan = _best_of(lambda: len([e for e in dicts.values() if e['status'] == 'waiting']), args.repeat)
+        slot_scan = _best_of(lambda: sum(1 for e in entries.values() if e.status_code == waiting), args.repeat)
+        counted = _best_of(lambda: (shard.waiting_count(), shard.count('waiting', 'takeout', 'Outdoor')), args.repeat)
+        scan_rows.append((
+            count,
+            f'{dict_scan * 1e3:.2f}',
+            f'{slot_scan * 1e3:.2f}',
+            f'{counted * 1e6:.1f}'
+        ))
+
+    print('Memory per entry (bytes)')
+    print_table(['entries', 'dict', 'QueueEntry', 'reduction'], memory_rows)
+    print()
+    print('Waiting count')
+    print_table(['entries', 'dict scan ms', 'QueueEntry scan ms', 'incremental count us'], scan_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Latency of estimating every waiting party's wait at once.
+
+Compares the Erlang-C estimator's single vectorised pass with the per-entry
+position heuristic that /api/queue/status used before, and with the
+random forest predicting the same queue as one feature matrix. No database
+is needed.
+
+    python -m benchmarks.queueing --queue 10 100 1000 10000
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks import print_table
+from features import SERVICE_TYPES, WaitTimeModel, encode_many
+from queueing import QueueingEstimator, ahead_by_service
+from services import services
+
+
+def _queue(size, seed=5):
+    rng = np.random.default_rng(seed)
+    service_types = rng.choice(SERVICE_TYPES.categories, size, p=[0.6, 0.25, 0.15])
+    party_sizes = np.where(service_types == 'dine-in', rng.integers(1, 9, size), 1)
+    return service_types, party_sizes
+
+
+def _heuristic(service_types, party_sizes, average_wait=45.0):
+    """The old per-position loop: (i + 1) x average wait x party and service multipliers"""
+    predictions = []
+    for i, (service_type, party_size) in enumerate(zip(service_types, party_sizes)):
+        wait = (i + 1) * average_wait
+        if party_size > 4:
+            wait *= 1.2
+        elif party_size > 2:
+            wait *= 1.1
+        if service_type == 'dine-in':
+            wait *= 1.1
+        elif service_type == 'delivery':
+            wait *= 0.9
+        predictions.append(wait * random.uniform(0.9, 1.1))
+    return predictions
+
+
+def _erlang(estimator, busy):
+    def run(service_types, party_sizes):
+        codes = SERVICE_TYPES.encode_many(service_types)
+        return estimator.waits(ahead_by_service(codes), codes, busy)
+    return run
+
+
+def _forest(model):
+    def run(service_types, party_sizes):
+        size = len(service_types)
+        features = encode_many(np.arange(size), party_sizes, service_types, np.full(size, datetime.utcnow()))
+        return model.predict(features)
+    return run
+
+
+def _best_of(func, args, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queue', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    estimator = QueueingEstimator(services)
+    busy = estimator.servers.copy()
+    strategies = (
+        ('position heuristic', _heuristic),
+        ('Erlang-C vector', _erlang(estimator, busy)),
+        ('random forest', _forest(WaitTimeModel._default_model()))
+    )
+    rows = []
+    for size in args.queue:
+        queue = _queue(size)
+        for name, func in strategies:
+            seconds = _best_of(func, queue, args.repeat)
+            rows.append((size, name, f'{seconds * 1e6:.0f}', f'{seconds / size * 1e6:.2f}'))
+
+    single = _best_of(lambda: estimator.predict_one(3, 2, 'dine-in'), (), 1000)
+    print(f'Erlang-C predict_one: {single * 1e6:.1f} us')
+    print_table(['queue', 'strategy', 'whole queue us', 'us per party'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Throughput of concurrent /api/queue/status polls with and without the response cache.
+
+Each client thread renders the queue status payload for a waiting line of
+--queue parties: priority ranking, Erlang-C predictions and JSON
+encoding, without the database queries. Every --write-every seconds the
+queue version is bumped, as a check-in would. Compares TTL 0 (no cache)
+with the configured TTLs, and reports how many renders actually ran.
+No database is needed.
+
+    python -m benchmarks.response_cache --clients 50 --seconds 3 --ttl 0 1
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import Flask
+
+from benchmarks import print_table
+from benchmarks.micro import _reservations
+from fast_json import json_response
+from queueing import QueueingEstimator
+import queue_reads
+from response_cache import ResponseCache
+from services import services
+
+
+def _run(app, cache, waiting, clients, seconds, write_every):
+    estimator = QueueingEstimator(services)
+    busy = np.append(estimator.servers[:-1], 0)
+    renders = [0]
+    version = [0]
+
+    def render():
+        renders[0] += 1
+        now = datetime.now()
+        waits = estimator.queue_waits(waiting, busy)
+        return json_response({
+            'next': queue_reads.next_by_priority(waiting, now),
+            'estimated_wait_time': round(float(waits.mean()), 1),
+            'total_waiting': len(waiting),
+            'predictions': [
+                {'reservation_id': reservation['id'], 'estimated_wait': round(float(wait), 1)}
+                for reservation, wait in zip(waiting, waits)
+            ],
+            'last_updated': now,
+            'version': version[0]
+        })
+
+    deadline = time.perf_counter() + seconds
+    served = [0] * clients
+
+    def client(index):
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                cache.respond(('queue/status', 'main'), version[0], render)
+                served[index] += 1
+
+    def writer():
+        while time.perf_counter() < deadline:
+            time.sleep(write_every)
+            version[0] += 1
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    threads.append(threading.Thread(target=writer, daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads[:-1]:
+        thread.join()
+    return sum(served), renders[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--queue', type=int, default=200, help='parties waiting')
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--write-every', type=float, default=0.5, help='seconds between queue changes')
+    parser.add_argument('--ttl', type=float, nargs='+', default=[0, 1])
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    waiting = _reservations(args.queue)
+    rows = []
+    for ttl in args.ttl:
+        cache = ResponseCache(ttl=ttl)
+        served, renders = _run(app, cache, waiting, args.clients, args.seconds, args.write_every)
+        stats = cache.stats()
+        rows.append((
+            ttl, f'{served / args.seconds:,.0f}', renders,
+            stats['hits'], stats['stale'], stats['coalesced'], stats['invalidations']
+        ))
+    print(f'{args.clients} clients, {args.queue} waiting, a queue change every {args.write_every}s')
+    print_table(['ttl s', 'responses/s', 'renders', 'hits', 'stale', 'coalesced', 'invalidations'], rows)
+
+
+if __name__ == '__main__':
+    main()
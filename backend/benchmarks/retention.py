@@ -0,0 +1,87 @@
+"""Resident memory of a worker's in-process state over a simulated week.
+
+Feeds days of check-ins and finished reservations through the check-in
+analytics and the wait model's feature store, once as they were before
+(per-day dicts and an unbounded store) and once with RollingStats and a
+store capped at --max-rows. Each variant runs in a fresh process so its
+resident set size is its own. No database is needed.
+
+    python -m benchmarks.retention --days 7 --per-day 50000
+"""
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks import print_table
+from features import N_FEATURES, FeatureStore
+from retention import RollingStats, resident_bytes
+
+SERVICES = ('dine-in', 'takeout', 'delivery')
+
+
+class _DailyDicts:
+    """The analytics dict app.py used to keep: a new key per day, never dropped"""
+
+    def __init__(self):
+        self.daily_stats = defaultdict(lambda: {
+            'total_customers': 0,
+            'average_wait_time': 0,
+            'service_type_distribution': defaultdict(int)
+        })
+        self.hourly_stats = defaultdict(lambda: defaultdict(int))
+
+    def record(self, service_type, wait_time, when):
+        day = self.daily_stats[when.strftime('%Y-%m-%d')]
+        day['total_customers'] += 1
+        day['service_type_distribution'][service_type] += 1
+        self.hourly_stats[when.strftime('%Y-%m-%d')][when.hour] += 1
+        day['average_wait_time'] += (wait_time - day['average_wait_time']) / day['total_customers']
+
+
+def _simulate(bounded, days, per_day, max_rows):
+    """Resident bytes after each simulated day"""
+    stats = RollingStats(days=7) if bounded else _DailyDicts()
+    store = FeatureStore(max_rows=max_rows if bounded else None)
+    rng = np.random.default_rng(7)
+    start = datetime(2024, 1, 1)
+    next_id = 0
+    resident = []
+    for day in range(days):
+        seconds = np.sort(rng.integers(0, 86400, per_day))
+        services = rng.choice(SERVICES, per_day).tolist()
+        waits = rng.gamma(2.0, 10.0, per_day).tolist()
+        features = rng.random((per_day, N_FEATURES)).astype(np.float32)
+        midnight = start + timedelta(days=day)
+        for index, second in enumerate(seconds.tolist()):
+            stats.record(services[index], waits[index], midnight + timedelta(seconds=second))
+            store.append(next_id, features[index], waits[index])
+            next_id += 1
+        resident.append(resident_bytes())
+    return resident
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--per-day', type=int, default=50000)
+    parser.add_argument('--max-rows', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, bounded in (('unbounded', False), ('bounded', True)):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results[name] = pool.submit(_simulate, bounded, args.days, args.per_day, args.max_rows).result()
+
+    rows = [
+        (day + 1, f"{results['unbounded'][day] / 2 ** 20:.1f}", f"{results['bounded'][day] / 2 ** 20:.1f}")
+        for day in range(args.days)
+    ]
+    print(f'{args.per_day} check-ins per day, store capped at {args.max_rows} rows')
+    print_table(['day', 'unbounded RSS MiB', 'bounded RSS MiB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Typeahead latency of the host search index.
+
+Indexes reservations from the synthetic history generator and times typical host queries (name
+prefixes, full names, the last digits of a phone number, an email fragment)
+against the index and against a linear scan of the same records, which is
+what a SQL LIKE '%...%' amounts to. No database is needed.
+
+    python -m benchmarks.search_index --entries 10000 100000
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+from benchmarks import print_table
+from queue_entries import QueueEntry
+from search_index import SearchIndex, query_terms
+import seeding
+
+def _entries(count):
+    rows = next(seeding.batched(seeding.generate(days=count // 200 + 1), count))
+    return [
+        QueueEntry.from_reservation(SimpleNamespace(id=index + 1, scheduled_start=None, scheduled_end=None, **row))
+        for index, row in enumerate(rows)
+    ]
+
+
+def _scan(entries, query, limit=10):
+    """Linear substring scan over every record"""
+    terms = query_terms(query)
+    matches = []
+    for entry in entries:
+        fields = ((entry.name or '').lower(), ''.join(c for c in entry.phone if c.isdigit()), (entry.email or '').lower())
+        if all(any(term in text for text in fields) for term in terms):
+            matches.append(entry)
+    return matches[:limit]
+
+
+def _timings(func, queries, repeat):
+    """(median, worst) seconds per query over the best of repeat runs"""
+    per_query = []
+    for query in queries:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(query)
+            best = min(best, time.perf_counter() - start)
+        per_query.append(best)
+    per_query.sort()
+    return per_query[len(per_query) // 2], per_query[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    build_rows, query_rows = [], []
+    for count in args.entries:
+        entries = _entries(count)
+        index = SearchIndex()
+        start = time.perf_counter()
+        index.load(entries)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for entry in entries[:1000]:
+            index.remove(entry.id)
+            index.add(entry)
+        update_us = (time.perf_counter() - start) / 2000 * 1e6
+        build_rows.append((count, f'{load_seconds:.2f}', f'{update_us:.1f}'))
+
+        sample = entries[count // 2]
+        queries = {
+            'name prefix': ['ma', 'sch', 'oka', 'ngu', 'pri'],
+            'full name': [sample.name, 'maria garcia', 'wei chen', 'liam murphy', 'yuki tanaka'],
+            'phone digits': [sample.phone[-4:], sample.phone[-7:], '4253', sample.phone, '0000'],
+            'email': [(sample.email or 'maria.g')[:8], 'chen@', '@outlook', 'hugo.no', 'ivan.k']
+        }
+        for kind, samples in queries.items():
+            indexed = _timings(lambda q: index.search(q, 10), samples, args.repeat)
+            scanned = _timings(lambda q: _scan(entries, q), samples, max(1, args.repeat // 2))
+            query_rows.append((
+                count,
+                kind,
+                f'{indexed[0] * 1e6:.0f}',
+                f'{indexed[1] * 1e6:.0f}',
+                f'{scanned[0] * 1e3:.1f}'
+            ))
+
+    print('Index maintenance')
+    print_table(['entries', 'load s', 'update us'], build_rows)
+    print()
+    print('Query latency')
+    print_table(['entries', 'query', 'index p50 us', 'index max us', 'scan p50 ms'], query_rows)
+
+
+if __name__ == '__main__':
+    main()
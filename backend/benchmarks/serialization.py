@@ -0,0 +1,76 @@
+"""Rows per second for the queue list read path.
+
+Compares the ORM path (hydrate Reservation objects, to_dict(), stdlib json as
+used by jsonify) with the column-projection path (Core tuples serialized by
+fast_json) over an in-memory SQLite table.
+
+    python -m benchmarks.serialization --rows 1000 10000 50000
+"""
+import argparse
+import json
+import time
+
+from flask import Flask
+
+from benchmarks import print_table
+from db_config import init_database
+import fast_json
+from models import db, Reservation
+import queue_reads
+import seeding
+
+
+def _seed(count):
+    rows = next(seeding.batched(seeding.generate(days=count // 200 + 1), count))
+    db.session.execute(Reservation.__table__.insert(), rows)
+    db.session.commit()
+
+
+def orm_path():
+    reservations = Reservation.query.filter_by(venue='main').order_by(Reservation.created_at.desc()).all()
+    return json.dumps([reservation.to_dict() for reservation in reservations]).encode('utf-8')
+
+
+def projection_path():
+    return fast_json.dumps(queue_reads.venue_queue('main'))
+
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    init_database(app, db, url='sqlite://')
+    rows = []
+    with app.app_context():
+        for count in args.rows:
+            db.drop_all()
+            db.create_all()
+            _seed(count)
+            orm_time = _best_of(orm_path, args.repeat)
+            projection_time = _best_of(projection_path, args.repeat)
+            rows.append((
+                count,
+                f'{count / orm_time:,.0f}',
+                f'{count / projection_time:,.0f}',
+                f'{orm_time / projection_time:.1f}x'
+            ))
+
+    print(f"encoder: {'orjson' if fast_json.orjson else 'stdlib json'}")
+    print_table(['rows', 'ORM + to_dict rows/s', 'projection rows/s', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
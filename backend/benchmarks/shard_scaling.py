@@ -0,0 +1,81 @@
+"""Queue throughput as venue shards are added, one pinned worker process per shard.
+
+Each worker owns one venue shard, and all of them write to one shared
+database, as the deployed workers do. Every operation is an enqueue followed
+by a transition to 'seated', both written through to the database. By
+default each run gets a fresh SQLite file; pass --database-url to measure a
+server database instead.
+
+    python -m benchmarks.shard_scaling --shards 1 2 4 --seconds 3
+    python -m benchmarks.shard_scaling --database-url postgresql://localhost/queue_bench
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks import print_table
+
+
+def _app(url):
+    from flask import Flask
+    from db_config import init_database
+    from models import db
+
+    app = Flask(__name__)
+    init_database(app, db, url=url)
+    return app
+
+
+def _run_shard(args):
+    venue, url, seconds = args
+    from queue_engine import QueueShard
+
+    app = _app(url)
+    operations = 0
+    with app.app_context():
+        shard = QueueShard(venue)
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            entry = shard.enqueue(name='Bench Guest', party_size=2, service_type='dine-in', location='Main Dining')
+            shard.transition(entry['id'], 'seated')
+            operations += 1
+    return operations
+
+
+def run(shard_count, seconds, url):
+    from models import db
+
+    # Create the schema once, before the workers race to it
+    with _app(url).app_context():
+        db.create_all()
+    jobs = [(f'bench-{shard_count}-venue-{index}', url, seconds) for index in range(shard_count)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes=shard_count) as pool:
+        counts = pool.map(_run_shard, jobs)
+    return sum(counts) / seconds, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--database-url', help='shared database for every run (default: a new SQLite file per run)')
+    args = parser.parse_args(argv)
+
+    rows = []
+    baseline = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for shard_count in args.shards:
+            url = args.database_url or f"sqlite:///{os.path.join(workdir, f'shards{shard_count}.db')}"
+            throughput, _ = run(shard_count, args.seconds, url)
+            baseline = baseline or throughput
+            rows.append((shard_count, f'{throughput:.0f}', f'{throughput / shard_count:.0f}', f'{throughput / baseline:.2f}x'))
+
+    print(f'{args.seconds:g}s per run, {os.cpu_count()} CPUs')
+    print_table(['shards', 'ops/s', 'ops/s per shard', 'scaling'], rows)
+
+
+if __name__ == '__main__':
+    main()
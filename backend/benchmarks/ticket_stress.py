@@ -0,0 +1,115 @@
+"""Concurrency stress test for ticket allocation.
+
+Several processes, each running several threads with its own queue shard
+object, create reservations in one venue against a shared database. The run
+fails (exit status 1) unless ticket numbers and initial positions come out
+unique and dense.
+
+    python -m benchmarks.ticket_stress --processes 4 --threads 8 --per-thread 25
+    python -m benchmarks.ticket_stress --database-url postgresql://...
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+VENUE = 'stress'
+
+
+def _create_app(database_url):
+    from flask import Flask
+    from db_config import init_database
+    from models import db
+
+    app = Flask(__name__)
+    init_database(app, db, url=database_url)
+    return app, db
+
+
+def _run_process(args):
+    database_url, threads, per_thread = args
+    from queue_engine import QueueShard
+
+    app, db = _create_app(database_url)
+    shard = QueueShard(VENUE)
+    errors = []
+
+    def create_many():
+        with app.app_context():
+            for _ in range(per_thread):
+                try:
+                    shard.enqueue(name='Stress Guest', party_size=2, service_type='takeout',
+                                  location='Takeout Counter')
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append(repr(e))
+
+    workers = [threading.Thread(target=create_many) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--per-thread', type=int, default=25)
+    parser.add_argument('--database-url')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('SQLITE_BUSY_TIMEOUT', '60')
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'stress.db')}"
+        app, db = _create_app(database_url)
+        from models import Reservation, QueueCounter
+        with app.app_context():
+            db.create_all()
+            Reservation.query.filter_by(venue=VENUE).delete()
+            QueueCounter.query.filter_by(queue_key=VENUE).delete()
+            db.session.commit()
+            db.session.remove()
+            db.engine.dispose()  # don't share pooled connections with forked workers
+
+        expected = args.processes * args.threads * args.per_thread
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes=args.processes) as pool:
+            results = pool.map(_run_process, [(database_url, args.threads, args.per_thread)] * args.processes)
+        elapsed = time.perf_counter() - start
+
+        with app.app_context():
+            rows = db.session.query(Reservation.ticket_number, Reservation.initial_position).filter(
+                Reservation.venue == VENUE
+            ).all()
+            db.engine.dispose()
+
+    errors = [error for result in results for error in result]
+    tickets = sorted(ticket for ticket, _ in rows)
+    positions = sorted(position for _, position in rows)
+    dense = list(range(1, len(rows) + 1))
+
+    print(f'{args.processes} processes x {args.threads} threads x {args.per_thread} creates = {expected}')
+    print(f'created {len(rows)} reservations in {elapsed:.2f}s ({len(rows) / elapsed:.0f}/s), {len(errors)} errors')
+    failures = []
+    if len(rows) != expected:
+        failures.append(f'expected {expected} reservations, found {len(rows)}')
+    if tickets != dense:
+        failures.append(f'ticket numbers are not unique and dense ({len(set(tickets))} distinct)')
+    if positions != dense:
+        failures.append(f'initial positions are not unique and dense ({len(set(positions))} distinct)')
+    for error in errors[:5]:
+        print(f'  error: {error}')
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if failures:
+        sys.exit(1)
+    print('OK: tickets and initial positions are unique and dense')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Latency and accuracy of the compiled wait-time predictor.
+
+Trains the wait-time forest on synthetic history, tabulates it over the
+feature grid, and compares table lookups with live RandomForest.predict on
+the same random check-ins.
+
+    python -m benchmarks.wait_model --rows 5000 --queries 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks import print_table
+from features import FeatureStore, WaitTimeModel, SERVICE_TYPES, encode_many
+
+
+def _history(rows, rng):
+    queue_lengths = rng.integers(0, 60, rows)
+    party_sizes = rng.integers(1, 21, rows)
+    service_types = rng.choice(SERVICE_TYPES.categories, rows)
+    start = np.datetime64(datetime.utcnow() - timedelta(days=28), 'm')
+    times = start + rng.integers(0, 28 * 24 * 60, rows).astype('timedelta64[m]')
+    hours = (times.astype(np.int64) % (24 * 60)) // 60
+    # Roughly 4 minutes per party ahead, longer for big parties and at dinner time
+    targets = queue_lengths * 4 + party_sizes * 0.8 + (hours >= 18) * 10 + rng.normal(0, 3, rows)
+    return encode_many(queue_lengths, party_sizes, service_types, times), targets.astype(np.float32)
+
+
+def _percentile_us(samples, q):
+    return f'{np.percentile(samples, q) * 1e6:.1f}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help='training rows')
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    store = FeatureStore()
+    features, targets = _history(args.rows, rng)
+    store.extend(list(range(args.rows)), features, targets)
+
+    with tempfile.TemporaryDirectory() as directory:
+        model = WaitTimeModel(store, mode='live', table_path=os.path.join(directory, 'table.npy'))
+        model._loaded = True  # history comes from the synthetic store, not the database
+        model.fit()
+
+        start = time.perf_counter()
+        model.compiled = model.compile(model.model)
+        compile_time = time.perf_counter() - start
+
+        now = datetime.utcnow()
+        queries = [
+            (int(rng.integers(0, 80)), int(rng.integers(1, 21)), str(rng.choice(SERVICE_TYPES.categories)),
+             now + timedelta(minutes=int(rng.integers(0, 7 * 24 * 60))))
+            for _ in range(args.queries)
+        ]
+
+        live, compiled = [], []
+        live_times, compiled_times = [], []
+        for query in queries:
+            compiled_model, model.compiled = model.compiled, None
+            start = time.perf_counter()
+            live.append(model.predict_one(*query))
+            live_times.append(time.perf_counter() - start)
+            model.compiled = compiled_model
+
+            start = time.perf_counter()
+            compiled.append(model.predict_one(*query))
+            compiled_times.append(time.perf_counter() - start)
+
+        table = model.compiled.table
+        error = np.abs(np.array(live) - np.array(compiled))
+
+    print(f"grid {table.shape}, {table.nbytes / 1e6:.1f} MB, compiled in {compile_time:.1f}s")
+    print(f"max |live - compiled| = {error.max():.6f} min over {args.queries} check-ins")
+    print_table(['predictor', 'p50 us', 'p99 us', 'mean us'], [
+        ('RandomForest.predict', _percentile_us(live_times, 50), _percentile_us(live_times, 99),
+         f'{np.mean(live_times) * 1e6:.1f}'),
+        ('compiled table', _percentile_us(compiled_times, 50), _percentile_us(compiled_times, 99),
+         f'{np.mean(compiled_times) * 1e6:.1f}')
+    ])
+
+
+if __name__ == '__main__':
+    main()
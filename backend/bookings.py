@@ -0,0 +1,211 @@
+import heapq
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# Booking statuses that still hold their seats
+HOLDING_STATUSES = ('booked', 'waiting', 'seated', 'completed', 'served')
+
+# Bookings are stored and indexed in naive UTC. Operating hours and the days
+# guests pick are the venue's local time in this zone.
+VENUE_TIMEZONE = ZoneInfo(os.getenv('VENUE_TIMEZONE', 'UTC'))
+
+
+class Booking(NamedTuple):
+    location: str
+    start: datetime
+    end: datetime
+    party_size: int
+
+
+def slot_of(when: datetime) -> int:
+    return (when.hour * 60 + when.minute) // SLOT_MINUTES
+
+
+def slot_time(day: date, slot: int) -> datetime:
+    return datetime.combine(day, datetime.min.time()) + timedelta(minutes=SLOT_MINUTES * slot)
+
+
+def slots_for(minutes) -> int:
+    """Whole slots needed to cover a duration"""
+    return max(1, -(-int(minutes) // SLOT_MINUTES))
+
+
+def align(when: datetime) -> datetime:
+    """Round a time down to the start of its slot"""
+    return when.replace(minute=when.minute - when.minute % SLOT_MINUTES, second=0, microsecond=0)
+
+
+def to_utc(value: str) -> datetime:
+    """Parse an ISO date and time into naive UTC; one without an offset is taken as UTC.
+
+    Raises ValueError for anything that is not a valid ISO date and time.
+    """
+    if not isinstance(value, str):
+        raise ValueError('expected an ISO date and time string')
+    when = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if when.tzinfo is not None:
+        try:
+            when = when.astimezone(timezone.utc).replace(tzinfo=None)
+        except OverflowError as e:
+            raise ValueError(str(e)) from e
+    return when
+
+
+def as_utc(when: datetime) -> datetime:
+    """A naive UTC time marked as UTC, so it serializes with its offset"""
+    return when.replace(tzinfo=timezone.utc)
+
+
+def opening_window(day: date, opens: time, closes: time, zone=VENUE_TIMEZONE) -> Tuple[datetime, datetime]:
+    """Naive UTC bounds of a venue-local day's operating hours; closing at or before opening means after midnight"""
+    start = datetime.combine(day, opens, zone)
+    end = datetime.combine(day + timedelta(days=1) if closes <= opens else day, closes, zone)
+    return (start.astimezone(timezone.utc).replace(tzinfo=None),
+            end.astimezone(timezone.utc).replace(tzinfo=None))
+
+
+class SlotIndex:
+    """Seats booked per location and day in fixed 15-minute slots.
+
+    Each (location, day) keeps an int32 array of seats in use per slot, so
+    checking a booking or listing the free start times for a day is a few
+    vectorised array operations regardless of how many bookings exist. The
+    index is updated in step with every booking write and keeps a heap of
+    booking start times so due bookings can be found without a scan.
+    """
+
+    def __init__(self, capacity: Dict[str, int]):
+        self.capacity = dict(capacity)
+        self._used: Dict[tuple, np.ndarray] = {}  # (location, day) -> seats used per slot
+        self._bookings: Dict[int, Booking] = {}
+        self._starts: List[tuple] = []  # heap of (start, booking id)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bookings)
+
+    def __contains__(self, booking_id):
+        return booking_id in self._bookings
+
+    def _day(self, location, day) -> np.ndarray:
+        used = self._used.get((location, day))
+        if used is None:
+            used = self._used[(location, day)] = np.zeros(SLOTS_PER_DAY, dtype=np.int32)
+        return used
+
+    def _spans(self, start: datetime, end: datetime):
+        """(day, first slot, last slot + 1) pieces of [start, end), split at midnight"""
+        day = start.date()
+        first = slot_of(start)
+        while True:
+            day_end = slot_time(day, SLOTS_PER_DAY)
+            if end <= day_end:
+                last = slots_for((end - slot_time(day, 0)).total_seconds() / 60)
+                yield day, first, max(first + 1, last)
+                return
+            yield day, first, SLOTS_PER_DAY
+            day, first = day + timedelta(days=1), 0
+
+    def _apply(self, booking: Booking, sign: int):
+        for day, first, last in self._spans(booking.start, booking.end):
+            self._day(booking.location, day)[first:last] += sign * booking.party_size
+
+    def free_seats(self, location, start: datetime, end: datetime) -> int:
+        """Fewest free seats in any slot of [start, end)"""
+        capacity = self.capacity.get(location, 0)
+        with self._lock:
+            used = [
+                int(self._used[(location, day)][first:last].max()) if (location, day) in self._used else 0
+                for day, first, last in self._spans(start, end)
+            ]
+        return capacity - max(used)
+
+    def add(self, booking_id, booking: Booking) -> bool:
+        """Hold seats for a booking; returns False if it was already indexed"""
+        with self._lock:
+            if booking_id in self._bookings:
+                return False
+            self._bookings[booking_id] = booking
+            self._apply(booking, 1)
+            heapq.heappush(self._starts, (booking.start, booking_id))
+            return True
+
+    def fits(self, booking: Booking) -> bool:
+        """Whether the booking's location has party_size seats free for its whole interval"""
+        return booking.party_size <= self.free_seats(booking.location, booking.start, booking.end)
+
+    def release(self, booking_id) -> Optional[Booking]:
+        """Free a booking's seats"""
+        with self._lock:
+            booking = self._bookings.pop(booking_id, None)
+            if booking is not None:
+                self._apply(booking, -1)
+            return booking
+
+    def starting_before(self, when: datetime) -> List[int]:
+        """Pop ids of held bookings that start at or before when"""
+        due = []
+        with self._lock:
+            while self._starts and self._starts[0][0] <= when:
+                start, booking_id = heapq.heappop(self._starts)
+                booking = self._bookings.get(booking_id)
+                if booking is not None and booking.start == start:
+                    due.append(booking_id)
+        return due
+
+    def requeue(self, booking_ids) -> None:
+        """Push popped ids back onto the start heap, e.g. when promoting them failed"""
+        with self._lock:
+            for booking_id in booking_ids:
+                booking = self._bookings.get(booking_id)
+                if booking is not None:
+                    heapq.heappush(self._starts, (booking.start, booking_id))
+
+    def availability(self, opens: datetime, closes: datetime, party_size: int, duration_slots: int,
+                     locations=None, not_before: Optional[datetime] = None) -> List[Dict]:
+        """Start times in [opens, closes) where party_size seats stay free for duration_slots slots.
+
+        The window may cross midnight, e.g. a venue's local day in UTC.
+        """
+        opens = align(opens + timedelta(minutes=SLOT_MINUTES) - timedelta(microseconds=1))
+        spans = list(self._spans(opens, closes)) if opens < closes else []
+        n_slots = sum(last - first for _, first, last in spans)
+        first_start = 0
+        if not_before is not None and not_before >= opens:
+            first_start = (align(not_before) - opens) // timedelta(minutes=SLOT_MINUTES) + 1
+        last_start = n_slots - duration_slots
+        if last_start < first_start:
+            return []
+
+        free = []
+        with self._lock:
+            for location in locations or self.capacity:
+                capacity = self.capacity.get(location, 0)
+                if party_size > capacity:
+                    continue
+                seats = np.full(n_slots, capacity, dtype=np.int32)
+                offset = 0
+                for day, first, last in spans:
+                    used = self._used.get((location, day))
+                    if used is not None:
+                        seats[offset:offset + last - first] -= used[first:last]
+                    offset += last - first
+                # Fewest free seats over each window of duration_slots starting at every slot
+                window_min = sliding_window_view(seats, duration_slots).min(axis=1)[first_start:last_start + 1]
+                for index in np.flatnonzero(window_min >= party_size):
+                    free.append({
+                        'start': opens + timedelta(minutes=SLOT_MINUTES * (first_start + int(index))),
+                        'location': location,
+                        'seatsFree': int(window_min[index])
+                    })
+        free.sort(key=lambda item: item['start'])
+        return free
@@ -0,0 +1,48 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+
+def grid_shape(max_queue_length, max_party_size, n_service_types):
+    """Table dimensions, in features.FEATURE_NAMES order"""
+    return (max_queue_length + 1, max_party_size + 1, n_service_types, 24, 7)
+
+
+def compile_model(model, max_queue_length, max_party_size, n_service_types, chunk_rows=200000) -> np.ndarray:
+    """Evaluate model over every point of the feature grid into a float32 table"""
+    shape = grid_shape(max_queue_length, max_party_size, n_service_types)
+    table = np.empty(int(np.prod(shape)), dtype=np.float32)
+    for start in range(0, len(table), chunk_rows):
+        flat = np.arange(start, min(start + chunk_rows, len(table)))
+        features = np.stack(np.unravel_index(flat, shape), axis=1).astype(np.float32)
+        table[start:start + len(flat)] = model.predict(features)
+    return table.reshape(shape)
+
+
+class CompiledPredictor:
+    """Wait-time predictions read from a precomputed table.
+
+    lookup() returns None for inputs outside the grid (or an unknown service
+    type) so the caller can fall back to the full model.
+    """
+
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        self.shape = table.shape
+
+    def lookup(self, queue_length, party_size, service_code, hour, weekday) -> Optional[float]:
+        max_queue, max_party, services = self.shape[0], self.shape[1], self.shape[2]
+        if not (0 <= queue_length < max_queue and 0 <= party_size < max_party and 0 <= service_code < services):
+            return None
+        return float(self.table[queue_length, party_size, service_code, hour, weekday])
+
+    def save(self, path):
+        """Write the table as .npy so other processes can memory-map it"""
+        tmp_path = f'{path}.tmp.npy'
+        np.save(tmp_path, self.table)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True) -> 'CompiledPredictor':
+        return cls(np.load(path, mmap_mode='r' if mmap else None))
@@ -0,0 +1,146 @@
+"""Admin dashboard panels.
+
+/api/admin/dashboard answers every panel in one response. The SQL
+sub-queries run concurrently on a bounded thread pool, each worker in its
+own app context and therefore on its own session and connection. Results
+that several panels need are computed once: the waiting set comes from the
+venue's queue shard, and a single scan grouped by hour feeds both the peak
+hours and the wait-time trends.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import case, extract, func, select
+
+from models import db, Reservation
+import queue_reads
+
+PANELS = ('queue', 'analytics', 'waitTimes')
+
+reservations = Reservation.__table__
+
+
+def minutes_between(start, end):
+    """SQL expression for the minutes from start to end on the bound dialect"""
+    if db.engine.dialect.name == 'sqlite':
+        return (func.julianday(end) - func.julianday(start)) * 1440
+    return extract('epoch', end - start) / 60
+
+
+def service_totals(venue) -> List[tuple]:
+    """(service type, reservations) over all time"""
+    return db.session.execute(
+        select(reservations.c.service_type, func.count(reservations.c.id))
+        .where(reservations.c.venue == venue)
+        .group_by(reservations.c.service_type)
+    ).all()
+
+
+def daily_counts(venue, today, days=7) -> List[Dict]:
+    """Reservations created on each of the last `days` days, oldest first"""
+    first_day = today - timedelta(days=days - 1)
+    day = func.date(reservations.c.created_at)
+    counts = dict(
+        (str(created_on), count) for created_on, count in db.session.execute(
+            select(day, func.count(reservations.c.id))
+            .where(
+                reservations.c.venue == venue,
+                reservations.c.created_at >= datetime.combine(first_day, datetime.min.time())
+            )
+            .group_by(day)
+        )
+    )
+    dates = [(first_day + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+    return [{'date': date, 'count': counts.get(date, 0)} for date in dates]
+
+
+def hourly_stats(venue) -> Dict[int, tuple]:
+    """hour -> (reservations created, average and longest wait of completed ones in minutes)"""
+    hour = extract('hour', reservations.c.created_at)
+    completed_wait = case(
+        (reservations.c.status == 'completed',
+         minutes_between(reservations.c.created_at, reservations.c.completed_at)),
+        else_=None
+    )
+    rows = db.session.execute(
+        select(hour, func.count(reservations.c.id), func.avg(completed_wait), func.max(completed_wait))
+        .where(reservations.c.venue == venue)
+        .group_by(hour)
+    ).all()
+    return {int(hour): (count, avg_wait, max_wait) for hour, count, avg_wait, max_wait in rows if hour is not None}
+
+
+def peak_hours(forecast, hours: Dict[int, tuple], day) -> List[str]:
+    """Busiest hours from the arrival forecast, else the two busiest hours on record"""
+    peaks = forecast.peak_hours(day) if forecast else []
+    if peaks:
+        return peaks
+    busiest = sorted(hours.items(), key=lambda item: item[1][0], reverse=True)[:2]
+    return [f"{hour:02d}:00" for hour, _ in busiest] if busiest else ["12:00", "18:00"]
+
+
+def wait_time_trends(hours: Dict[int, tuple]) -> List[Dict]:
+    """Average and longest wait of completed reservations for every hour of the day"""
+    trends = []
+    for hour in range(24):
+        _, avg_wait, max_wait = hours.get(hour, (0, None, None))
+        trends.append({
+            'hour': hour,
+            'average_wait': round(float(avg_wait or 0), 2),
+            'max_wait': round(float(max_wait or 0), 2)
+        })
+    return trends
+
+
+def analytics(shard, totals, daily, peaks, max_capacity=50) -> Dict:
+    """The /api/analytics payload; waiting and seated figures come from the queue shard"""
+    waiting = shard.entries('waiting')
+    if waiting:
+        now_us = (datetime.utcnow() - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+        total_wait = sum(now_us - entry.created_us for entry in waiting) / 60e6
+        average_wait_time = f"{int(total_wait / len(waiting))} min"
+    else:
+        average_wait_time = "0 min"
+    seated = shard.status_count('seated')
+
+    return {
+        'totalReservations': sum(count for _, count in totals),
+        'averageWaitTime': average_wait_time,
+        'peakHours': peaks,
+        'currentCapacity': f"{int((seated / max_capacity) * 100)}%",
+        'dailyStats': daily,
+        'serviceTypeDistribution': [{'name': name, 'value': count} for name, count in totals]
+    }
+
+
+def build(app, shard, forecaster, panels, executor) -> Dict:
+    """Compute the requested panels, running the SQL sub-queries on executor"""
+    venue = shard.venue
+
+    def in_context(func, *args):
+        with app.app_context():
+            return func(*args)
+
+    def submit(func, *args):
+        return executor.submit(in_context, func, *args)
+
+    # Start every query the panels need before waiting on any of them
+    version = shard.changes.version
+    queue = submit(queue_reads.venue_queue, venue) if 'queue' in panels else None
+    if 'analytics' in panels:
+        totals = submit(service_totals, venue)
+        daily = submit(daily_counts, venue, datetime.now().date())
+    forecast = forecaster.table(venue) if 'analytics' in panels else None
+    today = datetime.utcnow().date()
+    needs_hours = 'waitTimes' in panels or ('analytics' in panels and not (forecast and forecast.peak_hours(today)))
+    hours = submit(hourly_stats, venue) if needs_hours else None
+
+    result = {'venue': venue, 'queueVersion': shard.changes.token(version)}
+    if queue is not None:
+        result['queue'] = queue.result()
+    if 'analytics' in panels:
+        peaks = peak_hours(forecast, hours.result() if hours else {}, today)
+        result['analytics'] = analytics(shard, totals.result(), daily.result(), peaks)
+    if 'waitTimes' in panels:
+        result['waitTimes'] = wait_time_trends(hours.result())
+    return result
@@ -0,0 +1,152 @@
+import os
+from sqlalchemy import create_engine, event, inspect
+
+DEFAULT_DATABASE_URL = 'sqlite:///app.db'
+
+
+def get_profiles():
+    """Named engine profiles.
+
+    Tunables are read from the environment on each call (after load_dotenv) so
+    the same code runs locally on SQLite and on Render against Postgres.
+    """
+    return {
+        'sqlite': {
+            'engine_options': {
+                'connect_args': {
+                    'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', 5)),  # seconds
+                    'check_same_thread': False
+                }
+            },
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': int(float(os.getenv('SQLITE_BUSY_TIMEOUT', 5)) * 1000),  # ms
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+                'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 64 * 1024)),
+                'temp_store': 'MEMORY'
+            }
+        },
+        'sqlite-default': {
+            # Stock rollback-journal SQLite, kept as a baseline for benchmarks
+            'engine_options': {
+                'connect_args': {'check_same_thread': False}
+            },
+            'pragmas': {}
+        },
+        'postgres': {
+            'engine_options': {
+                'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+                'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+                'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+                'pool_pre_ping': True,
+                'connect_args': {
+                    'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+                    'options': '-c statement_timeout={} -c idle_in_transaction_session_timeout={}'.format(
+                        int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 5000)),
+                        int(os.getenv('DB_IDLE_TX_TIMEOUT_MS', 30000))
+                    )
+                }
+            },
+            'pragmas': {}
+        }
+    }
+
+
+def normalize_database_url(url):
+    """Render hands out postgres:// URLs, which SQLAlchemy 1.4 no longer accepts"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def detect_profile(url):
+    """Pick the engine profile matching a database URL"""
+    if url.startswith('sqlite'):
+        return 'sqlite'
+    if url.startswith('postgresql'):
+        return 'postgres'
+    raise ValueError(f"No engine profile for database URL: {url}")
+
+
+def engine_options(profile):
+    """Return the create_engine() keyword arguments for a profile"""
+    profiles = get_profiles()
+    if profile not in profiles:
+        raise ValueError(f"Unknown engine profile: {profile}")
+    options = dict(profiles[profile]['engine_options'])
+    options['connect_args'] = dict(options.get('connect_args', {}))
+    return options
+
+
+def attach_pragmas(engine, profile):
+    """Run the profile's PRAGMA statements on every new SQLite connection"""
+    pragmas = get_profiles()[profile]['pragmas']
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def create_profiled_engine(url, profile=None):
+    """Create a standalone engine with a named profile (used by scripts and benchmarks)"""
+    url = normalize_database_url(url)
+    profile = profile or detect_profile(url)
+    engine = create_engine(url, **engine_options(profile))
+    attach_pragmas(engine, profile)
+    return engine
+
+
+def init_database(app, db, url=None, profile=None):
+    """Configure a Flask app's database from DATABASE_URL and DB_PROFILE and bind db to it.
+
+    The profile is detected from the URL unless DB_PROFILE names one explicitly.
+    """
+    url = normalize_database_url(url or os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL))
+    profile = profile or os.getenv('DB_PROFILE') or detect_profile(url)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(profile)
+    app.config['DB_PROFILE'] = profile
+
+    db.init_app(app)
+    with app.app_context():
+        # The engine is created lazily without connecting, so the pragma
+        # listener is in place before the first connection is opened.
+        attach_pragmas(db.engine, profile)
+    return profile
+
+
+def upgrade_schema(db):
+    """Add model columns missing from existing tables.
+
+    db.create_all() only creates missing tables, so databases created before a
+    column was added need an ALTER TABLE. Must run inside an app context.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = inspector.get_table_names()
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            default = ''
+            if column.server_default is not None:
+                default = f" DEFAULT '{column.server_default.arg}'"
+            with db.engine.begin() as conn:
+                conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}'))
+            added.append(f'{table.name}.{column.name}')
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    return added
@@ -0,0 +1,121 @@
+import os
+from typing import Dict, List, Optional
+
+# Threshold events, each fired at most once per ticket
+NEXT_IN_LINE = 'next_in_line'
+FIVE_MINUTES = 'five_minutes'
+
+# Weight of the newest gap between departures in the pace average
+PACE_SMOOTHING = 0.2
+# Relative pace change that is worth pushing to every client
+PACE_TOLERANCE = 0.1
+
+
+def service_pace(service_config) -> float:
+    """Minutes between departures when every service's servers are busy"""
+    parties_per_minute = sum(
+        config['servers'] / config['average_service_time'] for config in service_config.values()
+    )
+    return 1 / parties_per_minute
+
+
+class EtaTracker:
+    """Positions, ETAs and threshold crossings for the front of one waiting line.
+
+    The ETA of the entry at position p is p * pace, where pace is a running
+    average of the minutes between departures. When an entry joins or leaves
+    the line at some index, everyone behind it moves by one place; that is
+    sent as a single queue_shift event that clients apply to their own
+    position, so only entries inside the front window (positions that can
+    cross a threshold) are recomputed. A mutation therefore costs O(window)
+    however long the queue is.
+    """
+
+    def __init__(self, pace: float, next_positions=None, soon_minutes=None, max_window=50):
+        self.pace = pace
+        self.next_positions = next_positions or int(os.getenv('NOTIFY_NEXT_POSITIONS', 3))
+        self.soon_minutes = soon_minutes or float(os.getenv('NOTIFY_SOON_MINUTES', 5))
+        self.max_window = max_window
+        self._published_pace = pace
+        self._last_departure_us: Optional[int] = None
+        self._fired: Dict[int, set] = {}  # entry id -> thresholds already sent
+        self._events: List[tuple] = []  # (event name, payload) waiting to be published
+
+    def window(self) -> int:
+        """Number of front positions that may be at or past a threshold"""
+        soon = int(self.soon_minutes / self.pace)
+        return min(self.max_window, max(self.next_positions, soon))
+
+    def eta(self, position) -> float:
+        return round(position * self.pace, 1)
+
+    def moved(self, waiting, index, delta):
+        """An entry joined (delta=1) or left (delta=-1) the sorted waiting keys at index"""
+        self._events.append(('queue_shift', {
+            # Entries that were at this position or later moved by delta
+            'fromPosition': index + 1 if delta > 0 else index + 2,
+            'delta': delta,
+            'minutesPerParty': round(self.pace, 2)
+        }))
+        self._refresh(waiting, index)
+
+    def departed(self, now_us, waiting):
+        """A waiting party was seated or served; update the pace from the gap since the last one"""
+        if self._last_departure_us is not None and waiting:
+            gap = (now_us - self._last_departure_us) / 60e6
+            # An idle stretch says nothing about how fast the line moves
+            gap = min(gap, 4 * self._published_pace)
+            self.pace = (1 - PACE_SMOOTHING) * self.pace + PACE_SMOOTHING * max(gap, 0.1)
+        self._last_departure_us = now_us if waiting else None
+
+        if abs(self.pace - self._published_pace) > PACE_TOLERANCE * self._published_pace:
+            self._published_pace = self.pace
+            self._events.append(('queue_shift', {
+                'fromPosition': 1,
+                'delta': 0,
+                'minutesPerParty': round(self.pace, 2)
+            }))
+            self._refresh(waiting, 0)
+
+    def _crossings(self, position, eta):
+        return ((NEXT_IN_LINE, position <= self.next_positions), (FIVE_MINUTES, eta <= self.soon_minutes))
+
+    def prime(self, waiting):
+        """Mark thresholds the front of a freshly loaded line is already past as sent.
+
+        Sent thresholds are only kept in memory, so after a restart or reload
+        they would otherwise be sent a second time.
+        """
+        for index in range(min(self.window(), len(waiting))):
+            position = index + 1
+            fired = self._fired.setdefault(waiting[index][1], set())
+            fired.update(threshold for threshold, crossed in self._crossings(position, self.eta(position)) if crossed)
+
+    def _refresh(self, waiting, start):
+        for index in range(start, min(self.window(), len(waiting))):
+            entry_id = waiting[index][1]
+            position = index + 1
+            eta = self.eta(position)
+            self._events.append(('eta_update', {
+                'entryId': entry_id,
+                'position': position,
+                'estimatedWaitTime': eta
+            }))
+            fired = self._fired.setdefault(entry_id, set())
+            for threshold, crossed in self._crossings(position, eta):
+                if crossed and threshold not in fired:
+                    fired.add(threshold)
+                    self._events.append(('queue_threshold', {
+                        'entryId': entry_id,
+                        'threshold': threshold,
+                        'position': position,
+                        'estimatedWaitTime': eta
+                    }))
+
+    def forget(self, entry_id):
+        """Drop the threshold history of a reservation that left the queue for good"""
+        self._fired.pop(entry_id, None)
+
+    def drain(self) -> List[tuple]:
+        events, self._events = self._events, []
+        return events
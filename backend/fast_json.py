@@ -0,0 +1,32 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, 'item'):  # numpy scalars
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Serialize to JSON bytes; datetimes are written in isoformat()"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status=200) -> Response:
+    """Drop-in replacement for jsonify() that skips Flask's stdlib encoder"""
+    return Response(dumps(obj), status=status, mimetype='application/json')
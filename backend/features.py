@@ -0,0 +1,387 @@
+import atexit
+import glob
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+from flask import current_app, has_app_context
+from sklearn.ensemble import RandomForestRegressor
+from sqlalchemy import select
+
+from compiled_predictor import CompiledPredictor, compile_model
+from models import db, Reservation
+
+# Column order of every feature vector used to train or query the wait-time model
+FEATURE_NAMES = ('queue_length', 'party_size', 'service_type', 'hour_of_day', 'day_of_week')
+N_FEATURES = len(FEATURE_NAMES)
+
+# Statuses whose reservations are recorded as training examples
+TRAINING_STATUSES = ('completed', 'served')
+
+
+class CategoryEncoder:
+    """Fixed category -> integer code mapping, identical in every process.
+
+    Codes follow the order of `categories`, so new categories must be appended.
+    Unknown values map to len(categories).
+    """
+
+    def __init__(self, categories: Sequence[str]):
+        self.categories = tuple(categories)
+        self._codes = {category: code for code, category in enumerate(self.categories)}
+        self.unknown = len(self.categories)
+
+    def encode(self, value) -> int:
+        return self._codes.get(value, self.unknown)
+
+    def encode_many(self, values: Iterable) -> np.ndarray:
+        return np.fromiter((self._codes.get(value, self.unknown) for value in values), dtype=np.int64)
+
+
+SERVICE_TYPES = CategoryEncoder(('dine-in', 'takeout', 'delivery'))
+
+
+def encode(queue_length, party_size, service_type, when: datetime) -> np.ndarray:
+    """Feature vector for one prediction, shape (1, N_FEATURES)"""
+    return np.array(
+        [[queue_length, party_size, SERVICE_TYPES.encode(service_type), when.hour, when.weekday()]],
+        dtype=np.float32
+    )
+
+
+def encode_many(queue_lengths, party_sizes, service_types, times) -> np.ndarray:
+    """Feature matrix for many rows at once, shape (n, N_FEATURES)"""
+    minutes = np.asarray(times, dtype='datetime64[m]').astype(np.int64)
+    days = minutes // (24 * 60)
+    features = np.empty((len(minutes), N_FEATURES), dtype=np.float32)
+    features[:, 0] = queue_lengths
+    features[:, 1] = party_sizes
+    features[:, 2] = SERVICE_TYPES.encode_many(service_types)
+    features[:, 3] = (minutes % (24 * 60)) // 60
+    features[:, 4] = (days + 3) % 7  # 1970-01-01 was a Thursday
+    return features
+
+
+def encode_entry(entry: Dict):
+    """(features, wait in minutes) for a finished reservation dict, or None if it cannot be used"""
+    if entry.get('status') not in TRAINING_STATUSES or not entry.get('completed_at'):
+        return None
+    created_at = entry['created_at']
+    completed_at = entry['completed_at']
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if isinstance(completed_at, str):
+        completed_at = datetime.fromisoformat(completed_at)
+    queue_length = max(0, (entry.get('initial_position') or 1) - 1)
+    features = encode(queue_length, entry['party_size'], entry['service_type'], created_at)
+    return features[0], (completed_at - created_at).total_seconds() / 60
+
+
+class FeatureStore:
+    """Float32 feature matrix and targets, one row per finished reservation, in completion order.
+
+    With max_rows set the oldest rows are dropped once the store is full, so
+    a long-running worker keeps a fixed-size training window.
+    """
+
+    def __init__(self, capacity=1024, max_rows=None):
+        self.max_rows = max_rows
+        capacity = min(capacity, max_rows) if max_rows else capacity
+        self._features = np.empty((capacity, N_FEATURES), dtype=np.float32)
+        self._targets = np.empty(capacity, dtype=np.float32)
+        self._row_ids = np.empty(capacity, dtype=np.int64)
+        self._ids = set()
+        self.size = 0
+        # Rows ever added; unlike size it keeps counting once old rows are dropped
+        self.appended = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, reservation_id):
+        return reservation_id in self._ids
+
+    def _resize(self, capacity, drop=0):
+        """Copy the rows after the first `drop` into new arrays; views handed out stay intact"""
+        keep = self.size - drop
+        features = np.empty((capacity, N_FEATURES), dtype=np.float32)
+        targets = np.empty(capacity, dtype=np.float32)
+        row_ids = np.empty(capacity, dtype=np.int64)
+        features[:keep] = self._features[drop:self.size]
+        targets[:keep] = self._targets[drop:self.size]
+        row_ids[:keep] = self._row_ids[drop:self.size]
+        self._ids.difference_update(self._row_ids[:drop].tolist())
+        self._features, self._targets, self._row_ids = features, targets, row_ids
+        self.size = keep
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if self.max_rows and needed > self.max_rows:
+            # Drop a tenth more than needed so eviction copies are rare
+            drop = min(self.size, needed - self.max_rows + self.max_rows // 10)
+            self._resize(self.max_rows, drop)
+            return
+        if needed <= len(self._targets):
+            return
+        capacity = max(needed, 2 * len(self._targets))
+        self._resize(min(capacity, self.max_rows) if self.max_rows else capacity)
+
+    def append(self, reservation_id, features, target) -> bool:
+        """Record a reservation once; returns False if it was already stored"""
+        with self._lock:
+            if reservation_id in self._ids:
+                return False
+            self._reserve(1)
+            self._features[self.size] = features
+            self._targets[self.size] = target
+            self._row_ids[self.size] = reservation_id
+            self._ids.add(reservation_id)
+            self.size += 1
+            self.appended += 1
+            return True
+
+    def extend(self, reservation_ids, features: np.ndarray, targets: np.ndarray) -> int:
+        with self._lock:
+            keep = np.array([reservation_id not in self._ids for reservation_id in reservation_ids], dtype=bool)
+            if self.max_rows:
+                # Only the newest max_rows can be kept
+                keep[:max(0, len(keep) - self.max_rows)] = False
+            count = int(keep.sum())
+            self._reserve(count)
+            kept_ids = np.asarray(reservation_ids)[keep]
+            self._features[self.size:self.size + count] = features[keep]
+            self._targets[self.size:self.size + count] = targets[keep]
+            self._row_ids[self.size:self.size + count] = kept_ids
+            self._ids.update(kept_ids.tolist())
+            self.size += count
+            self.appended += count
+            return count
+
+    def arrays(self):
+        """(features, targets) views of the stored rows; later appends do not change them"""
+        with self._lock:
+            return self._features[:self.size], self._targets[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._features.nbytes + self._targets.nbytes + self._row_ids.nbytes
+
+
+def load_history(store: FeatureStore, limit=None) -> int:
+    """Backfill the store from finished reservations in the database"""
+    reservations = Reservation.__table__
+    query = select(
+        reservations.c.id, reservations.c.initial_position, reservations.c.party_size,
+        reservations.c.service_type, reservations.c.created_at, reservations.c.completed_at
+    ).where(
+        reservations.c.status.in_(TRAINING_STATUSES),
+        reservations.c.completed_at.isnot(None)
+    ).order_by(reservations.c.completed_at.desc())
+    if limit:
+        query = query.limit(limit)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return 0
+    rows.reverse()  # oldest completion first, like rows appended later
+
+    ids, positions, party_sizes, service_types, created_at, completed_at = zip(*rows)
+    created_at = np.array(created_at, dtype='datetime64[us]')
+    completed_at = np.array(completed_at, dtype='datetime64[us]')
+    queue_lengths = np.maximum(0, np.array([position or 1 for position in positions]) - 1)
+    features = encode_many(queue_lengths, party_sizes, service_types, created_at)
+    targets = ((completed_at - created_at) / np.timedelta64(1, 'm')).astype(np.float32)
+    return store.extend(ids, features, targets)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_stale_tables(root, extension):
+    """Delete per-process tables left behind by processes that died without running atexit"""
+    for path in glob.glob(f'{glob.escape(root)}.*{extension}'):
+        pid = path[len(root) + 1:len(path) - len(extension)]
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            _remove_quietly(path)
+
+
+class WaitTimeModel:
+    """Random forest wait-time predictor trained from a FeatureStore.
+
+    The store is backfilled from the database in the background on first
+    use, while the fallback or built-in model answers, and then grows by
+    one row per finished reservation, keeping the newest `history_limit`
+    (WAIT_MODEL_HISTORY) rows; the forest is refitted in the background
+    after every `retrain_every` new rows. Until `min_samples` rows exist a
+    small built-in model answers instead.
+
+    In compiled mode (WAIT_MODEL_MODE=compiled, the default) every trained
+    forest is also evaluated once over the whole integer feature grid, and
+    predict_one() answers by indexing that table, falling back to the forest
+    for inputs outside the grid or while a table is being built.
+
+    A fallback with the same call shape as predict_one() (such as
+    queueing.QueueingEstimator.predict_one) answers in place of the built-in
+    model until a forest has been trained on real history, and always in
+    queueing mode (WAIT_MODEL_MODE=queueing).
+    """
+
+    def __init__(self, store: Optional[FeatureStore] = None, min_samples=20, retrain_every=50, history_limit=None,
+                 mode=None, max_queue_length=None, max_party_size=None, table_path=None, fallback=None):
+        self.history_limit = int(history_limit or os.getenv('WAIT_MODEL_HISTORY', 50000))
+        self.store = store if store is not None else FeatureStore(max_rows=self.history_limit)
+        self.min_samples = min_samples
+        self.retrain_every = retrain_every
+        self.mode = mode or os.getenv('WAIT_MODEL_MODE', 'compiled')
+        self.max_queue_length = int(max_queue_length or os.getenv('WAIT_MODEL_MAX_QUEUE', 100))
+        self.max_party_size = int(max_party_size or os.getenv('WAIT_MODEL_MAX_PARTY', 20))
+        self.table_path = table_path or os.getenv('WAIT_MODEL_TABLE', os.path.join('data', 'wait_model_table.npy'))
+        self.fallback = fallback
+        self.model = self._default_model()
+        self.compiled: Optional[CompiledPredictor] = None
+        self.trained_rows = 0
+        # store.appended when the current forest was fitted
+        self.trained_appended = 0
+        self._saved_path = None
+        self._loaded = False
+        self._fitting = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_model():
+        model = RandomForestRegressor(n_estimators=100, random_state=42)
+        # Train with dummy data until real history is available
+        X = np.array([[1, 2, 0, 12, 0], [2, 3, 1, 13, 2], [3, 4, 2, 19, 4]], dtype=np.float32)
+        y = np.array([10, 15, 20], dtype=np.float32)
+        model.fit(X, y)
+        return model
+
+    def ensure_loaded(self):
+        """Start the backfill from the database and the first fit in the background.
+
+        Called from the request that first needs the model, so that request
+        does not wait for the fit; the fallback answers until it finishes.
+        """
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+        self._fit_in_background(current_app._get_current_object() if has_app_context() else None)
+
+    def fit(self):
+        appended = self.store.appended
+        features, targets = self.store.arrays()
+        if len(targets) < self.min_samples:
+            return
+        model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=1)
+        model.fit(features, targets)
+        # Swap model and table together so lookups never mix two models
+        self.model, self.compiled = model, None
+        self.trained_rows = len(targets)
+        self.trained_appended = appended
+        if self.mode == 'compiled':
+            self._compile_in_background(model)
+
+    def process_table_path(self) -> str:
+        """table_path with this process's id, so workers never map each other's tables"""
+        root, extension = os.path.splitext(self.table_path)
+        path = f'{root}.{os.getpid()}{extension}'
+        if path != self._saved_path:
+            self._saved_path = path
+            atexit.register(_remove_quietly, path)
+            _remove_stale_tables(root, extension)
+        return path
+
+    def compile(self, model) -> CompiledPredictor:
+        """Tabulate model over the feature grid and memory-map the saved table"""
+        table = CompiledPredictor(compile_model(
+            model, self.max_queue_length, self.max_party_size, len(SERVICE_TYPES.categories)
+        ))
+        try:
+            path = self.process_table_path()
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            table.save(path)
+            table = CompiledPredictor.load(path)
+        except OSError as e:
+            print(f"Error saving compiled wait time model: {str(e)}")
+        return table
+
+    def _compile_in_background(self, model):
+        def run():
+            try:
+                compiled = self.compile(model)
+                if self.model is model:
+                    self.compiled = compiled
+            except Exception as e:
+                print(f"Error compiling wait time model: {str(e)}")
+
+        threading.Thread(target=run, name='wait-model-compile', daemon=True).start()
+
+    def _fit_in_background(self, app=None):
+        """Refit on a daemon thread; with an app, backfill from its database first"""
+        with self._lock:
+            if self._fitting:
+                return
+            self._fitting = True
+
+        def run():
+            try:
+                if app is not None:
+                    try:
+                        with app.app_context():
+                            load_history(self.store, self.history_limit)
+                    except Exception as e:
+                        print(f"Error loading wait time history: {str(e)}")
+                self.fit()
+            except Exception as e:
+                print(f"Error retraining wait time model: {str(e)}")
+            finally:
+                self._fitting = False
+
+        threading.Thread(target=run, name='wait-model-fit', daemon=True).start()
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        self.ensure_loaded()
+        return self.model.predict(features)
+
+    def predict_one(self, queue_length, party_size, service_type, when=None) -> float:
+        when = when or datetime.utcnow()
+        if self.fallback is not None:
+            if self.mode != 'queueing':
+                self.ensure_loaded()
+            if self.mode == 'queueing' or not self.trained_rows:
+                return self.fallback(queue_length, party_size, service_type, when)
+        compiled = self.compiled
+        if compiled is not None and isinstance(queue_length, int) and isinstance(party_size, int):
+            value = compiled.lookup(queue_length, party_size, SERVICE_TYPES.encode(service_type), when.hour, when.weekday())
+            if value is not None:
+                return value
+        return float(self.predict(encode(queue_length, party_size, service_type, when))[0])
+
+    def observe(self, entry: Dict) -> bool:
+        """Record a finished reservation dict as a training example"""
+        self.ensure_loaded()
+        encoded = encode_entry(entry)
+        if encoded is None or not self.store.append(entry['id'], *encoded):
+            return False
+        if self.store.appended - self.trained_appended >= self.retrain_every:
+            self._fit_in_background()
+        return True
@@ -0,0 +1,246 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from models import db, Reservation
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAYS_PER_WEEK = 7
+_MINUTES_PER_DAY = 24 * 60
+
+
+def weekday_and_slot(times: np.ndarray):
+    """Weekday (Monday=0) and 15-minute slot of each datetime64 value"""
+    minutes = times.astype('datetime64[m]').astype(np.int64)
+    days = minutes // _MINUTES_PER_DAY
+    # 1970-01-01 was a Thursday
+    return (days + 3) % DAYS_PER_WEEK, (minutes % _MINUTES_PER_DAY) // SLOT_MINUTES
+
+
+def fit_arrival_rates(created_at: np.ndarray, service_codes: np.ndarray, n_services: int) -> np.ndarray:
+    """Mean arrivals per (weekday, slot, service) over the days the history covers"""
+    shape = (DAYS_PER_WEEK, SLOTS_PER_DAY, n_services)
+    if not len(created_at):
+        return np.zeros(shape)
+
+    weekday, slot = weekday_and_slot(created_at)
+    flat = (weekday * SLOTS_PER_DAY + slot) * n_services + service_codes
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+    # Divide by how many times each weekday occurs in the history, including days without arrivals
+    days = np.arange(created_at.min().astype('datetime64[D]'), created_at.max().astype('datetime64[D]') + 1)
+    weekdays_seen = np.bincount((days.astype(np.int64) + 3) % DAYS_PER_WEEK, minlength=DAYS_PER_WEEK)
+    return counts / np.maximum(weekdays_seen, 1)[:, None, None]
+
+
+def project_waits(arrivals: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    """Projected wait in minutes for someone arriving in each slot.
+
+    Fluid approximation: the backlog carries over from slot to slot and is
+    cleared at `capacity` parties per slot for each service.
+    arrivals has shape (slots, services), capacity shape (services,).
+    """
+    capacity = np.maximum(capacity, 1e-9)
+    backlog = np.zeros(arrivals.shape[1])
+    waits = np.empty_like(arrivals, dtype=float)
+    for index in range(len(arrivals)):
+        backlog = np.maximum(0.0, backlog + arrivals[index] - capacity)
+        waits[index] = backlog / capacity * SLOT_MINUTES
+    return waits
+
+
+class ForecastTable:
+    """Expected arrivals and projected waits per slot for the coming days, plus
+    the seasonal (weekday, slot) rates they were built from"""
+
+    def __init__(self, venue, start, service_types, rates, arrivals, waits, generated_at):
+        self.venue = venue
+        self.start = start  # first slot, midnight UTC
+        self.service_types = list(service_types)
+        self.rates = rates  # (weekday, slot, service)
+        self.arrivals = arrivals  # (slot since start, service)
+        self.waits = waits  # (slot since start, service), minutes
+        self.generated_at = generated_at
+        self._service_index = {name: index for index, name in enumerate(self.service_types)}
+
+    @property
+    def end(self) -> datetime:
+        return self.start + timedelta(minutes=SLOT_MINUTES * len(self.arrivals))
+
+    def slot_of(self, when: datetime) -> int:
+        return int((when - self.start).total_seconds() // (SLOT_MINUTES * 60))
+
+    def lookup(self, when: datetime, service_type: str) -> Optional[Dict]:
+        """Forecast for the slot containing when, or None outside the horizon"""
+        service = self._service_index.get(service_type)
+        slot = self.slot_of(when)
+        if service is None or not 0 <= slot < len(self.arrivals):
+            return None
+        return {
+            'expectedArrivals': float(self.arrivals[slot, service]),
+            'projectedWait': float(self.waits[slot, service])
+        }
+
+    def projected_wait(self, when: datetime, service_type: str) -> Optional[float]:
+        forecast = self.lookup(when, service_type)
+        return round(forecast['projectedWait'], 1) if forecast else None
+
+    def peak_hours(self, day, top=2) -> List[str]:
+        """Busiest hours of a day by expected arrivals over all services"""
+        first = self.slot_of(datetime.combine(day, datetime.min.time()))
+        if not 0 <= first < len(self.arrivals):
+            return []
+        hourly = self.arrivals[first:first + SLOTS_PER_DAY].sum(axis=1).reshape(24, -1).sum(axis=1)
+        busiest = np.argsort(-hourly, kind='stable')[:top]
+        return [f"{int(hour):02d}:00" for hour in busiest if hourly[hour] > 0]
+
+    def slots(self, start_slot=0, end_slot=None, service_type=None) -> List[Dict]:
+        services = [service_type] if service_type else self.service_types
+        columns = [self._service_index[name] for name in services if name in self._service_index]
+        rows = []
+        for slot in range(start_slot, min(end_slot or len(self.arrivals), len(self.arrivals))):
+            rows.append({
+                'start': self.start + timedelta(minutes=SLOT_MINUTES * slot),
+                'expectedArrivals': {self.service_types[c]: round(float(self.arrivals[slot, c]), 3) for c in columns},
+                'projectedWait': {self.service_types[c]: round(float(self.waits[slot, c]), 1) for c in columns}
+            })
+        return rows
+
+    def save(self, path):
+        tmp_path = f'{path}.tmp.npz'
+        np.savez(
+            tmp_path,
+            venue=self.venue,
+            start=np.datetime64(self.start, 'm'),
+            service_types=np.array(self.service_types),
+            rates=self.rates,
+            arrivals=self.arrivals,
+            waits=self.waits,
+            generated_at=np.datetime64(self.generated_at, 's')
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> 'ForecastTable':
+        with np.load(path) as data:
+            return cls(
+                str(data['venue']),
+                data['start'].astype('datetime64[m]').item(),
+                [str(name) for name in data['service_types']],
+                data['rates'],
+                data['arrivals'],
+                data['waits'],
+                data['generated_at'].astype('datetime64[s]').item()
+            )
+
+
+class Forecaster:
+    """Builds, stores and serves per-venue forecast tables.
+
+    Tables are built from Reservation.created_at history and saved under
+    FORECAST_DIR, so reads are an array index instead of a GROUP BY over
+    history. A table generated before today (UTC) is rebuilt in the
+    background on first use, and `python manage.py forecast` rebuilds them
+    from cron.
+    """
+
+    def __init__(self, service_config: Dict, app=None, directory=None, horizon_days=None, history_days=None):
+        self.service_config = service_config
+        self.app = app
+        self.directory = directory or os.getenv('FORECAST_DIR', 'data')
+        self.horizon_days = int(horizon_days or os.getenv('FORECAST_HORIZON_DAYS', 7))
+        self.history_days = int(history_days or os.getenv('FORECAST_HISTORY_DAYS', 56))
+        self._tables: Dict[str, ForecastTable] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def path(self, venue) -> str:
+        return os.path.join(self.directory, f'forecast_{venue}.npz')
+
+    def _history(self, venue, since):
+        reservations = Reservation.__table__
+        rows = db.session.execute(
+            select(reservations.c.created_at, reservations.c.service_type).where(
+                reservations.c.venue == venue,
+                reservations.c.created_at >= since
+            )
+        ).all()
+        service_index = {name: index for index, name in enumerate(self.service_config)}
+        created_at = np.array([row[0] for row in rows], dtype='datetime64[us]')
+        codes = np.array([service_index.get(row[1], -1) for row in rows], dtype=np.int64)
+        known = codes >= 0
+        return created_at[known], codes[known]
+
+    def build(self, venue, now=None) -> ForecastTable:
+        """Fit rates from history and project the coming days; needs an app context"""
+        now = now or datetime.utcnow()
+        start = datetime.combine(now.date(), datetime.min.time())
+        service_types = list(self.service_config)
+
+        created_at, codes = self._history(venue, start - timedelta(days=self.history_days))
+        rates = fit_arrival_rates(created_at, codes, len(service_types))
+
+        days = np.arange(np.datetime64(start.date()), np.datetime64(start.date()) + self.horizon_days)
+        weekdays = (days.astype(np.int64) + 3) % DAYS_PER_WEEK
+        arrivals = rates[weekdays].reshape(-1, len(service_types))
+
+        capacity = np.array([
+            config.get('servers', 1) * SLOT_MINUTES / config['average_service_time']
+            for config in self.service_config.values()
+        ])
+        waits = project_waits(arrivals, capacity)
+        return ForecastTable(venue, start, service_types, rates, arrivals, waits, now)
+
+    def refresh(self, venue) -> ForecastTable:
+        """Rebuild, save and serve a venue's table; needs an app context"""
+        table = self.build(venue)
+        os.makedirs(self.directory, exist_ok=True)
+        table.save(self.path(venue))
+        self._tables[venue] = table
+        return table
+
+    def _refresh_in_background(self, venue):
+        if self.app is None:
+            return
+        with self._lock:
+            if venue in self._refreshing:
+                return
+            self._refreshing.add(venue)
+
+        def run():
+            try:
+                with self.app.app_context():
+                    self.refresh(venue)
+            except Exception as e:
+                print(f"Error refreshing forecast for {venue}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(venue)
+
+        threading.Thread(target=run, name=f'forecast-{venue}', daemon=True).start()
+
+    def table(self, venue, build=False) -> Optional[ForecastTable]:
+        """The venue's current table, loading it from disk if needed.
+
+        Stale tables are served while a fresh one is built in the background.
+        With build=True a venue without any table is built synchronously.
+        """
+        table = self._tables.get(venue)
+        if table is None and os.path.exists(self.path(venue)):
+            try:
+                table = self._tables[venue] = ForecastTable.load(self.path(venue))
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Error loading forecast for {venue}: {str(e)}")
+        if table is None:
+            if build:
+                return self.refresh(venue)
+            self._refresh_in_background(venue)
+            return None
+        if table.generated_at.date() < datetime.utcnow().date():
+            self._refresh_in_background(venue)
+        return table
@@ -0,0 +1,389 @@
+"""Offline maintenance jobs behind ``python manage.py rebuild|vacuum|compact|verify``.
+
+Reservations are the source of truth. Everything else can be rebuilt from
+them: the reservation_events history (missing for seeded rows and anything
+written before the event log existed), the seated_at/no_show_at stage
+columns, the per-venue ticket counters and the arrival forecasts. Jobs
+that touch every reservation are split into date ranges of created_at that
+run on a process pool. Each worker opens its own engine, so no pooled
+connection crosses a fork. The legacy utils.QueueManager JSON store is
+compacted and checked in place.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import exists, func, select, text
+
+from db_config import create_profiled_engine
+from models import Reservation, ReservationEvent, QueueCounter
+from queue_engine import FINISHED_STATUSES
+
+reservations = Reservation.__table__
+events = ReservationEvent.__table__
+counters = QueueCounter.__table__
+
+INSERT_BATCH = 5000
+SAMPLE_SIZE = 5
+
+# Statuses utils.QueueManager writes; the finished ones can be compacted away
+JSON_STATUSES = ('waiting', 'seated', 'served', 'completed', 'no-show', 'cancelled')
+JSON_FINISHED = ('served', 'completed', 'no-show', 'cancelled')
+
+
+class Finding(NamedTuple):
+    """How many rows failed a check, and the first few of them"""
+    count: int
+    sample: tuple
+
+
+def _in_range(venue, start, stop):
+    criteria = [reservations.c.created_at >= start, reservations.c.created_at < stop]
+    if venue:
+        criteria.append(reservations.c.venue == venue)
+    return criteria
+
+
+def date_ranges(engine, venue=None, chunks=8) -> List[tuple]:
+    """Split the reservations' created_at span into up to `chunks` equal [start, stop) ranges"""
+    criteria = [reservations.c.venue == venue] if venue else []
+    with engine.connect() as conn:
+        first, last = conn.execute(
+            select(func.min(reservations.c.created_at), func.max(reservations.c.created_at)).where(*criteria)
+        ).one()
+    if first is None:
+        return []
+    edges = [first + (last - first) * index / chunks for index in range(chunks)]
+    edges.append(last + timedelta(microseconds=1))
+    return [(start, stop) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+
+def lifecycle(row) -> List[Dict]:
+    """The events the queue engine would have written for a reservation, from its columns.
+
+    Steps are clamped to never go back in time; a final status without a
+    timestamp of its own is placed at updated_at.
+    """
+    booked = row.scheduled_start is not None
+    steps = [('booked' if booked else 'waiting', row.created_at)]
+    if booked and row.status not in ('booked', 'cancelled'):
+        steps.append(('waiting', row.scheduled_start))
+    if row.seated_at and row.status not in ('booked', 'waiting'):
+        steps.append(('seated', row.seated_at))
+    if row.status != steps[-1][0]:
+        finished = row.no_show_at if row.status == 'no-show' else row.completed_at
+        steps.append((row.status, finished or row.updated_at or steps[-1][1]))
+
+    rows = []
+    previous_status, previous_at = None, None
+    for status, occurred_at in steps:
+        occurred_at = max(occurred_at, previous_at) if previous_at else occurred_at
+        rows.append({
+            'reservation_id': row.id,
+            'venue': row.venue,
+            'service_type': row.service_type,
+            'party_size': row.party_size,
+            'from_status': previous_status,
+            'to_status': status,
+            'occurred_at': occurred_at,
+            'stage_seconds': (occurred_at - previous_at).total_seconds() if previous_at else None
+        })
+        previous_status, previous_at = status, occurred_at
+    return rows
+
+
+def backfill_events(engine, venue, start, stop) -> Dict[str, int]:
+    """Write the lifecycle events of reservations in the range that have none"""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                reservations.c.id, reservations.c.venue, reservations.c.service_type, reservations.c.party_size,
+                reservations.c.status, reservations.c.created_at, reservations.c.updated_at,
+                reservations.c.completed_at, reservations.c.seated_at, reservations.c.no_show_at,
+                reservations.c.scheduled_start
+            ).where(
+                *_in_range(venue, start, stop),
+                ~exists().where(events.c.reservation_id == reservations.c.id)
+            ).order_by(reservations.c.created_at, reservations.c.id)
+        ).all()
+
+    written = 0
+    for offset in range(0, len(rows), INSERT_BATCH):
+        batch = [event for row in rows[offset:offset + INSERT_BATCH] for event in lifecycle(row)]
+        with engine.begin() as conn:
+            conn.execute(events.insert(), batch)
+        written += len(batch)
+    return {'reservations': len(rows), 'events': written}
+
+
+def fill_stage_columns(engine, venue, start, stop) -> Dict[str, int]:
+    """Copy seated and no-show times from the events into NULL stage columns"""
+    filled = {}
+    for column, status in (('seated_at', 'seated'), ('no_show_at', 'no-show')):
+        entered = (
+            select(func.min(events.c.occurred_at))
+            .where(events.c.reservation_id == reservations.c.id, events.c.to_status == status)
+            .scalar_subquery()
+        )
+        with engine.begin() as conn:
+            filled[column] = conn.execute(
+                reservations.update()
+                .where(
+                    *_in_range(venue, start, stop),
+                    reservations.c[column].is_(None),
+                    exists().where(events.c.reservation_id == reservations.c.id, events.c.to_status == status)
+                )
+                .values({column: entered})
+            ).rowcount
+    return filled
+
+
+def verify_range(engine, venue, start, stop) -> Dict[str, Finding]:
+    """Reservations in the range that disagree with their events or their own columns"""
+    last_status = (
+        select(events.c.to_status)
+        .where(events.c.reservation_id == reservations.c.id)
+        .order_by(events.c.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    seated_event = exists().where(events.c.reservation_id == reservations.c.id, events.c.to_status == 'seated')
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                reservations.c.id, reservations.c.status, reservations.c.completed_at, reservations.c.seated_at,
+                last_status, seated_event
+            ).where(*_in_range(venue, start, stop))
+        ).all()
+
+    failed = {
+        'missing_events': [],
+        'status_differs_from_events': [],
+        'seated_at_missing': [],
+        'finished_without_completed_at': [],
+        'active_with_completed_at': []
+    }
+    for reservation_id, status, completed_at, seated_at, last, was_seated in rows:
+        if last is None:
+            failed['missing_events'].append(reservation_id)
+        elif last != status:
+            failed['status_differs_from_events'].append(reservation_id)
+        if was_seated and seated_at is None:
+            failed['seated_at_missing'].append(reservation_id)
+        if status in FINISHED_STATUSES and completed_at is None:
+            failed['finished_without_completed_at'].append(reservation_id)
+        elif status not in FINISHED_STATUSES and completed_at is not None:
+            failed['active_with_completed_at'].append(reservation_id)
+    return {check: Finding(len(ids), tuple(ids[:SAMPLE_SIZE])) for check, ids in failed.items()}
+
+
+# rebuild runs these in order; events before stages, which are copied from them
+REBUILD_TARGETS = ('events', 'stages', 'counters', 'forecasts')
+
+RANGE_JOBS = {
+    'events': backfill_events,
+    'stages': fill_stage_columns,
+    'verify': verify_range
+}
+
+_engine = None
+
+
+def _init_worker(url):
+    global _engine
+    _engine = create_profiled_engine(url)
+
+
+def _run_range(job, venue, start, stop):
+    began = time.perf_counter()
+    result = RANGE_JOBS[job](_engine, venue, start, stop)
+    return result, time.perf_counter() - began
+
+
+def merge(total: Dict[str, Any], part: Dict[str, Any]) -> Dict[str, Any]:
+    """Add one range's counts or findings into the running total"""
+    for key, value in part.items():
+        if isinstance(value, Finding):
+            prior = total.get(key, Finding(0, ()))
+            total[key] = Finding(prior.count + value.count, (prior.sample + value.sample)[:SAMPLE_SIZE])
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def run_ranges(url, job, ranges, venue=None, workers=None,
+               progress: Optional[Callable] = None) -> Dict[str, Any]:
+    """Run a range job over every date range on a process pool and merge the results.
+
+    progress(done, total, (start, stop), result, seconds) is called as each
+    range finishes. The caller must dispose its own engine first.
+    """
+    total = {}
+    if not ranges:
+        return total
+    workers = workers or min(len(ranges), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(url,)) as pool:
+        futures = {pool.submit(_run_range, job, venue, start, stop): (start, stop) for start, stop in ranges}
+        for done, future in enumerate(as_completed(futures), 1):
+            result, seconds = future.result()
+            merge(total, result)
+            if progress:
+                progress(done, len(ranges), futures[future], result, seconds)
+    return total
+
+
+def _last_tickets(conn, venue=None):
+    criteria = [reservations.c.ticket_number.isnot(None)]
+    if venue:
+        criteria.append(reservations.c.venue == venue)
+    return dict(conn.execute(
+        select(reservations.c.venue, func.max(reservations.c.ticket_number))
+        .where(*criteria)
+        .group_by(reservations.c.venue)
+    ).all())
+
+
+def _counters_behind(conn, venue=None) -> List[str]:
+    """Venues whose counter would hand out a ticket number already issued"""
+    last_tickets = _last_tickets(conn, venue)
+    next_tickets = dict(conn.execute(select(counters.c.queue_key, counters.c.next_ticket)).all())
+    return sorted(
+        key for key, next_ticket in next_tickets.items()
+        if key in last_tickets and next_ticket <= last_tickets[key]
+    )
+
+
+def reset_counters(engine, venue=None) -> List[str]:
+    """Drop counters that are behind so the next ticket is re-seeded from the highest one issued"""
+    with engine.begin() as conn:
+        behind = _counters_behind(conn, venue)
+        if behind:
+            conn.execute(counters.delete().where(counters.c.queue_key.in_(behind)))
+    return behind
+
+
+def verify_global(engine, venue=None) -> Dict[str, Finding]:
+    """Checks across tables that do not split by date range"""
+    with engine.connect() as conn:
+        behind = _counters_behind(conn, venue)
+        # Events outlive their reservation only when its deletion was recorded
+        criteria = [
+            ~exists().where(reservations.c.id == events.c.reservation_id),
+            events.c.reservation_id.notin_(
+                select(events.c.reservation_id).where(events.c.to_status == 'deleted')
+            )
+        ]
+        if venue:
+            criteria.append(events.c.venue == venue)
+        orphans = conn.execute(
+            select(events.c.reservation_id).where(*criteria).distinct().order_by(events.c.reservation_id)
+        ).scalars().all()
+    return {
+        'counter_behind_tickets': Finding(len(behind), tuple(behind[:SAMPLE_SIZE])),
+        'events_without_reservation': Finding(len(orphans), tuple(orphans[:SAMPLE_SIZE]))
+    }
+
+
+def verify_forecasts(forecaster, venues) -> Dict[str, Finding]:
+    """Venues with reservations but no saved forecast table"""
+    missing = [venue for venue in venues if not os.path.exists(forecaster.path(venue))]
+    return {'forecast_missing': Finding(len(missing), tuple(missing[:SAMPLE_SIZE]))}
+
+
+def _database_bytes(conn) -> int:
+    if conn.dialect.name == 'sqlite':
+        return conn.execute(text('PRAGMA page_count')).scalar() * conn.execute(text('PRAGMA page_size')).scalar()
+    if conn.dialect.name == 'postgresql':
+        return conn.execute(text('SELECT pg_database_size(current_database())')).scalar()
+    return 0
+
+
+def vacuum(engine, reindex=False) -> Dict:
+    """Rebuild indexes if asked, reclaim free pages and refresh planner statistics.
+
+    VACUUM cannot run inside a transaction, so this uses an autocommit
+    connection, and lifts PostgreSQL's statement timeout for it.
+    """
+    began = time.perf_counter()
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        before = _database_bytes(conn)
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text('SET statement_timeout = 0'))
+            if reindex:
+                for table in (reservations, events, counters):
+                    conn.execute(text(f'REINDEX TABLE {table.name}'))
+            conn.execute(text('VACUUM ANALYZE'))
+        else:
+            if reindex:
+                conn.execute(text('REINDEX'))
+            conn.execute(text('VACUUM'))
+            conn.execute(text('ANALYZE'))
+            if conn.dialect.name == 'sqlite':
+                conn.execute(text('PRAGMA wal_checkpoint(TRUNCATE)'))
+        after = _database_bytes(conn)
+    return {'bytesBefore': before, 'bytesAfter': after, 'seconds': time.perf_counter() - began}
+
+
+def compact_json_store(path, days=30, history=1000, now=None) -> Optional[Dict]:
+    """Drop finished reservations older than `days` and keep the newest `history` service entries.
+
+    The file is rewritten atomically in the format QueueManager.save_data
+    uses. Returns None when the store does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    cutoff = (now or datetime.now()) - timedelta(days=days)
+    before = os.path.getsize(path)
+    with open(path) as f:
+        data = json.load(f)
+    stored = data.get('reservations', [])
+    # Keep issuing ids after the highest one ever stored, including dropped rows
+    next_id = data.get('next_id') or max((reservation['id'] for reservation in stored), default=0) + 1
+    kept = [
+        reservation for reservation in stored
+        if reservation.get('status') not in JSON_FINISHED
+        or datetime.fromisoformat(reservation['created_at']) >= cutoff
+    ]
+    service_history = data.get('service_history', [])
+    trimmed = service_history[-history:] if history else []
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'reservations': kept, 'service_history': trimmed, 'next_id': next_id}, f, indent=2)
+    os.replace(tmp_path, path)
+    return {
+        'reservationsDropped': len(stored) - len(kept),
+        'historyDropped': len(service_history) - len(trimmed),
+        'bytesBefore': before,
+        'bytesAfter': os.path.getsize(path)
+    }
+
+
+def verify_json_store(path) -> Dict[str, Finding]:
+    """The JSON store parses, has unique ids below its next_id and only statuses QueueManager writes"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        stored = data.get('reservations', [])
+    except ValueError as e:
+        return {'json_store_unreadable': Finding(1, (str(e),))}
+    seen, duplicates, unknown = set(), [], []
+    for reservation in stored:
+        if reservation.get('id') in seen:
+            duplicates.append(reservation.get('id'))
+        seen.add(reservation.get('id'))
+        if reservation.get('status') not in JSON_STATUSES:
+            unknown.append(reservation.get('id'))
+    next_id = data.get('next_id')
+    reused = [reservation_id for reservation_id in seen
+              if next_id and isinstance(reservation_id, int) and reservation_id >= next_id]
+    return {
+        'json_duplicate_ids': Finding(len(duplicates), tuple(duplicates[:SAMPLE_SIZE])),
+        'json_unknown_status': Finding(len(unknown), tuple(unknown[:SAMPLE_SIZE])),
+        'json_ids_past_next_id': Finding(len(reused), tuple(sorted(reused)[:SAMPLE_SIZE]))
+    }
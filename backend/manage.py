@@ -1,7 +1,18 @@
-from flask import Flask
+import argparse
+import json
 import os
+import sys
+import time
+from datetime import datetime, timedelta
+from flask import Flask
 from dotenv import load_dotenv
-from models import db, User, AdminSettings
+from models import db, User, AdminSettings, Reservation
+from db_config import init_database, upgrade_schema
+from forecasting import Forecaster
+import backtest as backtesting
+import maintenance
+import seeding
+from services import services
 
 # Load environment variables
 load_dotenv()
@@ -9,24 +20,181 @@ load_dotenv()
 # Create Flask app
 app = Flask(__name__)
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Initialize SQLAlchemy with this app and the engine profile for DATABASE_URL
+init_database(app, db)
+
+def setup(args):
+    # Create the database tables
+    db.create_all()
+    print("Created database tables")
+    for column in upgrade_schema(db):
+        print(f"Added column {column}")
+
+    # Create default admin settings if not exists
+    if not AdminSettings.query.first():
+        default_settings = AdminSettings()
+        db.session.add(default_settings)
+        db.session.commit()
+        print("Created default admin settings")
+
+    print("Database setup completed successfully")
+
+def forecast(args):
+    """Rebuild arrival forecasts; run nightly from cron"""
+    forecaster = Forecaster(services, horizon_days=args.days)
+    venues = args.venue or [venue for venue, in db.session.query(Reservation.venue).distinct()]
+    for venue in venues:
+        table = forecaster.refresh(venue)
+        print(f"Forecast for {venue}: {table.arrivals.sum():.0f} arrivals expected until {table.end:%Y-%m-%d}")
+
+def backtest(args):
+    """Replay history through the wait-time predictors and score them"""
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    history = backtesting.load_history(args.venue, since)
+    print(f"Replaying {history.size} finished reservations")
+    db.session.remove()
+    db.engine.dispose()  # worker processes must not share pooled connections
+    results = backtesting.run_backtest(history, args.predictor, args.chunks, args.workers)
+
+    print(f"{'predictor':<20} {'MAE':>7} {'bias':>7} {'<=10min':>8} {'p50 us':>9} {'p99 us':>9} {'fit s':>7}")
+    for name, result in results.items():
+        print(f"{name:<20} {result['mae']:>7} {result['bias']:>7} {result['within10']:>8} "
+              f"{result['p50LatencyUs']:>9} {result['p99LatencyUs']:>9} {result['fitSeconds']:>7}")
+    for name, result in results.items():
+        buckets = ', '.join(
+            f"{b['bucket']}: {b['meanPredicted']} vs {b['meanActual']} (n={b['count']})" for b in result['calibration']
+        )
+        print(f"{name} calibration (predicted vs actual minutes): {buckets}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+def seed(args):
+    """Bulk load synthetic reservation history for scale testing"""
+    db.create_all()
+    upgrade_schema(db)
+    for offset, venue in enumerate(args.venue or ['main']):
+        result = seeding.seed(
+            db.engine, args.days, args.per_day, args.seed + offset, venue, args.batch_size,
+            progress=lambda rows: print(f"  {rows} rows", end='\r')
+        )
+        print(f"Seeded {result['rows']} reservations for {venue} over {args.days} days "
+              f"in {result['seconds']:.1f}s ({result['rowsPerSecond']:,.0f} rows/s)")
 
-# Initialize SQLAlchemy with this app
-db.init_app(app)
+def _venues(args):
+    return [args.venue] if args.venue else [venue for venue, in db.session.query(Reservation.venue).distinct()]
+
+def _run_ranges(job, args):
+    """Run a per-date-range maintenance job on a process pool, printing each range as it finishes"""
+    ranges = maintenance.date_ranges(db.engine, args.venue, args.chunks)
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    db.session.remove()
+    db.engine.dispose()  # worker processes must not share pooled connections
+
+    def progress(done, total, span, result, seconds):
+        counts = ', '.join(f"{key} {value.count if isinstance(value, maintenance.Finding) else value}"
+                           for key, value in result.items())
+        print(f"  [{done}/{total}] {span[0]:%Y-%m-%d} - {span[1]:%Y-%m-%d}: {counts} ({seconds:.1f}s)")
+
+    return maintenance.run_ranges(url, job, ranges, args.venue, args.workers, progress)
+
+def rebuild(args):
+    """Rebuild data derived from reservations"""
+    targets = args.target or list(maintenance.REBUILD_TARGETS)
+    for target in maintenance.REBUILD_TARGETS:
+        if target not in targets:
+            continue
+        began = time.perf_counter()
+        if target in maintenance.RANGE_JOBS:
+            result = _run_ranges(target, args)
+        elif target == 'counters':
+            result = {'reset': len(maintenance.reset_counters(db.engine, args.venue))}
+        else:
+            forecaster = Forecaster(services)
+            venues = _venues(args)
+            for venue in venues:
+                forecaster.refresh(venue)
+            result = {'venues': len(venues)}
+        counts = ', '.join(f"{key} {value}" for key, value in result.items()) or 'nothing to do'
+        print(f"Rebuilt {target}: {counts} in {time.perf_counter() - began:.1f}s")
+
+def vacuum(args):
+    """Reclaim free space and refresh planner statistics"""
+    result = maintenance.vacuum(db.engine, args.reindex)
+    print(f"Vacuumed {db.engine.dialect.name} database: {result['bytesBefore'] / 2 ** 20:.1f} MiB -> "
+          f"{result['bytesAfter'] / 2 ** 20:.1f} MiB in {result['seconds']:.1f}s")
+
+def compact(args):
+    """Compact the JSON queue store"""
+    result = maintenance.compact_json_store(args.file, args.days, args.history)
+    if result is None:
+        print(f"No JSON store at {args.file}")
+        return
+    print(f"Compacted {args.file}: dropped {result['reservationsDropped']} reservations and "
+          f"{result['historyDropped']} history entries, {result['bytesBefore']:,} -> {result['bytesAfter']:,} bytes")
+
+def verify(args):
+    """Check the stores agree with each other; exits 1 when any check fails"""
+    began = time.perf_counter()
+    findings = maintenance.verify_global(db.engine, args.venue)
+    maintenance.merge(findings, maintenance.verify_forecasts(Forecaster(services), _venues(args)))
+    maintenance.merge(findings, maintenance.verify_json_store(args.json_store))
+    maintenance.merge(findings, _run_ranges('verify', args))
+
+    failed = 0
+    for check, finding in findings.items():
+        failed += finding.count
+        sample = f" (e.g. {', '.join(map(str, finding.sample))})" if finding.count else ''
+        print(f"{check:<32} {finding.count:>8}{sample}")
+    print(f"{'ok' if not failed else 'FAILED'} in {time.perf_counter() - began:.1f}s")
+    if failed:
+        sys.exit(1)
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Database and maintenance tasks')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('setup', help='create tables and default settings (default)')
+    forecast_parser = commands.add_parser('forecast', help='rebuild arrival forecasts')
+    forecast_parser.add_argument('--venue', action='append', help='venue to rebuild (default: all)')
+    forecast_parser.add_argument('--days', type=int, help='forecast horizon in days')
+    backtest_parser = commands.add_parser(
+        'backtest', help='score wait-time predictors on history (about 3 minutes per 5k reservations per core)'
+    )
+    backtest_parser.add_argument('--venue', help='only replay one venue')
+    backtest_parser.add_argument('--days', type=int, help='only replay the last N days')
+    backtest_parser.add_argument('--predictor', action='append', choices=sorted(backtesting.PREDICTORS),
+                                 help='predictor to score (default: all)')
+    backtest_parser.add_argument('--chunks', type=int, default=4, help='date ranges per predictor')
+    backtest_parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    backtest_parser.add_argument('--json', help='also write the results to this file')
+    seed_parser = commands.add_parser('seed', help='bulk load synthetic reservation history')
+    seed_parser.add_argument('--venue', action='append', help='venue to seed, repeatable (default: main)')
+    seed_parser.add_argument('--days', type=int, default=90, help='days of history ending yesterday')
+    seed_parser.add_argument('--per-day', type=int, default=400, help='mean reservations per day')
+    seed_parser.add_argument('--seed', type=int, default=42, help='random seed; same seed, same rows')
+    seed_parser.add_argument('--batch-size', type=int, default=20000, help='rows per insert transaction')
+    rebuild_parser = commands.add_parser('rebuild', help='rebuild data derived from reservations')
+    rebuild_parser.add_argument('--target', action='append', choices=maintenance.REBUILD_TARGETS,
+                                help='what to rebuild, repeatable (default: all, in this order)')
+    rebuild_parser.add_argument('--venue', help='only rebuild one venue')
+    rebuild_parser.add_argument('--chunks', type=int, default=8, help='date ranges to split reservations into')
+    rebuild_parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    vacuum_parser = commands.add_parser('vacuum', help='VACUUM and ANALYZE the database')
+    vacuum_parser.add_argument('--reindex', action='store_true', help='also rebuild every index first')
+    compact_parser = commands.add_parser('compact', help='compact the JSON queue store')
+    compact_parser.add_argument('--file', default=os.path.join('data', 'queue_data.json'), help='store to compact')
+    compact_parser.add_argument('--days', type=int, default=30, help='keep finished reservations this recent')
+    compact_parser.add_argument('--history', type=int, default=1000, help='service history entries to keep')
+    verify_parser = commands.add_parser('verify', help='check reservations, events, counters and stores agree')
+    verify_parser.add_argument('--venue', help='only check one venue')
+    verify_parser.add_argument('--chunks', type=int, default=8, help='date ranges to split reservations into')
+    verify_parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    verify_parser.add_argument('--json-store', default=os.path.join('data', 'queue_data.json'),
+                               help='JSON queue store to check')
+    args = parser.parse_args()
+
     with app.app_context():
-        # Create the database tables
-        db.create_all()
-        print("Created database tables")
-        
-        # Create default admin settings if not exists
-        if not AdminSettings.query.first():
-            default_settings = AdminSettings()
-            db.session.add(default_settings)
-            db.session.commit()
-            print("Created default admin settings")
-        
-        print("Database setup completed successfully") 
\ No newline at end of file
+        {
+            'setup': setup, 'forecast': forecast, 'backtest': backtest, 'seed': seed,
+            'rebuild': rebuild, 'vacuum': vacuum, 'compact': compact, 'verify': verify
+        }.get(args.command, setup)(args)
@@ -1,10 +1,11 @@
 from flask import Flask
 from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
 import os
 from dotenv import load_dotenv
 from alembic.config import Config
 from alembic import command
+from models import db, User, AdminSettings
+from db_config import init_database
 
 # Load environment variables
 load_dotenv()
@@ -12,15 +13,8 @@ load_dotenv()
 # Create Flask app
 app = Flask(__name__)
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize SQLAlchemy
-db = SQLAlchemy(app)
-
-# Import models
-from models import User, AdminSettings
+# Initialize the shared SQLAlchemy instance with the engine profile for DATABASE_URL
+init_database(app, db)
 
 # Initialize Flask-Migrate
 migrate = Migrate(app, db)
@@ -1,8 +1,12 @@
+import os
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# Venue (location group) used when a request does not name one
+DEFAULT_VENUE = os.getenv('DEFAULT_VENUE', 'main')
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -39,6 +43,9 @@ class Reservation(db.Model):
     __tablename__ = 'reservations'
     
     id = db.Column(db.Integer, primary_key=True)
+    venue = db.Column(db.String(50), nullable=False, default=DEFAULT_VENUE, server_default=DEFAULT_VENUE, index=True)
+    ticket_number = db.Column(db.Integer)
+    initial_position = db.Column(db.Integer)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), nullable=False)
     email = db.Column(db.String(120))
@@ -50,10 +57,19 @@ class Reservation(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+    # Stage timestamps, denormalised from reservation_events
+    seated_at = db.Column(db.DateTime)
+    no_show_at = db.Column(db.DateTime)
+    # Advance bookings: the reserved interval; NULL for walk-ins
+    scheduled_start = db.Column(db.DateTime, index=True)
+    scheduled_end = db.Column(db.DateTime)
     
     def to_dict(self):
         return {
             'id': self.id,
+            'venue': self.venue,
+            'ticket_number': self.ticket_number,
+            'initial_position': self.initial_position,
             'name': self.name,
             'phone': self.phone,
             'email': self.email,
@@ -65,12 +81,61 @@ class Reservation(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'seated_at': self.seated_at.isoformat() if self.seated_at else None,
+            'no_show_at': self.no_show_at.isoformat() if self.no_show_at else None,
+            'scheduled_start': self.scheduled_start.isoformat() if self.scheduled_start else None,
+            'scheduled_end': self.scheduled_end.isoformat() if self.scheduled_end else None,
             'wait_time': (self.completed_at - self.created_at).total_seconds() if self.completed_at else None
         }
     
     def __repr__(self):
         return f'<Reservation {self.id}: {self.name} - {self.status}>'
 
+class ReservationEvent(db.Model):
+    """One status change of a reservation, with the time spent in the status it left.
+
+    Append-only, and kept after the reservation itself is deleted. Consumers
+    read it incrementally by id.
+    """
+    __tablename__ = 'reservation_events'
+    __table_args__ = (db.Index('ix_reservation_events_venue_id', 'venue', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    reservation_id = db.Column(db.Integer, nullable=False, index=True)
+    venue = db.Column(db.String(50), nullable=False)
+    service_type = db.Column(db.String(20))
+    party_size = db.Column(db.Integer)
+    from_status = db.Column(db.String(20))  # NULL when the reservation was created
+    to_status = db.Column(db.String(20), nullable=False)
+    occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    stage_seconds = db.Column(db.Float)  # time spent in from_status
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'reservation_id': self.reservation_id,
+            'venue': self.venue,
+            'service_type': self.service_type,
+            'party_size': self.party_size,
+            'from_status': self.from_status,
+            'to_status': self.to_status,
+            'occurred_at': self.occurred_at.isoformat(),
+            'stage_seconds': self.stage_seconds
+        }
+
+    def __repr__(self):
+        return f'<ReservationEvent {self.id}: {self.reservation_id} {self.from_status} -> {self.to_status}>'
+
+class QueueCounter(db.Model):
+    """Ticket sequence for one queue, locked by the transaction that issues a ticket"""
+    __tablename__ = 'queue_counters'
+
+    queue_key = db.Column(db.String(50), primary_key=True)
+    next_ticket = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<QueueCounter {self.queue_key}: {self.next_ticket}>'
+
 class AdminSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     max_queue_size = db.Column(db.Integer, default=50)
@@ -93,36 +158,3 @@ class AdminSettings(db.Model):
             },
             'updated_at': self.updated_at.isoformat()
         }
-
-class QueueManager:
-    def __init__(self):
-        self.queue = []
-        self.counter = 0
-
-    def add_to_queue(self, reservation):
-        self.counter += 1
-        entry = {
-            'id': self.counter,
-            **reservation,
-            'status': 'waiting',
-            'created_at': datetime.utcnow()
-        }
-        self.queue.append(entry)
-        return entry
-
-    def remove_from_queue(self, entry_id):
-        self.queue = [entry for entry in self.queue if entry['id'] != entry_id]
-
-    def get_queue_position(self, entry_id):
-        waiting_entries = [entry for entry in self.queue if entry['status'] == 'waiting']
-        for i, entry in enumerate(waiting_entries):
-            if entry['id'] == entry_id:
-                return i + 1
-        return None
-
-    def update_status(self, entry_id, new_status):
-        for entry in self.queue:
-            if entry['id'] == entry_id:
-                entry['status'] = new_status
-                return entry
-        return None 
\ No newline at end of file
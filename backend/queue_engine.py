@@ -0,0 +1,546 @@
+import os
+import threading
+import zlib
+from collections import Counter
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from bookings import SlotIndex, Booking, HOLDING_STATUSES
+from eta_engine import EtaTracker, service_pace
+from models import db, Reservation, QueueCounter, DEFAULT_VENUE
+from queue_entries import QueueEntry, STATUSES, SERVICE_TYPES, LOCATIONS, WAITING, to_epoch_us
+from queue_sync import QueueChangeLog, INSERTED, UPDATED, REMOVED
+import reservation_events
+from routing import LocationLoad
+from search_index import SearchIndex
+from services import services, location_capacity
+
+ACTIVE_STATUSES = ('waiting', 'seated')
+FINISHED_STATUSES = ('completed', 'served', 'no-show', 'cancelled')
+# Statuses that mean a waiting party got its turn, as opposed to dropping out
+SERVED_STATUSES = ('seated', 'completed', 'served')
+
+# How long finished reservations stay in the host search index
+SEARCH_RETENTION = timedelta(hours=float(os.getenv('SEARCH_RETENTION_HOURS', 24)))
+
+
+def _parse_pinning(value):
+    """Parse VENUE_WORKERS, e.g. 'downtown=0,airport=1'"""
+    pinning = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        venue, _, worker = item.partition('=')
+        pinning[venue.strip()] = int(worker)
+    return pinning
+
+
+def worker_for_venue(venue) -> int:
+    """Index of the worker process that owns a venue shard.
+
+    Venues listed in VENUE_WORKERS are pinned explicitly; the rest are spread
+    over WORKER_COUNT workers by a stable hash so every process agrees.
+    """
+    pinning = _parse_pinning(os.getenv('VENUE_WORKERS', ''))
+    if venue in pinning:
+        return pinning[venue]
+    return zlib.crc32(venue.encode('utf-8')) % max(1, int(os.getenv('WORKER_COUNT', 1)))
+
+
+def configured_venues() -> Set[str]:
+    """DEFAULT_VENUE, the venues listed in VENUES and those pinned in VENUE_WORKERS"""
+    venues = {DEFAULT_VENUE, *_parse_pinning(os.getenv('VENUE_WORKERS', ''))}
+    venues.update(filter(None, (part.strip() for part in os.getenv('VENUES', '').split(','))))
+    return venues
+
+
+def owns_venue(venue) -> bool:
+    """Whether this process (WORKER_INDEX) serves the venue shard"""
+    return worker_for_venue(venue) == int(os.getenv('WORKER_INDEX', 0))
+
+
+def allocate_ticket(venue):
+    """Issue the next ticket number and initial queue position for a venue.
+
+    Must run as the first statement of the transaction that inserts the
+    reservation. Bumping the counter row locks it (the whole database on
+    SQLite) until commit, so concurrent writers in any process get dense,
+    unique tickets and positions that agree with the committed order.
+    """
+    counters = QueueCounter.__table__
+    bumped = db.session.execute(
+        counters.update()
+        .where(counters.c.queue_key == venue)
+        .values(next_ticket=counters.c.next_ticket + 1)
+    ).rowcount
+    if not bumped:
+        # First ticket for this venue: seed the counter from existing reservations.
+        # A concurrent seed raises IntegrityError and the caller retries.
+        last_ticket = db.session.query(db.func.max(Reservation.ticket_number)).filter(
+            Reservation.venue == venue
+        ).scalar()
+        db.session.execute(counters.insert().values(queue_key=venue, next_ticket=(last_ticket or 0) + 2))
+
+    ticket = db.session.execute(
+        select(counters.c.next_ticket).where(counters.c.queue_key == venue)
+    ).scalar() - 1
+    position = Reservation.query.filter(
+        Reservation.venue == venue,
+        Reservation.status == 'waiting'
+    ).count() + 1
+    return ticket, position
+
+
+class QueueShard:
+    """Queue state for a single venue.
+
+    The reservations table is the system of record. Active entries (waiting
+    and seated) are cached in memory as compact QueueEntry records, indexed by
+    id and by queue order, with per-queue status counts kept up to date on
+    every change. Mutations are written through to the table before the cache
+    changes.
+    Each shard has its own lock, ticket sequence and change log, so venues
+    never contend with each other.
+    Advance bookings hold seats in a SlotIndex and join the waiting queue
+    BOOKING_PROMOTE_MINUTES before their scheduled start.
+    Active, booked and recently finished reservations are indexed for host
+    search by name, phone and email.
+    Every change to the waiting line updates an EtaTracker, whose ETA and
+    threshold events are handed to the listeners after the mutation.
+    Departures also update a LocationLoad, which projects the wait at each
+    location of a service type for routing new parties.
+    """
+
+    def __init__(self, venue, listeners=None):
+        self.venue = venue
+        self.listeners = listeners if listeners is not None else []
+        self.changes = QueueChangeLog()
+        self._lock = threading.RLock()
+        self._entries: Dict[int, QueueEntry] = {}  # id -> active reservation
+        self._waiting: List[tuple] = []  # sorted (created_us, id) keys of waiting entries
+        self._counts = Counter()  # (status, service, location) codes -> active entries
+        self._status_counts = Counter()  # status code -> active entries
+        self.bookings = SlotIndex(location_capacity)
+        self.promote_lead = timedelta(minutes=int(os.getenv('BOOKING_PROMOTE_MINUTES', 10)))
+        self.search_index = self._new_search_index()
+        self.eta = EtaTracker(service_pace(services))
+        self.locations = LocationLoad(services, location_capacity)
+        self._loaded = False
+
+    @staticmethod
+    def _new_search_index():
+        return SearchIndex(SEARCH_RETENTION // timedelta(microseconds=1))
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            active = Reservation.query.filter(
+                Reservation.venue == self.venue,
+                Reservation.status.in_(ACTIVE_STATUSES)
+            ).all()
+            for reservation in active:
+                self._cache(QueueEntry.from_reservation(reservation), track=False)
+            self.eta.prime(self._waiting)
+
+            today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+            booked = Reservation.query.filter(
+                Reservation.venue == self.venue,
+                Reservation.scheduled_end >= today,
+                Reservation.status.in_(HOLDING_STATUSES)
+            ).all()
+            for reservation in booked:
+                self.bookings.add(reservation.id, self._booking(reservation))
+
+            recent = Reservation.query.filter(
+                Reservation.venue == self.venue,
+                Reservation.status.in_(FINISHED_STATUSES),
+                Reservation.completed_at >= datetime.utcnow() - SEARCH_RETENTION
+            ).order_by(Reservation.completed_at).all()
+            upcoming = [reservation for reservation in booked if reservation.status == 'booked']
+            self.search_index.load(
+                [QueueEntry.from_reservation(reservation) for reservation in recent + upcoming]
+                + list(self._entries.values())
+            )
+            self._loaded = True
+
+    def reload(self):
+        """Drop the cache so the next call reloads it from the database"""
+        with self._lock:
+            self._entries.clear()
+            self._waiting.clear()
+            self._counts.clear()
+            self._status_counts.clear()
+            self.bookings = SlotIndex(location_capacity)
+            self.search_index = self._new_search_index()
+            self.eta = EtaTracker(service_pace(services))
+            self.locations = LocationLoad(services, location_capacity)
+            self._loaded = False
+
+    def _cache(self, entry: QueueEntry, track=True):
+        self._entries[entry.id] = entry
+        self._counts[(entry.status_code, entry.service_code, entry.location_code)] += 1
+        self._status_counts[entry.status_code] += 1
+        if entry.status_code == WAITING:
+            key = entry.order_key
+            index = bisect_left(self._waiting, key)
+            self._waiting.insert(index, key)
+            if track:
+                self.eta.moved(self._waiting, index, 1)
+
+    def _uncache(self, entry_id) -> Optional[QueueEntry]:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return None
+        self._counts[(entry.status_code, entry.service_code, entry.location_code)] -= 1
+        self._status_counts[entry.status_code] -= 1
+        if entry.status_code == WAITING:
+            key = entry.order_key
+            index = bisect_left(self._waiting, key)
+            if index < len(self._waiting) and self._waiting[index] == key:
+                del self._waiting[index]
+                self.eta.moved(self._waiting, index, -1)
+        return entry
+
+    def _publish(self):
+        """Hand pending ETA and threshold events to the listeners"""
+        events = self.eta.drain()
+        if not events:
+            return
+        for listener in self.listeners:
+            try:
+                listener(self.venue, events)
+            except Exception as e:
+                print(f"Error publishing queue events: {str(e)}")
+
+    def enqueue(self, name, party_size, service_type, location, phone='', email='', notes=None,
+                max_attempts=3) -> Dict:
+        """Add a waiting reservation and return it with its ticket and queue position"""
+        self._ensure_loaded()
+        with self._lock:
+            for attempt in range(max_attempts):
+                try:
+                    ticket, position = allocate_ticket(self.venue)
+                    reservation = Reservation(
+                        venue=self.venue,
+                        ticket_number=ticket,
+                        initial_position=position,
+                        name=name,
+                        phone=phone or '',
+                        email=email or '',
+                        party_size=party_size,
+                        service_type=service_type,
+                        location=location,
+                        status='waiting',
+                        notes=notes,
+                        created_at=datetime.utcnow()
+                    )
+                    db.session.add(reservation)
+                    db.session.flush()
+                    reservation_events.record(reservation, None, now=reservation.created_at)
+                    db.session.commit()
+                    break
+                except IntegrityError:
+                    db.session.rollback()
+                    if attempt == max_attempts - 1:
+                        raise
+
+            entry = QueueEntry.from_reservation(reservation)
+            self._cache(entry)
+            self.search_index.add(entry)
+            self.changes.record(reservation.id, INSERTED)
+            self._publish()
+            return {**reservation.to_dict(), 'queue_position': position}
+
+    @staticmethod
+    def _booking(reservation) -> Booking:
+        return Booking(reservation.location, reservation.scheduled_start, reservation.scheduled_end,
+                       reservation.party_size)
+
+    def book(self, name, party_size, service_type, location, start, end, phone='', email='',
+             notes=None) -> Optional[Dict]:
+        """Reserve seats for [start, end); returns None when the location is full"""
+        self._ensure_loaded()
+        booking = Booking(location, start, end, party_size)
+        with self._lock:
+            if not self.bookings.fits(booking):
+                return None
+            reservation = Reservation(
+                venue=self.venue,
+                name=name,
+                phone=phone or '',
+                email=email or '',
+                party_size=party_size,
+                service_type=service_type,
+                location=location,
+                status='booked',
+                notes=notes,
+                scheduled_start=start,
+                scheduled_end=end,
+                created_at=datetime.utcnow()
+            )
+            db.session.add(reservation)
+            db.session.flush()
+            reservation_events.record(reservation, None, now=reservation.created_at)
+            db.session.commit()
+
+            self.bookings.add(reservation.id, booking)
+            self.search_index.add(QueueEntry.from_reservation(reservation))
+            self.changes.record(reservation.id, INSERTED)
+            return reservation.to_dict()
+
+    def availability(self, opens, closes, party_size, duration_slots, locations=None) -> List[Dict]:
+        """Free booking start times between two naive UTC times, per location"""
+        self._ensure_loaded()
+        return self.bookings.availability(
+            opens, closes, party_size, duration_slots, locations, not_before=datetime.utcnow()
+        )
+
+    def promote_due(self, now=None) -> List[Dict]:
+        """Move bookings starting within the promotion lead time into the waiting queue"""
+        self._ensure_loaded()
+        due = self.bookings.starting_before((now or datetime.utcnow()) + self.promote_lead)
+        promoted = []
+        for index, entry_id in enumerate(due):
+            try:
+                entry = self._promote(entry_id)
+            except Exception as e:
+                db.session.rollback()
+                # Keep this booking and the ones not reached yet due, so the next request retries them
+                self.bookings.requeue(due[index:])
+                print(f"Error promoting booking {entry_id}: {str(e)}")
+                break
+            if entry is not None:
+                promoted.append(entry)
+        return promoted
+
+    def _promote(self, entry_id, max_attempts=3) -> Optional[Dict]:
+        """Move one booking into the waiting queue; None if it is no longer booked"""
+        with self._lock:
+            for attempt in range(max_attempts):
+                reservation = Reservation.query.get(entry_id)
+                if not reservation or reservation.status != 'booked':
+                    return None
+                try:
+                    ticket, position = allocate_ticket(self.venue)
+                    reservation.ticket_number = ticket
+                    reservation.initial_position = position
+                    reservation.status = 'waiting'
+                    reservation_events.record(reservation, 'booked')
+                    db.session.commit()
+                    break
+                except IntegrityError:
+                    db.session.rollback()
+                    if attempt == max_attempts - 1:
+                        raise
+
+            entry = QueueEntry.from_reservation(reservation)
+            self._cache(entry)
+            self.search_index.add(entry)
+            self.changes.record(entry_id, UPDATED)
+            self._publish()
+            return {**reservation.to_dict(), 'queue_position': self.position(entry_id)}
+
+    def transition(self, entry_id, status, notes=None) -> Optional[Dict]:
+        """Move a reservation to a new status, writing through to the database.
+
+        Raises ValueError for a status outside the known set.
+        """
+        if status not in STATUSES:
+            raise ValueError(f'Unknown status: {status}')
+        self._ensure_loaded()
+        with self._lock:
+            reservation = Reservation.query.get(entry_id)
+            if not reservation or reservation.venue != self.venue:
+                return None
+
+            now = datetime.utcnow()
+            if status != reservation.status:
+                reservation_events.record(reservation, reservation.status, status, now)
+            reservation.status = status
+            if notes:
+                reservation.notes = notes
+            if status in FINISHED_STATUSES and not reservation.completed_at:
+                reservation.completed_at = now
+            db.session.commit()
+
+            previous = self._uncache(entry_id)
+            entry = QueueEntry.from_reservation(reservation)
+            if status in ACTIVE_STATUSES:
+                self._cache(entry)
+            else:
+                self.eta.forget(entry_id)
+            if previous is not None and previous.status_code == WAITING and status in SERVED_STATUSES:
+                self.eta.departed(to_epoch_us(now), self._waiting)
+                self.locations.departed(
+                    previous.service_type, previous.location, to_epoch_us(now),
+                    self._counts[(WAITING, previous.service_code, previous.location_code)] > 0
+                )
+            if status not in HOLDING_STATUSES:
+                self.bookings.release(entry_id)
+            self.search_index.add(entry)
+            # Finished entries age out here too, not only when someone searches
+            self.search_index.expire(to_epoch_us(now))
+            self.changes.record(entry_id, UPDATED)
+            self._publish()
+            return reservation.to_dict()
+
+    def remove(self, entry_id) -> Optional[Dict]:
+        """Delete a reservation from the queue and the database"""
+        self._ensure_loaded()
+        with self._lock:
+            reservation = Reservation.query.get(entry_id)
+            if not reservation or reservation.venue != self.venue:
+                return None
+            entry = reservation.to_dict()
+            reservation_events.record(reservation, reservation.status, reservation_events.DELETED)
+            db.session.delete(reservation)
+            db.session.commit()
+
+            self._uncache(entry_id)
+            self.bookings.release(entry_id)
+            self.search_index.remove(entry_id)
+            self.eta.forget(entry_id)
+            self.changes.record(entry_id, REMOVED)
+            self._publish()
+            return entry
+
+    def position(self, entry_id) -> Optional[int]:
+        """1-based position among waiting entries, or None if not waiting"""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or entry.status_code != WAITING:
+                return None
+            return bisect_left(self._waiting, entry.order_key) + 1
+
+    def get(self, entry_id) -> Optional[Dict]:
+        self._ensure_loaded()
+        entry = self._entries.get(entry_id)
+        return entry.to_dict(self.venue) if entry else None
+
+    def get_many(self, entry_ids) -> List[Dict]:
+        self._ensure_loaded()
+        entries = (self._entries.get(entry_id) for entry_id in entry_ids)
+        return [entry.to_dict(self.venue) for entry in entries if entry]
+
+    def waiting_count(self) -> int:
+        self._ensure_loaded()
+        return len(self._waiting)
+
+    def status_count(self, status) -> int:
+        self._ensure_loaded()
+        return self._status_counts[STATUSES.code(status)]
+
+    def count(self, status, service_type, location) -> int:
+        """Active entries with a status in one service type and location queue"""
+        self._ensure_loaded()
+        return self._counts[(STATUSES.code(status), SERVICE_TYPES.code(service_type), LOCATIONS.code(location))]
+
+    def location_waits(self, service_type, party_size=1) -> List[Dict]:
+        """Live load and projected wait of every location that can take the party, in configured order"""
+        self._ensure_loaded()
+        waits = []
+        for location in self.locations.eligible(service_type, party_size):
+            waiting = self.count('waiting', service_type, location)
+            seated = self.count('seated', service_type, location)
+            pace = self.locations.pace[(service_type, location)]
+            waits.append({
+                'location': location,
+                'waiting': waiting,
+                'seated': seated,
+                'partiesPerHour': round(60 / pace, 1),
+                'projectedWait': round(self.locations.projected_wait(service_type, location, waiting, seated), 1)
+            })
+        return waits
+
+    def entries(self, status=None) -> List[QueueEntry]:
+        """Active QueueEntry records in queue order, optionally filtered by status"""
+        self._ensure_loaded()
+        with self._lock:
+            if status == 'waiting':
+                return [self._entries[entry_id] for _, entry_id in self._waiting]
+            entries = sorted(self._entries.values(), key=lambda entry: entry.order_key)
+        if status:
+            status_code = STATUSES.code(status)
+            entries = [entry for entry in entries if entry.status_code == status_code]
+        return entries
+
+    def snapshot(self, status=None) -> List[Dict]:
+        """Active entries as dicts in queue order, optionally filtered by status"""
+        return [entry.to_dict(self.venue) for entry in self.entries(status)]
+
+    def search(self, query, limit=10) -> List[Dict]:
+        """Reservations matching a name, phone or email query, best match first"""
+        self._ensure_loaded()
+        self.search_index.expire(to_epoch_us(datetime.utcnow()))
+        return [
+            {**entry.to_dict(self.venue), 'queue_position': self.position(entry.id), 'score': score}
+            for score, entry in self.search_index.search(query, limit)
+        ]
+
+
+class QueueEngine:
+    """Routes queue operations to per-venue shards"""
+
+    def __init__(self):
+        self._shards: Dict[str, QueueShard] = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """Call listener(venue, events) with the ETA and threshold events of every queue change"""
+        self._listeners.append(listener)
+
+    def shard(self, venue=None) -> QueueShard:
+        venue = venue or DEFAULT_VENUE
+        shard = self._shards.get(venue)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.get(venue)
+                if shard is None:
+                    shard = self._shards[venue] = QueueShard(venue, self._listeners)
+        return shard
+
+    def shard_for(self, entry_id, venue=None) -> Optional[QueueShard]:
+        """The venue's shard if the reservation id belongs to that venue, else None.
+
+        Callers pass the request's venue, which route_venue_shard has checked
+        this process owns; a reservation of another venue is not found, so
+        only the owning worker ever changes its shard.
+        """
+        shard = self.shard(venue)
+        if shard.get(entry_id):
+            return shard
+        owner = db.session.query(Reservation.venue).filter(Reservation.id == entry_id).scalar()
+        return shard if owner == shard.venue else None
+
+    def venues(self) -> List[str]:
+        return list(self._shards)
+
+    def reload(self):
+        for shard in list(self._shards.values()):
+            shard.reload()
+
+    def enqueue(self, venue=None, **fields) -> Dict:
+        return self.shard(venue).enqueue(**fields)
+
+    def transition(self, entry_id, status, notes=None, venue=None) -> Optional[Dict]:
+        shard = self.shard_for(entry_id, venue)
+        return shard.transition(entry_id, status, notes) if shard else None
+
+    def remove(self, entry_id, venue=None) -> Optional[Dict]:
+        shard = self.shard_for(entry_id, venue)
+        return shard.remove(entry_id) if shard else None
+
+    def get(self, entry_id, venue=None) -> Optional[Dict]:
+        shard = self.shard_for(entry_id, venue)
+        return shard.get(entry_id) if shard else None
+
+
+# Initialize the queue engine
+queue_engine = QueueEngine()
@@ -0,0 +1,169 @@
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from services import services
+
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(value: Optional[datetime]) -> int:
+    """Naive UTC datetime -> integer microseconds since the epoch (0 for None)"""
+    return (value - EPOCH) // _MICROSECOND if value else 0
+
+
+def from_epoch_us(value: int) -> Optional[datetime]:
+    return EPOCH + timedelta(microseconds=value) if value else None
+
+
+def isoformat_us(value: int) -> Optional[str]:
+    return from_epoch_us(value).isoformat() if value else None
+
+
+class CodeTable:
+    """Interns repeated strings (statuses, service types, locations) as small integer codes.
+
+    A closed table only knows the values it was built with and raises
+    ValueError for anything else, so request input cannot grow it.
+    """
+
+    def __init__(self, values=(), closed=False):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.closed = False
+        for value in values:
+            self.code(value)
+        self.closed = closed
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            if self.closed:
+                raise ValueError(f'Unknown value: {value}')
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self.values)
+                    self.values.append(sys.intern(value))
+                    self._codes[value] = code
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self._codes
+
+
+STATUSES = CodeTable(('waiting', 'seated', 'completed', 'served', 'no-show', 'cancelled', 'booked'), closed=True)
+SERVICE_TYPES = CodeTable(services, closed=True)
+LOCATIONS = CodeTable(dict.fromkeys(location for service in services.values() for location in service['locations']), closed=True)
+
+WAITING = STATUSES.code('waiting')
+SEATED = STATUSES.code('seated')
+
+
+class QueueEntry:
+    """Compact in-memory form of an active reservation.
+
+    Strings that repeat across entries are stored as interned codes and
+    timestamps as integer microseconds, so an entry costs a fraction of a
+    to_dict() dict and compares cheaply in the queue order index.
+    """
+
+    __slots__ = (
+        'id', 'ticket_number', 'initial_position', 'party_size',
+        'status_code', 'service_code', 'location_code',
+        'created_us', 'updated_us', 'completed_us', 'seated_us', 'no_show_us', 'scheduled_us',
+        'scheduled_end_us', 'name', 'phone', 'email', 'notes'
+    )
+
+    def __init__(self, id, ticket_number, initial_position, party_size, status_code, service_code,
+                 location_code, created_us, updated_us, completed_us, seated_us, no_show_us, scheduled_us,
+                 scheduled_end_us, name, phone, email, notes):
+        self.id = id
+        self.ticket_number = ticket_number
+        self.initial_position = initial_position
+        self.party_size = party_size
+        self.status_code = status_code
+        self.service_code = service_code
+        self.location_code = location_code
+        self.created_us = created_us
+        self.updated_us = updated_us
+        self.completed_us = completed_us
+        self.seated_us = seated_us
+        self.no_show_us = no_show_us
+        self.scheduled_us = scheduled_us
+        self.scheduled_end_us = scheduled_end_us
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.notes = notes
+
+    @classmethod
+    def from_reservation(cls, reservation) -> 'QueueEntry':
+        return cls(
+            reservation.id,
+            reservation.ticket_number,
+            reservation.initial_position,
+            reservation.party_size,
+            STATUSES.code(reservation.status),
+            SERVICE_TYPES.code(reservation.service_type),
+            LOCATIONS.code(reservation.location),
+            to_epoch_us(reservation.created_at),
+            to_epoch_us(reservation.updated_at),
+            to_epoch_us(reservation.completed_at),
+            to_epoch_us(reservation.seated_at),
+            to_epoch_us(reservation.no_show_at),
+            to_epoch_us(reservation.scheduled_start),
+            to_epoch_us(reservation.scheduled_end),
+            reservation.name,
+            reservation.phone,
+            reservation.email,
+            reservation.notes
+        )
+
+    @property
+    def status(self) -> str:
+        return STATUSES.values[self.status_code]
+
+    @property
+    def service_type(self) -> str:
+        return SERVICE_TYPES.values[self.service_code]
+
+    @property
+    def location(self) -> str:
+        return LOCATIONS.values[self.location_code]
+
+    @property
+    def order_key(self):
+        # Bookings take their place in the queue at their scheduled time
+        return (self.scheduled_us or self.created_us, self.id)
+
+    def to_dict(self, venue) -> Dict:
+        """Same shape as Reservation.to_dict()"""
+        return {
+            'id': self.id,
+            'venue': venue,
+            'ticket_number': self.ticket_number,
+            'initial_position': self.initial_position,
+            'name': self.name,
+            'phone': self.phone,
+            'email': self.email,
+            'party_size': self.party_size,
+            'service_type': self.service_type,
+            'location': self.location,
+            'status': self.status,
+            'notes': self.notes,
+            'created_at': isoformat_us(self.created_us),
+            'updated_at': isoformat_us(self.updated_us),
+            'completed_at': isoformat_us(self.completed_us),
+            'seated_at': isoformat_us(self.seated_us),
+            'no_show_at': isoformat_us(self.no_show_us),
+            'scheduled_start': isoformat_us(self.scheduled_us),
+            'scheduled_end': isoformat_us(self.scheduled_end_us),
+            'wait_time': (self.completed_us - self.created_us) / 1e6 if self.completed_us else None
+        }
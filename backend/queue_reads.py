@@ -0,0 +1,85 @@
+import random
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+
+from models import db, Reservation
+
+reservations = Reservation.__table__
+
+# Columns returned by list endpoints, in the order they come back from the query
+RESERVATION_COLUMNS = (
+    'id', 'venue', 'ticket_number', 'initial_position', 'name', 'phone', 'email',
+    'party_size', 'service_type', 'location', 'status', 'notes',
+    'created_at', 'updated_at', 'completed_at', 'seated_at', 'no_show_at', 'scheduled_start', 'scheduled_end'
+)
+_SELECT_COLUMNS = [reservations.c[name] for name in RESERVATION_COLUMNS]
+
+
+def fetch_rows(*criteria, order_by=None, limit=None) -> List[tuple]:
+    """Select reservation columns as plain tuples, bypassing ORM hydration"""
+    query = select(*_SELECT_COLUMNS).where(*criteria)
+    if order_by is not None:
+        query = query.order_by(order_by)
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
+
+
+def row_to_dict(row, now=None) -> Dict:
+    """Same shape as Reservation.to_dict(); datetimes are left for the JSON encoder.
+
+    With now given, waiting rows report minutes waited so far as wait_time,
+    as /api/queue always has.
+    """
+    entry = dict(zip(RESERVATION_COLUMNS, row))
+    created_at, completed_at = entry['created_at'], entry['completed_at']
+    if now is not None and entry['status'] == 'waiting':
+        entry['wait_time'] = int((now - created_at).total_seconds() / 60)
+    else:
+        entry['wait_time'] = (completed_at - created_at).total_seconds() if completed_at else None
+    return entry
+
+
+def rows_to_dicts(rows: Iterable[tuple], now=None) -> List[Dict]:
+    return [row_to_dict(row, now) for row in rows]
+
+
+def venue_queue(venue, entry_ids=None) -> List[Dict]:
+    """Reservations for /api/queue, newest first, optionally limited to some ids"""
+    criteria = [reservations.c.venue == venue]
+    if entry_ids is not None:
+        criteria.append(reservations.c.id.in_(list(entry_ids)))
+    rows = fetch_rows(*criteria, order_by=reservations.c.created_at.desc())
+    return rows_to_dicts(rows, now=datetime.utcnow())
+
+
+def next_by_priority(waiting: List[Dict], now, limit=5) -> List[Dict]:
+    """The waiting reservations to call next, highest priority score first"""
+    scored_reservations = []
+    for reservation in waiting:
+        # Base priority on wait time
+        wait_time = (now - reservation['created_at']).total_seconds() / 60
+        priority_score = wait_time * 0.5  # Base score from wait time
+
+        # Adjust priority based on party size (larger parties get higher priority)
+        if reservation['party_size'] > 4:
+            priority_score += 10
+        elif reservation['party_size'] > 2:
+            priority_score += 5
+
+        # Adjust priority based on service type
+        if reservation['service_type'] == 'dine-in':
+            priority_score += 5
+        elif reservation['service_type'] == 'delivery':
+            priority_score += 3
+
+        # Add random factor to prevent exact ties
+        priority_score += random.uniform(0, 1)
+
+        scored_reservations.append((priority_score, reservation))
+
+    # Sort by priority score
+    scored_reservations.sort(key=lambda x: x[0], reverse=True)
+    return [reservation for _, reservation in scored_reservations[:limit]]
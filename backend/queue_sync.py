@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+INSERTED = 'inserted'
+UPDATED = 'updated'
+REMOVED = 'removed'
+
+
+class QueueChangeLog:
+    """Monotonic queue version plus a bounded log of the entries each version touched.
+
+    Polling clients send back the last version they saw and receive only the
+    entries changed since then. Clients older than the retained log get a full
+    snapshot instead. The version is per process, so it pairs with the
+    single-worker deployment in the Procfile. Clients see it as a token
+    prefixed with a random epoch per log, so a token from before a restart
+    never matches a new process's count and gets a full snapshot.
+    """
+
+    def __init__(self, max_changes: int = 1000):
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        self._changes = deque(maxlen=max_changes)  # (version, entry_id, op)
+        self._lock = threading.Lock()
+
+    def record(self, entry_id, op: str) -> int:
+        """Bump the version for a mutation of one entry"""
+        with self._lock:
+            self.version += 1
+            self._changes.append((self.version, entry_id, op))
+            return self.version
+
+    def token(self, version: int) -> str:
+        """The client-facing form of a version, as sent in ?since=, X-Queue-Version and the ETag"""
+        return f'{self.epoch}-{version}'
+
+    def version_of(self, token) -> Optional[int]:
+        """The version a token names; None when it is malformed or from another epoch"""
+        epoch, _, version = str(token).rpartition('-')
+        if epoch != self.epoch:
+            return None
+        try:
+            return int(version)
+        except ValueError:
+            return None
+
+    def changes_since(self, version: int) -> Optional[Tuple[int, Dict[object, str]]]:
+        """The current version and the changes up to it after version, collapsed into one op per entry id.
+
+        Both are read under the same lock, so no change is counted in the
+        version but missing from the ops. Returns None when the log no longer reaches back to version (or the
+        version is from the future, e.g. after a restart) so the caller must
+        send a full snapshot.
+        """
+        with self._lock:
+            if version > self.version:
+                return None
+            if version < self.version and (not self._changes or self._changes[0][0] > version + 1):
+                return None
+            changes = [change for change in self._changes if change[0] > version]
+            current = self.version
+
+        net = {}
+        for _, entry_id, op in changes:
+            previous = net.get(entry_id)
+            if previous == INSERTED and op == REMOVED:
+                # Inserted and removed within the window: the client never saw it
+                del net[entry_id]
+            elif previous == INSERTED:
+                continue
+            else:
+                net[entry_id] = op
+        return current, net
+
+    def delta(self, version: int, load_entries: Callable[[Iterable], List[Dict]]) -> Optional[Dict]:
+        """Build a delta payload, loading the current state of changed entries with load_entries"""
+        since = self.changes_since(version)
+        if since is None:
+            return None
+
+        current, net = since
+        changed_ids = [entry_id for entry_id, op in net.items() if op != REMOVED]
+        entries = {entry['id']: entry for entry in load_entries(changed_ids)} if changed_ids else {}
+        delta = {'version': self.token(current), 'full': False, INSERTED: [], UPDATED: [], REMOVED: []}
+        for entry_id, op in net.items():
+            if op == REMOVED or entry_id not in entries:
+                delta[REMOVED].append(entry_id)
+            else:
+                delta[op].append(entries[entry_id])
+        return delta
+
@@ -0,0 +1,172 @@
+"""Closed-form M/M/c (Erlang-C) wait estimates.
+
+Each service type is one queue drained by the `servers` parallel tables,
+counters or drivers listed in services.py. Mean service times come from
+recent table turns in reservation_events when there are enough of them,
+otherwise from `average_service_time`. Arrival rates come from the
+reservations created in the last hour. Estimates are the minutes from
+joining the queue to being finished, the same target the wait-time model is
+trained on, and a whole queue is estimated in one vectorised pass.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple
+
+import numpy as np
+from sqlalchemy import func, select
+
+from features import SERVICE_TYPES
+from models import db, ReservationEvent
+
+events = ReservationEvent.__table__
+
+
+def erlang_c(servers, load) -> np.ndarray:
+    """Probability that an arrival waits, for arrays of server counts and offered loads.
+
+    load is arrivals per minute x mean service minutes. Uses the Erlang-B
+    recursion, which stays stable for large server counts; saturated queues
+    (load >= servers) always wait.
+    """
+    servers = np.asarray(servers, dtype=np.int64)
+    load = np.asarray(load, dtype=np.float64)
+    blocking = np.ones(np.broadcast(servers, load).shape)
+    for k in range(1, int(servers.max(initial=0)) + 1):
+        blocking = np.where(k <= servers, load * blocking / (k + load * blocking), blocking)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        waiting = servers * blocking / (servers - load * (1 - blocking))
+    return np.where(load < servers, waiting, 1.0)
+
+
+def ahead_by_service(service_codes) -> np.ndarray:
+    """Parties of the same service type ahead of each entry of a queue in order"""
+    service_codes = np.asarray(service_codes, dtype=np.int64)
+    order = np.argsort(service_codes, kind='stable')
+    first = np.searchsorted(service_codes[order], service_codes[order], side='left')
+    ahead = np.empty(len(service_codes), dtype=np.int64)
+    ahead[order] = np.arange(len(service_codes)) - first
+    return ahead
+
+
+class Rates(NamedTuple):
+    """Per service code: mean service minutes, arrivals per minute and the steady-state queue wait"""
+    service_minutes: np.ndarray
+    arrivals: np.ndarray
+    steady_waits: np.ndarray
+
+
+class QueueingEstimator:
+    """Per-venue M/M/c wait estimates for every service type.
+
+    Arrays are indexed by features.SERVICE_TYPES codes, with one extra slot
+    for unknown service types.
+    """
+
+    def __init__(self, service_config, min_samples=20, turn_days=7, arrival_minutes=60, refresh_seconds=300):
+        names = SERVICE_TYPES.categories
+        self.servers = np.array([service_config.get(name, {}).get('servers', 1) for name in names] + [1])
+        self.default_minutes = np.array(
+            [float(service_config.get(name, {}).get('average_service_time', 15)) for name in names] + [15.0]
+        )
+        self.min_samples = min_samples
+        self.turn_days = turn_days
+        self.arrival_minutes = arrival_minutes
+        self.refresh_seconds = refresh_seconds
+        self.default_rates = self.make_rates(self.default_minutes, np.zeros(len(self.servers)))
+        self._rates: Dict[str, tuple] = {}  # venue -> (monotonic time loaded, Rates)
+        self._lock = threading.Lock()
+
+    def make_rates(self, service_minutes, arrivals) -> Rates:
+        """Rates with the Erlang-C wait of a party arriving to a queue in steady state"""
+        load = arrivals * service_minutes
+        with np.errstate(divide='ignore', invalid='ignore'):
+            steady = erlang_c(self.servers, load) * service_minutes / (self.servers - load)
+        # A saturated queue has no steady state; assume every server is busy
+        steady = np.where(load < self.servers, steady, service_minutes / self.servers)
+        return Rates(service_minutes, arrivals, steady)
+
+    def _load_rates(self, venue, now) -> Rates:
+        """Service times and arrival rates from the venue's recent events"""
+        service_minutes = self.default_minutes.copy()
+        turns = db.session.execute(
+            select(events.c.service_type, func.avg(events.c.stage_seconds), func.count(events.c.id))
+            .where(
+                events.c.venue == venue,
+                events.c.from_status == 'seated',
+                events.c.stage_seconds.isnot(None),
+                events.c.occurred_at >= now - timedelta(days=self.turn_days)
+            )
+            .group_by(events.c.service_type)
+        ).all()
+        for service_type, seconds, count in turns:
+            if count >= self.min_samples and seconds:
+                service_minutes[SERVICE_TYPES.encode(service_type)] = seconds / 60
+
+        arrivals = np.zeros(len(self.servers))
+        joined = db.session.execute(
+            select(events.c.service_type, func.count(events.c.id))
+            .where(
+                events.c.venue == venue,
+                events.c.to_status == 'waiting',
+                events.c.occurred_at >= now - timedelta(minutes=self.arrival_minutes)
+            )
+            .group_by(events.c.service_type)
+        ).all()
+        for service_type, count in joined:
+            arrivals[SERVICE_TYPES.encode(service_type)] += count / self.arrival_minutes
+        return self.make_rates(service_minutes, arrivals)
+
+    def rates(self, venue=None) -> Rates:
+        """The venue's cached rates; configured service times and no arrivals without a venue"""
+        if venue is None:
+            return self.default_rates
+        cached = self._rates.get(venue)
+        if cached and time.monotonic() - cached[0] < self.refresh_seconds:
+            return cached[1]
+        with self._lock:
+            try:
+                rates = self._load_rates(venue, datetime.utcnow())
+            except Exception as e:
+                print(f"Error loading queueing rates for {venue}: {str(e)}")
+                rates = cached[1] if cached else self.default_rates
+            self._rates[venue] = (time.monotonic(), rates)
+        return rates
+
+    def waits(self, ahead, service_codes, busy=None, venue=None, rates=None) -> np.ndarray:
+        """Minutes until each party is finished.
+
+        ahead counts parties of the same service type in front of each one.
+        With busy (servers in use per service code) the wait is exact for
+        the current state: the first free servers start at once and everyone
+        else waits for (ahead + 1 - free) departures at c / m per minute.
+        Without it, a party with nobody ahead gets the steady-state Erlang-C
+        wait and one with a queue ahead assumes every server is busy.
+        """
+        ahead = np.asarray(ahead, dtype=np.float64)
+        codes = np.asarray(service_codes, dtype=np.int64)
+        if rates is None:
+            rates = self.rates(venue)
+        servers = self.servers[codes]
+        minutes = rates.service_minutes[codes]
+
+        if busy is not None:
+            free = np.maximum(0, servers - np.asarray(busy)[codes])
+            start = np.maximum(0.0, ahead + 1 - free) * minutes / servers
+        else:
+            start = np.where(ahead > 0, (ahead + 1) * minutes / servers, rates.steady_waits[codes])
+        return start + minutes
+
+    def queue_waits(self, waiting, busy=None, venue=None) -> np.ndarray:
+        """waits() for a queue of reservation dicts in arrival order"""
+        codes = SERVICE_TYPES.encode_many(reservation['service_type'] for reservation in waiting)
+        return self.waits(ahead_by_service(codes), codes, busy, venue)
+
+    def predict_one(self, queue_length, party_size, service_type, when=None, venue=None) -> float:
+        """Minutes until finished for one party; same call shape as WaitTimeModel.predict_one"""
+        code = SERVICE_TYPES.encode(service_type)
+        rates = self.rates(venue)
+        minutes = float(rates.service_minutes[code])
+        if queue_length > 0:
+            return (queue_length + 1) * minutes / int(self.servers[code]) + minutes
+        return float(rates.steady_waits[code]) + minutes
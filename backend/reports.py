@@ -0,0 +1,347 @@
+"""Historical reports over date ranges, computed in the background.
+
+A report covers whole UTC days of one venue. The range is split into
+chunks of REPORT_CHUNK_DAYS days. Each chunk is aggregated in a worker
+process of a shared pool: counts by status, day, hour, service type and
+location, plus a one-minute histogram of queue waits. These partials are
+merged by summing, so percentiles come from the merged histogram and no
+chunk has to see another chunk's rows.
+
+Jobs run on a coordinator thread and clients poll them by id. The id is
+a hash of the venue and range, so asking twice for the same report joins
+the existing job. A report whose range ended before today is written to
+REPORT_DIR and served from there from then on. A report that includes
+today is reused for REPORT_LIVE_SECONDS and then recomputed on the next
+request.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from db_config import create_profiled_engine
+from features import SERVICE_TYPES
+from models import Reservation
+
+# Bump when the report layout changes so cached reports are recomputed
+REPORT_VERSION = 1
+
+# Queue waits are binned by minute up to this; longer waits share the last bin
+MAX_WAIT_MINUTES = 240
+WAIT_PERCENTILES = (50, 75, 90, 95, 99)
+SERVED = ('completed', 'served')
+
+reservations = Reservation.__table__
+
+
+def parse_period(data) -> Tuple[date, date]:
+    """First and last day of a report from {month: 'YYYY-MM'}, {quarter: 'YYYY-Qn'} or {start, end}"""
+    if data.get('month'):
+        first = datetime.strptime(data['month'], '%Y-%m').date()
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    elif data.get('quarter'):
+        year, _, quarter = str(data['quarter']).upper().partition('-Q')
+        if not year.isdigit() or quarter not in ('1', '2', '3', '4'):
+            raise ValueError('quarter must look like 2025-Q2')
+        first = date(int(year), 3 * int(quarter) - 2, 1)
+        following = date(first.year + 1, 1, 1) if quarter == '4' else date(first.year, first.month + 3, 1)
+        last = following - timedelta(days=1)
+    elif data.get('start') and data.get('end'):
+        first = date.fromisoformat(data['start'])
+        last = date.fromisoformat(data['end'])
+    else:
+        raise ValueError('Give a month, a quarter, or a start and end date')
+    if last < first:
+        raise ValueError('end must not be before start')
+    return first, last
+
+
+def report_id(venue, first: date, last: date) -> str:
+    key = f'{REPORT_VERSION}|{venue}|{first.isoformat()}|{last.isoformat()}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def day_chunks(first: date, last: date, chunk_days: int) -> List[Tuple[date, date]]:
+    """[start, stop) day ranges of at most chunk_days covering first..last"""
+    chunks = []
+    start = first
+    while start <= last:
+        stop = min(start + timedelta(days=chunk_days), last + timedelta(days=1))
+        chunks.append((start, stop))
+        start = stop
+    return chunks
+
+
+def _wait_minutes(frame) -> np.ndarray:
+    """Minutes from joining to leaving the queue; NaN when the party never left it.
+
+    Dine-in parties leave the queue when seated; takeout and delivery when
+    served. A completed dine-in row without seated_at has no queue wait.
+    """
+    served = frame['completed_at'].where(frame['status'] == 'served')
+    left = frame['seated_at'].where(frame['seated_at'].notna(), served)
+    return ((left - frame['created_at']) / pd.Timedelta(minutes=1)).to_numpy(dtype=np.float64)
+
+
+def aggregate(frame, first: date, days: int) -> Dict:
+    """Mergeable partial aggregates of one chunk of reservations"""
+    services = len(SERVICE_TYPES.categories) + 1
+    day_index = ((frame['created_at'].dt.normalize() - pd.Timestamp(first)) // pd.Timedelta(days=1)).to_numpy()
+    status = frame['status'].to_numpy()
+    service_codes = SERVICE_TYPES.encode_many(frame['service_type'])
+
+    per_day = np.zeros((3, days), dtype=np.int64)  # created, served, no-shows
+    np.add.at(per_day[0], day_index, 1)
+    np.add.at(per_day[1], day_index[np.isin(status, SERVED)], 1)
+    np.add.at(per_day[2], day_index[status == 'no-show'], 1)
+
+    waits = _wait_minutes(frame)
+    known = ~np.isnan(waits)
+    bins = np.clip(waits[known], 0, MAX_WAIT_MINUTES).astype(np.int64)
+    histogram = np.zeros((services, MAX_WAIT_MINUTES + 1), dtype=np.int64)
+    np.add.at(histogram, (service_codes[known], bins), 1)
+    wait_sums = np.bincount(service_codes[known], weights=waits[known], minlength=services)
+
+    mix = frame.groupby(['location', 'service_type']).size()
+    return {
+        'days': per_day.tolist(),
+        'statuses': {status: int(count) for status, count in frame['status'].value_counts().items()},
+        'hours': np.bincount(frame['created_at'].dt.hour.to_numpy(), minlength=24).tolist(),
+        'waitHistogram': histogram.tolist(),
+        'waitSums': wait_sums.tolist(),
+        'mix': [[location, service_type, int(count)] for (location, service_type), count in mix.items()]
+    }
+
+
+def load_chunk(engine, venue, start: date, stop: date) -> pd.DataFrame:
+    """The reservations created in [start, stop) as a DataFrame"""
+    columns = ('status', 'service_type', 'location', 'created_at', 'seated_at', 'completed_at')
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(*[reservations.c[name] for name in columns]).where(
+                reservations.c.venue == venue,
+                reservations.c.created_at >= datetime.combine(start, datetime.min.time()),
+                reservations.c.created_at < datetime.combine(stop, datetime.min.time())
+            )
+        ).all()
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    for name in ('created_at', 'seated_at', 'completed_at'):
+        frame[name] = pd.to_datetime(frame[name])
+    return frame
+
+
+_engine = None
+
+
+def _init_worker(url):
+    global _engine
+    _engine = create_profiled_engine(url)
+
+
+def _aggregate_chunk(venue, first: date, days: int, start: date, stop: date) -> Dict:
+    """Worker task: partials for [start, stop), laid out over the report's days"""
+    return aggregate(load_chunk(_engine, venue, start, stop), first, days)
+
+
+def merge(total: Optional[Dict], part: Dict) -> Dict:
+    """Sum two sets of partial aggregates"""
+    if total is None:
+        return part
+    for key in ('days', 'hours', 'waitHistogram', 'waitSums'):
+        total[key] = (np.asarray(total[key]) + np.asarray(part[key])).tolist()
+    for status, count in part['statuses'].items():
+        total['statuses'][status] = total['statuses'].get(status, 0) + count
+    total['mix'] = total['mix'] + part['mix']
+    return total
+
+
+def _wait_summary(histogram: np.ndarray, wait_sum: float) -> Dict:
+    count = int(histogram.sum())
+    if not count:
+        return {'count': 0}
+    cumulative = np.cumsum(histogram)
+    summary = {'count': count, 'mean': round(wait_sum / count, 1)}
+    for percentile in WAIT_PERCENTILES:
+        summary[f'p{percentile}'] = int(np.searchsorted(cumulative, count * percentile / 100))
+    return summary
+
+
+def summarize(partials: Dict, venue, first: date, last: date) -> Dict:
+    """The report a client sees, from the merged partials"""
+    created, served, no_shows = np.asarray(partials['days'])
+    statuses = partials['statuses']
+    total = int(created.sum())
+    histogram = np.asarray(partials['waitHistogram'])
+    wait_sums = np.asarray(partials['waitSums'])
+
+    mix = pd.DataFrame(partials['mix'], columns=['location', 'serviceType', 'count'])
+    mix = mix.groupby(['location', 'serviceType'], as_index=False)['count'].sum().sort_values('count', ascending=False)
+    mix['share'] = (mix['count'] / total).round(3) if total else 0.0
+
+    return {
+        'venue': venue,
+        'start': first.isoformat(),
+        'end': last.isoformat(),
+        'totals': {
+            'reservations': total,
+            'served': int(served.sum()),
+            'noShows': statuses.get('no-show', 0),
+            'cancelled': statuses.get('cancelled', 0),
+            'noShowRate': round(statuses.get('no-show', 0) / total, 4) if total else 0.0,
+            'cancelRate': round(statuses.get('cancelled', 0) / total, 4) if total else 0.0,
+            'statuses': statuses
+        },
+        'throughput': {
+            'servedPerDay': round(float(served.mean()), 1) if len(served) else 0.0,
+            'daily': [
+                {'date': (first + timedelta(days=day)).isoformat(), 'created': int(created[day]),
+                 'served': int(served[day]), 'noShows': int(no_shows[day])}
+                for day in range(len(created))
+            ]
+        },
+        'waits': {
+            **_wait_summary(histogram.sum(axis=0), float(wait_sums.sum())),
+            'byService': {
+                name: _wait_summary(histogram[code], float(wait_sums[code]))
+                for code, name in enumerate(SERVICE_TYPES.categories)
+            }
+        },
+        'serviceMix': mix.to_dict('records'),
+        'arrivalsByHour': partials['hours']
+    }
+
+
+class ReportJobs:
+    """Report jobs of this process, their shared worker pool and the on-disk cache"""
+
+    def __init__(self, url, directory=None, workers=None, chunk_days=None, max_days=None, live_seconds=None,
+                 jobs_kept=100):
+        self.url = url
+        self.directory = directory or os.getenv('REPORT_DIR', os.path.join('data', 'reports'))
+        self.workers = int(workers or os.getenv('REPORT_WORKERS', min(4, os.cpu_count() or 1)))
+        self.chunk_days = int(chunk_days or os.getenv('REPORT_CHUNK_DAYS', 7))
+        self.max_days = int(max_days or os.getenv('REPORT_MAX_DAYS', 731))
+        # How long a finished report whose range includes today is reused
+        self.live_seconds = float(live_seconds if live_seconds is not None else os.getenv('REPORT_LIVE_SECONDS', 60))
+        self.jobs_kept = jobs_kept
+        self._jobs: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._finished_at: Dict[str, float] = {}  # job id -> time.monotonic() when it finished
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def path(self, job_id) -> str:
+        return os.path.join(self.directory, f'report_{job_id}.json')
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Spawned, not forked: the web process has threads and pooled connections
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(self.url,)
+            )
+        return self._pool
+
+    def _load(self, job_id) -> Optional[Dict]:
+        try:
+            with open(self.path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def submit(self, venue, first: date, last: date) -> Dict:
+        """Start a report, or join the running or still current finished one for the same range"""
+        days = (last - first).days + 1
+        if days > self.max_days:
+            raise ValueError(f'Reports cover at most {self.max_days} days')
+        job_id = report_id(venue, first, last)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job['status'] in ('queued', 'running'):
+                return job
+            if job is not None and job['status'] == 'done' and (
+                    last < datetime.utcnow().date()
+                    or time.monotonic() - self._finished_at.get(job_id, 0) < self.live_seconds):
+                return job
+            cached = self._load(job_id)
+            if cached is not None:
+                return cached
+            job = {
+                'id': job_id,
+                'status': 'queued',
+                'venue': venue,
+                'start': first.isoformat(),
+                'end': last.isoformat(),
+                'chunks': len(day_chunks(first, last, self.chunk_days)),
+                'chunksDone': 0,
+                'submittedAt': datetime.utcnow().isoformat()
+            }
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            self._trim()
+        threading.Thread(target=self._run, args=(job, venue, first, last), name=f'report-{job_id}',
+                         daemon=True).start()
+        return job
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond jobs_kept; cached reports stay on disk"""
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.jobs_kept:
+                break
+            if self._jobs[job_id]['status'] in ('done', 'failed'):
+                del self._jobs[job_id]
+                self._finished_at.pop(job_id, None)
+
+    def _run(self, job, venue, first, last):
+        began = time.perf_counter()
+        days = (last - first).days + 1
+        try:
+            job['status'] = 'running'
+            futures = [
+                self._executor().submit(_aggregate_chunk, venue, first, days, start, stop)
+                for start, stop in day_chunks(first, last, self.chunk_days)
+            ]
+            partials = None
+            for future in as_completed(futures):
+                partials = merge(partials, future.result())
+                job['chunksDone'] += 1
+            report = summarize(partials, venue, first, last)
+            report['generatedAt'] = datetime.utcnow().isoformat()
+            report['seconds'] = round(time.perf_counter() - began, 2)
+            finished = {**job, 'status': 'done', 'report': report}
+            if last < datetime.utcnow().date():
+                self._save(finished)
+            with self._lock:
+                self._finished_at[job['id']] = time.monotonic()
+            job.update(finished)
+        except Exception as e:
+            print(f"Error building report {job['id']}: {str(e)}")
+            job.update(status='failed', error=str(e))
+
+    def _save(self, job):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{self.path(job["id"])}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(job, f)
+            os.replace(tmp_path, self.path(job['id']))
+        except OSError as e:
+            print(f"Error caching report {job['id']}: {str(e)}")
+
+    def status(self, job_id) -> Optional[Dict]:
+        """A job's progress, with the report once it is done; None for unknown ids"""
+        if not re.fullmatch(r'[0-9a-f]{16}', job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return dict(job) if job is not None else self._load(job_id)
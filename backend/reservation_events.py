@@ -0,0 +1,70 @@
+"""Append-only history of reservation status changes.
+
+Every transition the queue engine writes adds a ReservationEvent in the same
+transaction, carrying the seconds spent in the status being left. Queue
+waits and table turns are therefore single rows (waiting -> seated,
+seated -> completed) rather than something rederived by scanning
+reservations, and consumers can follow the stream by event id.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from models import db, ReservationEvent
+
+DELETED = 'deleted'
+
+events = ReservationEvent.__table__
+
+
+def _stage_started(reservation, status) -> Optional[datetime]:
+    """When the reservation entered status: its latest event, else the matching column"""
+    entered = db.session.execute(
+        select(func.max(events.c.occurred_at)).where(events.c.reservation_id == reservation.id)
+    ).scalar()
+    if entered is not None:
+        return entered
+    return reservation.seated_at if status == 'seated' else reservation.created_at
+
+
+def record(reservation, from_status, to_status=None, now=None) -> ReservationEvent:
+    """Add the event for a move from from_status to the session, stamping the stage columns.
+
+    The reservation must have an id, so flush a new one first. The caller commits.
+    """
+    now = now or datetime.utcnow()
+    to_status = to_status or reservation.status
+    stage_seconds = None
+    if from_status is not None:
+        started = _stage_started(reservation, from_status)
+        stage_seconds = (now - started).total_seconds() if started else None
+
+    if to_status == 'seated' and not reservation.seated_at:
+        reservation.seated_at = now
+    elif to_status == 'no-show' and not reservation.no_show_at:
+        reservation.no_show_at = now
+
+    event = ReservationEvent(
+        reservation_id=reservation.id,
+        venue=reservation.venue,
+        service_type=reservation.service_type,
+        party_size=reservation.party_size,
+        from_status=from_status,
+        to_status=to_status,
+        occurred_at=now,
+        stage_seconds=stage_seconds
+    )
+    db.session.add(event)
+    return event
+
+
+def events_after(venue, after_id=0, limit=1000) -> List[Dict]:
+    """A venue's events with ids above after_id, oldest first"""
+    rows = db.session.execute(
+        select(events)
+        .where(events.c.venue == venue, events.c.id > after_id)
+        .order_by(events.c.id)
+        .limit(limit)
+    ).mappings().all()
+    return [dict(row) for row in rows]
@@ -0,0 +1,141 @@
+"""Short-lived cache of rendered responses for hot polling endpoints.
+
+Every open queue page polls the same few endpoints, so within a second
+hundreds of clients ask for an identical payload. A rendered 200 response
+is kept for RESPONSE_CACHE_TTL seconds under a key (endpoint and venue) and
+the version it was rendered at. Queue endpoints pass the shard's change
+log version, so any queue mutation invalidates their entries at once;
+the TTL bounds how long time-dependent fields may lag.
+
+On a miss only one request renders (single flight); concurrent requests
+for the same key and version wait for it and share its result. Once an
+entry's TTL runs out, the next request re-renders it while the others are
+served the expired copy, counted as stale, rather than queueing up
+behind it. Entries are bounded by RESPONSE_CACHE_MAX_ENTRIES, least
+recently used first out. The cache is per process.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional
+
+from flask import current_app, make_response
+
+
+class _Entry(NamedTuple):
+    version: int
+    stored_at: float  # time.monotonic()
+    body: bytes
+    status: int
+    headers: list
+
+
+class _Flight:
+    """One in-progress render that other requests can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry: Optional[_Entry] = None
+
+
+class ResponseCache:
+    """Rendered responses by (key, version), with single-flight renders and hit/miss/stale counts"""
+
+    def __init__(self, ttl=None, max_entries=None, wait_seconds=None):
+        self.ttl = float(ttl if ttl is not None else os.getenv('RESPONSE_CACHE_TTL', 1.0))
+        self.max_entries = int(max_entries or os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+        # How long a request waits for another one's render before doing its own
+        self.wait_seconds = float(wait_seconds or os.getenv('RESPONSE_CACHE_WAIT_SECONDS', 5))
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._flights: Dict[tuple, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('hits', 'misses', 'stale', 'coalesced', 'evictions', 'invalidations',
+                                     'uncacheable'), 0)
+
+    @staticmethod
+    def _thaw(entry: _Entry):
+        return current_app.response_class(entry.body, status=entry.status, headers=entry.headers)
+
+    def respond(self, key: Hashable, version: int, render: Callable):
+        """The cached response for key at version, rendering it at most once at a time.
+
+        render() returns anything a Flask view may return. Only 200
+        responses are kept.
+        """
+        if self.ttl <= 0:
+            return make_response(render())
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                # The queue changed since this was rendered
+                del self._entries[key]
+                self._stats['invalidations'] += 1
+                entry = None
+            if entry is not None and now - entry.stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._thaw(entry)
+
+            flight = self._flights.get((key, version))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(key, version)] = _Flight()
+                self._stats['misses'] += 1
+            elif entry is not None:
+                self._stats['stale'] += 1
+                return self._thaw(entry)
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            if flight.done.wait(self.wait_seconds) and flight.entry is not None:
+                return self._thaw(flight.entry)
+            return make_response(render())  # the render failed or is taking too long
+
+        try:
+            response = make_response(render())
+            if response.status_code == 200 and not response.is_streamed:
+                flight.entry = _Entry(version, time.monotonic(), response.get_data(), 200,
+                                      list(response.headers.items()))
+                self._store(key, flight.entry)
+            else:
+                with self._lock:
+                    self._stats['uncacheable'] += 1
+            return response
+        finally:
+            with self._lock:
+                self._flights.pop((key, version), None)
+            flight.done.set()
+
+    def _store(self, key, entry: _Entry):
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.version > entry.version:
+                return  # a render of a newer version finished first
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop every entry, or those whose key matches predicate; returns how many"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate is None or predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self._stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses'] + stats['stale'] + stats['coalesced']
+        stats['hitRate'] = round((lookups - stats['misses']) / lookups, 3) if lookups else 0.0
+        stats['ttlSeconds'] = self.ttl
+        stats['maxEntries'] = self.max_entries
+        return stats
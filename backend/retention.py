@@ -0,0 +1,105 @@
+"""Bounded-memory in-process state.
+
+A worker runs for weeks, so anything it keeps per day or per check-in must
+have a fixed footprint. RollingStats keeps check-in counts and waits in an
+hourly ring buffer that overwrites its oldest hour instead of growing.
+The helpers below report resident memory so the plateau can be checked.
+"""
+import os
+import resource
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from features import SERVICE_TYPES
+
+HOURS_PER_DAY = 24
+
+
+def resident_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_resident_bytes()
+
+
+def peak_resident_bytes() -> int:
+    """Highest resident set size so far; ru_maxrss is in bytes on macOS and KiB elsewhere"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RollingStats:
+    """Check-in counts and predicted waits per hour, for the last `days` days.
+
+    Slot h % (days * 24) holds hour h (hours since the epoch, local time as
+    the analytics always were); a slot still holding an older hour is
+    cleared when a new hour lands in it, so memory never grows.
+    """
+
+    def __init__(self, days=None):
+        self.days = int(days or os.getenv('ANALYTICS_RETENTION_DAYS', 7))
+        slots = self.days * HOURS_PER_DAY
+        self._hours = np.full(slots, -1, dtype=np.int64)
+        self._counts = np.zeros((slots, len(SERVICE_TYPES.categories) + 1), dtype=np.int64)
+        self._wait_sums = np.zeros(slots, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hour(when: datetime) -> int:
+        return (when.toordinal() - 1) * HOURS_PER_DAY + when.hour
+
+    def record(self, service_type, wait_minutes, when=None):
+        hour = self._hour(when or datetime.now())
+        slot = hour % len(self._hours)
+        with self._lock:
+            if self._hours[slot] != hour:
+                if self._hours[slot] > hour:
+                    return  # older than the retained window
+                self._hours[slot] = hour
+                self._counts[slot] = 0
+                self._wait_sums[slot] = 0.0
+            self._counts[slot, SERVICE_TYPES.encode(service_type)] += 1
+            self._wait_sums[slot] += wait_minutes
+
+    def _day_slots(self, day: date):
+        """Slot indices and hours of one day that are still retained"""
+        first = (day.toordinal() - 1) * HOURS_PER_DAY
+        hours = np.arange(first, first + HOURS_PER_DAY)
+        slots = hours % len(self._hours)
+        return slots, self._hours[slots] == hours
+
+    def daily(self, today=None) -> List[Dict]:
+        """Per-day totals for the retained days, oldest first"""
+        today = today or datetime.now().date()
+        days = []
+        with self._lock:
+            for offset in range(self.days - 1, -1, -1):
+                day = today - timedelta(days=offset)
+                slots, present = self._day_slots(day)
+                counts = self._counts[slots[present]].sum(axis=0)
+                total = int(counts.sum())
+                days.append({
+                    'date': day.strftime('%Y-%m-%d'),
+                    'total_customers': total,
+                    'average_wait_time': float(self._wait_sums[slots[present]].sum() / total) if total else 0,
+                    'service_type_distribution': {
+                        name: int(count) for name, count in zip(SERVICE_TYPES.categories, counts) if count
+                    }
+                })
+        return days
+
+    def hourly(self, day=None) -> List[int]:
+        """Check-ins in each hour of a day; zero for hours outside the window"""
+        slots, present = self._day_slots(day or datetime.now().date())
+        with self._lock:
+            return np.where(present, self._counts[slots].sum(axis=1), 0).tolist()
+
+    @property
+    def nbytes(self) -> int:
+        return self._hours.nbytes + self._counts.nbytes + self._wait_sums.nbytes
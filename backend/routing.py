@@ -0,0 +1,84 @@
+"""Projected waits per location, for routing a new party to the fastest one.
+
+Every location of a service type is its own line. It is drained by a share
+of the service's servers, split by the location's bookable seats, or evenly
+between locations without any. LocationLoad keeps the minutes between
+departures for each line as a running average, updated when a waiting
+party leaves it. The waiting and seated counts come from the queue shard's
+(status, service, location) counters, which are maintained on every write.
+Projecting all of a service's locations is therefore O(locations) and
+never scans the queue.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from eta_engine import PACE_SMOOTHING
+
+# Locations without a seat count take parties of any size
+INFINITE_SEATS = float('inf')
+
+
+def location_servers(service_config, capacity) -> Dict[Tuple[str, str], float]:
+    """Servers per (service type, location), split by seats where a location has them"""
+    servers = {}
+    for service_type, config in service_config.items():
+        locations = config.get('locations', [])
+        seats = [capacity.get(location, 0) for location in locations]
+        total = sum(seats)
+        for location, location_seats in zip(locations, seats):
+            share = location_seats / total if total and all(seats) else 1 / len(locations)
+            servers[(service_type, location)] = config.get('servers', 1) * share
+    return servers
+
+
+class LocationLoad:
+    """Running departure pace of every (service type, location) line"""
+
+    def __init__(self, service_config, capacity):
+        self.service_config = service_config
+        self.capacity = capacity
+        self.servers = location_servers(service_config, capacity)
+        # Minutes between departures with every server busy, until measured
+        self.pace = {
+            (service_type, location): service_config[service_type].get('average_service_time', 15) / servers
+            for (service_type, location), servers in self.servers.items()
+        }
+        self._last_departure_us: Dict[Tuple[str, str], Optional[int]] = {}
+
+    def departed(self, service_type, location, now_us, still_waiting):
+        """A waiting party left a line; update its pace from the gap since the previous one.
+
+        Like EtaTracker.departed, gaps only count while the line stays
+        non-empty, and idle stretches are capped, so slow arrivals do not
+        look like slow service.
+        """
+        key = (service_type, location)
+        if key not in self.pace:
+            return
+        last = self._last_departure_us.get(key)
+        if last is not None:
+            pace = self.pace[key]
+            gap = min((now_us - last) / 60e6, 4 * pace)
+            self.pace[key] = (1 - PACE_SMOOTHING) * pace + PACE_SMOOTHING * max(gap, 0.1)
+        self._last_departure_us[key] = now_us if still_waiting else None
+
+    def projected_wait(self, service_type, location, waiting, seated) -> float:
+        """Minutes until a party joining now is seated or served.
+
+        Free servers take the first parties at once; everyone else waits for
+        one departure per party ahead of them.
+        """
+        key = (service_type, location)
+        free = max(0.0, self.servers[key] - seated)
+        return max(0.0, waiting + 1 - free) * self.pace[key]
+
+    def eligible(self, service_type, party_size=1) -> List[str]:
+        """Locations of a service type with enough seats for the party"""
+        return [
+            location for location in self.service_config.get(service_type, {}).get('locations', [])
+            if self.capacity.get(location, INFINITE_SEATS) >= party_size
+        ]
+
+
+def fastest(waits: List[Dict]) -> Optional[Dict]:
+    """The location with the shortest projected wait; the first configured one on ties"""
+    return min(waits, key=lambda wait: wait['projectedWait']) if waits else None
@@ -0,0 +1,294 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict, deque
+from heapq import heappush, heapreplace, merge, nlargest
+from typing import Dict, List, Optional
+
+from queue_entries import QueueEntry, STATUSES
+
+_WORD = re.compile(r'[^\W_]+')
+_LETTERS = re.compile(r'[^\W\d_]+')
+_NON_DIGIT = re.compile(r'\D')
+_PHONE_QUERY = re.compile(r'^[\d\s()+.-]+$')
+
+# Statuses that stay searchable without expiring
+LIVE_STATUSES = frozenset(STATUSES.code(status) for status in ('waiting', 'seated', 'booked'))
+
+# Trigram postings longer than this are walked instead of intersected
+INTERSECT_LIMIT = 2000
+
+# Match quality per query term
+EXACT, PREFIX, SUBSTRING = 3, 2, 1
+
+
+def _fields(entry: QueueEntry):
+    """(name, phone digits, email) as searched: lower case, phone reduced to its digits"""
+    return (
+        (entry.name or '').lower(),
+        _NON_DIGIT.sub('', entry.phone or ''),
+        (entry.email or '').lower()
+    )
+
+
+def _tokens(fields):
+    """Words the prefix index holds for a reservation: name words and the email's local part.
+
+    Phone numbers and whole email addresses are unique per guest, so they are
+    left to the trigram index rather than bloating the vocabulary.
+    """
+    name, _, email = fields
+    tokens = set(_WORD.findall(name))
+    if email:
+        tokens.update(_LETTERS.findall(email.partition('@')[0]))
+    return tokens
+
+
+def _finished_us(entry: QueueEntry) -> int:
+    return entry.completed_us or entry.updated_us or entry.created_us
+
+
+def _trigrams(fields):
+    grams = set()
+    for text in fields:
+        grams.update(text[i:i + 3] for i in range(len(text) - 2))
+    return grams
+
+
+def query_terms(query: str) -> List[str]:
+    """Split a typed query into lower-case terms; phone-like input becomes one digit string"""
+    query = query.strip().lower()
+    if _PHONE_QUERY.match(query) and any(c.isdigit() for c in query):
+        return [_NON_DIGIT.sub('', query)]
+    return [term for term in query.split() if term]
+
+
+class SearchIndex:
+    """Typeahead lookup of reservations by name, phone digits or email.
+
+    Two indexes sit over the same documents. Each word of a name or email
+    has a posting list of ids in ascending order, and the distinct words are
+    kept sorted, so a prefix query is one bisect into the vocabulary. Trigram
+    posting lists find substrings such as the last digits of a phone number
+    by verifying the candidates of the query's rarest trigram; they are
+    append-only and compacted once stale ids outnumber live ones.
+
+    A query walks the candidates of its most selective term best match
+    first and newest first, checks the other terms against each candidate's
+    fields, and stops as soon as the results cannot be beaten, so its cost
+    follows the number of results asked for rather than the number of
+    matches.
+    Finished reservations stay searchable for a retention window and are
+    expired from the oldest first.
+    """
+
+    def __init__(self, retention_us: int = 0):
+        self.retention_us = retention_us
+        self._docs: Dict[int, QueueEntry] = {}
+        self._fields: Dict[int, tuple] = {}
+        self._words: List[str] = []  # sorted vocabulary
+        self._word_ids: Dict[str, List[int]] = {}  # word -> ascending ids
+        self._postings: Dict[str, List[int]] = defaultdict(list)  # trigram -> ids, may hold stale ids
+        self._stale = 0
+        self._finished = deque()  # (finished_us, id) in the order entries finished
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, entry_id):
+        return entry_id in self._docs
+
+    def load(self, entries):
+        """Index many reservations at once"""
+        with self._lock:
+            for entry in sorted(entries, key=lambda entry: entry.id):
+                self._index(entry)
+
+    def add(self, entry: QueueEntry):
+        """Index a new reservation or re-index a changed one"""
+        with self._lock:
+            self._index(entry)
+
+    def remove(self, entry_id) -> Optional[QueueEntry]:
+        with self._lock:
+            return self._unindex(entry_id)
+
+    def _index(self, entry: QueueEntry):
+        fields = _fields(entry)
+        old_fields = self._fields.get(entry.id)
+        if old_fields != fields:
+            old_tokens = _tokens(old_fields) if old_fields else set()
+            old_grams = _trigrams(old_fields) if old_fields else set()
+            new_tokens = _tokens(fields)
+            for token in old_tokens - new_tokens:
+                self._drop_word(token, entry.id)
+            for token in new_tokens - old_tokens:
+                self._add_word(token, entry.id)
+            for gram in _trigrams(fields) - old_grams:
+                self._postings[gram].append(entry.id)
+            self._fields[entry.id] = fields
+
+        self._docs[entry.id] = entry
+        if entry.status_code not in LIVE_STATUSES:
+            self._finished.append((_finished_us(entry), entry.id))
+
+    def _add_word(self, word, entry_id):
+        ids = self._word_ids.get(word)
+        if ids is None:
+            self._word_ids[word] = [entry_id]
+            insort(self._words, word)
+        elif entry_id > ids[-1]:
+            ids.append(entry_id)
+        else:
+            insort(ids, entry_id)
+
+    def _drop_word(self, word, entry_id):
+        ids = self._word_ids[word]
+        index = bisect_left(ids, entry_id)
+        if index < len(ids) and ids[index] == entry_id:
+            del ids[index]
+        if not ids:
+            del self._word_ids[word]
+            del self._words[bisect_left(self._words, word)]
+
+    def _unindex(self, entry_id) -> Optional[QueueEntry]:
+        entry = self._docs.pop(entry_id, None)
+        if entry is None:
+            return None
+        fields = self._fields.pop(entry_id)
+        for token in _tokens(fields):
+            self._drop_word(token, entry_id)
+        self._stale += 1
+        if self._stale > len(self._docs):
+            self._compact()
+        return entry
+
+    def _compact(self):
+        """Rebuild the trigram postings without ids that are no longer indexed"""
+        postings = defaultdict(list)
+        for entry_id in sorted(self._fields):
+            for gram in _trigrams(self._fields[entry_id]):
+                postings[gram].append(entry_id)
+        self._postings = postings
+        self._stale = 0
+
+    def expire(self, now_us: int) -> int:
+        """Drop finished reservations older than the retention window"""
+        cutoff = now_us - self.retention_us
+        expired = 0
+        with self._lock:
+            while self._finished and self._finished[0][0] < cutoff:
+                _, entry_id = self._finished.popleft()
+                entry = self._docs.get(entry_id)
+                # Skip entries that went live again or finished later than this record says
+                if entry is not None and entry.status_code not in LIVE_STATUSES and _finished_us(entry) < cutoff:
+                    self._unindex(entry_id)
+                    expired += 1
+        return expired
+
+    def _prefixed(self, term) -> List[str]:
+        """Vocabulary words that start with term, other than term itself"""
+        words = []
+        index = bisect_left(self._words, term)
+        while index < len(self._words) and self._words[index].startswith(term):
+            if self._words[index] != term:
+                words.append(self._words[index])
+            index += 1
+        return words
+
+    def _rarest_trigram(self, term) -> List[int]:
+        if len(term) < 3:
+            return []
+        return min((self._postings.get(term[i:i + 3], ()) for i in range(len(term) - 2)), key=len)
+
+    def _substring_ids(self, term):
+        """Ids whose fields may contain term, newest first.
+
+        Short postings are narrowed by intersecting the two rarest trigrams;
+        long ones are walked lazily since their matches are common and the
+        search stops after the first few.
+        """
+        postings = sorted((self._postings.get(term[i:i + 3], ()) for i in range(len(term) - 2)), key=len)
+        if len(postings) == 1 or len(postings[0]) > INTERSECT_LIMIT:
+            return reversed(postings[0])
+        return sorted(set(postings[0]).intersection(postings[1]), reverse=True)
+
+    def _best_quality(self, term) -> int:
+        """Highest quality any reservation could reach for a term"""
+        if term in self._word_ids:
+            return EXACT
+        index = bisect_left(self._words, term)
+        return PREFIX if index < len(self._words) and self._words[index].startswith(term) else SUBSTRING
+
+    def _selectivity(self, term) -> int:
+        """Rough number of candidates a term would produce"""
+        exact = len(self._word_ids.get(term, ()))
+        return exact + len(self._rarest_trigram(term)) if len(term) >= 3 else exact + len(self._prefixed(term)) * 8
+
+    def _candidates(self, term):
+        """(quality, id) for a term: exact words, then prefixes, then substrings; newest first within each"""
+        yield from ((EXACT, entry_id) for entry_id in reversed(self._word_ids.get(term, ())))
+        prefixed = [reversed(self._word_ids[word]) for word in self._prefixed(term)]
+        yield from ((PREFIX, entry_id) for entry_id in merge(*prefixed, reverse=True))
+        if len(term) < 3:
+            return
+        for entry_id in self._substring_ids(term):
+            fields = self._fields.get(entry_id)
+            if fields is not None and any(term in text for text in fields):
+                yield SUBSTRING, entry_id
+
+    def _quality(self, term, entry_id, fields) -> int:
+        """How well one term matches a reservation (0 if not at all)"""
+        ids = self._word_ids.get(term)
+        if ids:
+            index = bisect_left(ids, entry_id)
+            if index < len(ids) and ids[index] == entry_id:
+                return EXACT
+        # Most candidates fail here, before any word is split out
+        if not any(term in text for text in fields):
+            return 0
+        return PREFIX if any(word.startswith(term) for word in _tokens(fields)) else SUBSTRING
+
+    def search(self, query: str, limit: int = 10) -> List[tuple]:
+        """Best (score, entry) matches for every term of the query, best first.
+
+        A term scores 3 for a whole word, 2 for a word prefix and 1 for a
+        substring; ties go to the newest reservations.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            terms.sort(key=self._selectivity)
+            driver, others = terms[0], terms[1:]
+            best_others = sum(self._best_quality(term) for term in others)
+            found = []  # min-heap of (score, id), worst result on top
+            seen = set()
+            exact_ids = [self._word_ids.get(term) for term in terms]
+            if len(terms) > 1 and all(exact_ids):
+                # Every term a whole word: intersect the posting lists in one go
+                smallest, *rest = sorted(exact_ids, key=len)
+                for entry_id in nlargest(limit, set(smallest).intersection(*rest)):
+                    heappush(found, (EXACT * len(terms), entry_id))
+                    seen.add(entry_id)
+            for quality, entry_id in self._candidates(driver):
+                # Later candidates score at most quality + best_others and lose ties on age
+                if len(found) == limit and found[0][0] >= quality + best_others:
+                    break
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                score = quality
+                fields = self._fields[entry_id]
+                for term in others:
+                    term_quality = self._quality(term, entry_id, fields)
+                    if not term_quality:
+                        break
+                    score += term_quality
+                else:
+                    if len(found) < limit:
+                        heappush(found, (score, entry_id))
+                    elif (score, entry_id) > found[0]:
+                        heapreplace(found, (score, entry_id))
+            return [(score, self._docs[entry_id]) for score, entry_id in sorted(found, reverse=True)]
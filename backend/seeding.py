@@ -0,0 +1,260 @@
+"""Synthetic reservation history for scale testing.
+
+Generates months of finished reservations that look like a real venue:
+busier weekends and a gentle yearly swing, lunch and dinner peaks, the
+service-type mix and party sizes the services allow, and the status
+lifecycle waiting -> seated -> completed (or served, no-show, cancelled)
+with waits that grow with the queue. The same seed always produces the
+same rows.
+
+Rows are bulk loaded with batched Core inserts, or COPY on PostgreSQL.
+Run with ``python manage.py seed``.
+"""
+import csv
+import io
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import Reservation, QueueCounter
+from services import services
+
+SERVICE_MIX = {'dine-in': 0.6, 'takeout': 0.25, 'delivery': 0.15}
+DINE_IN_LOCATIONS = {'Main Dining': 0.65, 'Outdoor': 0.25, 'Private Room': 0.1}
+DINE_IN_PARTY_SIZES = np.array([0.08, 0.35, 0.15, 0.22, 0.08, 0.07, 0.03, 0.02])  # sizes 1-8
+
+# Share of the day's arrivals per hour; lunch and dinner peaks, closed overnight
+HOURLY_PROFILE = {
+    'dine-in': [0] * 9 + [1, 2, 4, 9, 8, 4, 2, 2, 5, 10, 11, 8, 5, 3] + [0],
+    'takeout': [0] * 9 + [2, 4, 7, 12, 10, 5, 3, 3, 6, 9, 8, 5, 3, 1] + [0],
+    'delivery': [0] * 9 + [1, 2, 4, 7, 6, 3, 2, 3, 7, 11, 12, 10, 6, 3] + [0],
+}
+WEEKDAY_FACTORS = np.array([0.8, 0.85, 0.9, 1.0, 1.3, 1.45, 1.1])  # Monday first
+
+# Lifecycle outcomes for each arrival
+NO_SHOW_RATE = 0.06
+CANCEL_RATE = 0.04
+
+FIRST_NAMES = ('James', 'Maria', 'Wei', 'Aisha', 'Lucas', 'Sofia', 'Omar', 'Yuki', 'Elena', 'Kwame',
+               'Noah', 'Priya', 'Mateo', 'Fatima', 'Liam', 'Chloe', 'Ivan', 'Amara', 'Hugo', 'Leila',
+               'Daniel', 'Anna', 'Carlos', 'Mei', 'Ahmed', 'Laura', 'Kenji', 'Zara', 'Samuel', 'Nina')
+LAST_NAMES = ('Smith', 'Garcia', 'Chen', 'Okafor', 'Silva', 'Rossi', 'Haddad', 'Tanaka', 'Petrova',
+              'Mensah', 'Brown', 'Patel', 'Lopez', 'Khan', 'Murphy', 'Dubois', 'Novak', 'Adeyemi',
+              'Schmidt', 'Nakamura', 'Johansson', 'Kowalski', 'Moreau', 'Ivanova', 'Santos')
+# Syllables for a long tail of rarer surnames
+SYLLABLES = ('ka', 'ri', 'mo', 'len', 'sa', 'to', 'vi', 'ber', 'na', 'dre', 'lo', 'gu', 'fen', 'ha', 'zu')
+EMAIL_DOMAINS = ('gmail.com', 'yahoo.com', 'outlook.com', 'example.com')
+
+COLUMNS = (
+    'venue', 'ticket_number', 'initial_position', 'name', 'phone', 'email', 'party_size',
+    'service_type', 'location', 'status', 'notes', 'created_at', 'updated_at', 'completed_at',
+    'seated_at', 'no_show_at'
+)
+
+
+def _names(rng, count):
+    first = rng.choice(FIRST_NAMES, count)
+    common = rng.choice(LAST_NAMES, count)
+    syllables = rng.choice(SYLLABLES, (count, 3))
+    rare = np.char.capitalize(np.char.add(np.char.add(syllables[:, 0], syllables[:, 1]), syllables[:, 2]))
+    last = np.where(rng.random(count) < 0.5, common, rare)
+    return first, last
+
+
+def staffing(daily_mean) -> Dict[str, int]:
+    """Servers per service type that just keep up with an average weekday's peak hour.
+
+    Scaled from services.py so that busier synthetic venues get proportionally
+    more tables; Friday and Saturday peaks then build a realistic queue.
+    """
+    staff = {}
+    for service_type, share in SERVICE_MIX.items():
+        profile = HOURLY_PROFILE[service_type]
+        peak_per_minute = daily_mean * share * max(profile) / sum(profile) / 60
+        needed = int(np.ceil(peak_per_minute * services[service_type]['average_service_time']))
+        staff[service_type] = max(services[service_type]['servers'], needed)
+    return staff
+
+
+def _day_rows(rng, venue, day: date, daily_mean, first_ticket) -> List[Dict]:
+    """One day's arrivals, in creation order, as reservation column dicts"""
+    season = 1 + 0.1 * np.sin(2 * np.pi * day.timetuple().tm_yday / 365)
+    count = rng.poisson(daily_mean * WEEKDAY_FACTORS[day.weekday()] * season)
+    if not count:
+        return []
+    midnight = datetime.combine(day, datetime.min.time())
+
+    service_names = list(SERVICE_MIX)
+    service_index = rng.choice(len(service_names), count, p=list(SERVICE_MIX.values()))
+    minutes = np.empty(count)
+    for index, service_type in enumerate(service_names):
+        chosen = service_index == index
+        profile = np.array(HOURLY_PROFILE[service_type], dtype=float)
+        hours = rng.choice(24, chosen.sum(), p=profile / profile.sum())
+        minutes[chosen] = hours * 60 + rng.random(chosen.sum()) * 60
+    order = np.argsort(minutes, kind='stable')
+    minutes, service_index = minutes[order], service_index[order]
+
+    location_names = list(DINE_IN_LOCATIONS)
+    dine_in = service_index == service_names.index('dine-in')
+    service_minutes = np.array([services[name]['average_service_time'] for name in service_names])
+    staff = staffing(daily_mean)
+    servers = np.array([staff[name] for name in service_names])
+    party_sizes = np.where(dine_in, rng.choice(len(DINE_IN_PARTY_SIZES), count, p=DINE_IN_PARTY_SIZES) + 1, 1)
+    # Bigger tables take longer to free up
+    dining = service_minutes[service_index] * rng.normal(1.0, 0.25, count).clip(0.4, 2.0)
+    dining = np.where(dine_in, dining * (0.8 + 0.05 * party_sizes), dining)
+
+    # Each service's queue drains through its servers: a party waits for the
+    # work already queued ahead of it, shared across the servers
+    waits = np.zeros(count)
+    ahead = np.zeros(count, dtype=np.int64)
+    for index in range(len(service_names)):
+        chosen = np.flatnonzero(service_index == index)
+        backlog, last_arrival = 0.0, 0.0
+        work = (dining[chosen] / servers[index]).tolist()
+        chosen_waits = []
+        for arrival, party_work in zip(minutes[chosen].tolist(), work):
+            backlog = max(0.0, backlog - (arrival - last_arrival))
+            chosen_waits.append(backlog)
+            backlog += party_work
+            last_arrival = arrival
+        waits[chosen] = chosen_waits
+        ahead[chosen] = np.rint(waits[chosen] * servers[index] / service_minutes[index])
+    waits += rng.gamma(2.0, 2.0, count)
+    locations = np.where(
+        dine_in,
+        np.array(location_names)[rng.choice(len(location_names), count, p=list(DINE_IN_LOCATIONS.values()))],
+        np.array([services[name]['locations'][0] for name in service_names])[service_index]
+    )
+
+    outcome = rng.random(count)
+    cancelled = outcome < CANCEL_RATE
+    no_show = ~cancelled & (outcome < CANCEL_RATE + NO_SHOW_RATE)
+    statuses = np.where(dine_in, 'completed', 'served')
+    statuses = np.where(no_show, 'no-show', np.where(cancelled, 'cancelled', statuses))
+    finished_after = np.where(cancelled, waits * rng.random(count), waits)
+    # Dine-in parties complete after their meal; takeout and delivery are served when ready
+    finished_after = np.where(dine_in & ~cancelled & ~no_show, waits + dining, finished_after)
+
+    to_us = np.timedelta64(1, 'us')
+    created = np.datetime64(midnight, 'us') + (minutes * 60e6).astype(np.int64) * to_us
+    finished = created + (finished_after * 60e6).astype(np.int64) * to_us
+    left_queue = created + (waits * 60e6).astype(np.int64) * to_us
+    seated = np.where(dine_in & ~cancelled & ~no_show, left_queue, np.datetime64('NaT'))
+    missed = np.where(no_show, left_queue, np.datetime64('NaT'))
+
+    first, last = _names(rng, count)
+    names = [f'{f} {l}' for f, l in zip(first.tolist(), last.tolist())]
+    phones = [f'555-{number:07d}' for number in rng.integers(0, 10 ** 7, count).tolist()]
+    emails = [
+        f'{f.lower()}.{l.lower()}@{domain}' if has_email else None
+        for f, l, domain, has_email in zip(
+            first.tolist(), last.tolist(), rng.choice(EMAIL_DOMAINS, count).tolist(),
+            (rng.random(count) < 0.7).tolist()
+        )
+    ]
+
+    return [
+        {
+            'venue': venue,
+            'ticket_number': ticket,
+            'initial_position': position,
+            'name': name,
+            'phone': phone,
+            'email': email,
+            'party_size': party_size,
+            'service_type': service_names[service],
+            'location': location,
+            'status': status,
+            'notes': None,
+            'created_at': created_at,
+            'updated_at': finished_at,
+            'completed_at': finished_at,
+            'seated_at': seated_at,
+            'no_show_at': missed_at
+        }
+        for (ticket, position, name, phone, email, party_size, service, location, status, created_at, finished_at,
+             seated_at, missed_at)
+        in zip(
+            range(first_ticket, first_ticket + count), (ahead + 1).tolist(), names, phones, emails,
+            party_sizes.tolist(), service_index.tolist(), locations.tolist(), statuses.tolist(),
+            created.tolist(), finished.tolist(), seated.tolist(), missed.tolist()
+        )
+    ]
+
+
+def generate(days, daily_mean=400, seed=42, venue='main', end=None, first_ticket=1) -> Iterator[List[Dict]]:
+    """Yield one list of reservation rows per day, oldest day first, ending the day before `end`"""
+    rng = np.random.default_rng(seed)
+    end = end or datetime.utcnow().date()
+    ticket = first_ticket
+    for offset in range(days, 0, -1):
+        rows = _day_rows(rng, venue, end - timedelta(days=offset), daily_mean, ticket)
+        ticket += len(rows)
+        yield rows
+
+
+def batched(days_of_rows, batch_size) -> Iterator[List[Dict]]:
+    """Regroup per-day row lists into insert batches of batch_size rows"""
+    batch = []
+    for rows in days_of_rows:
+        batch.extend(rows)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    if batch:
+        yield batch
+
+
+def _copy(conn, rows):
+    """Stream rows through PostgreSQL COPY; empty unquoted fields load as NULL"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[column] is None else row[column] for column in COLUMNS])
+    buffer.seek(0)
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {Reservation.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def bulk_load(engine, batches, progress=None) -> int:
+    """Insert row batches, one transaction each; returns the number of rows"""
+    table = Reservation.__table__
+    copy = engine.dialect.name == 'postgresql'
+    total = 0
+    for rows in batches:
+        with engine.begin() as conn:
+            if copy:
+                _copy(conn, rows)
+            else:
+                conn.execute(table.insert(), rows)
+        total += len(rows)
+        if progress:
+            progress(total)
+    return total
+
+
+def seed(engine, days, daily_mean=400, seed=42, venue='main', batch_size=20000, progress=None) -> Dict:
+    """Generate and load a venue's history, then resync its ticket counter"""
+    reservations = Reservation.__table__
+    with engine.connect() as conn:
+        last_ticket = conn.execute(
+            select(func.max(reservations.c.ticket_number)).where(reservations.c.venue == venue)
+        ).scalar()
+
+    start = time.perf_counter()
+    days_of_rows = generate(days, daily_mean, seed, venue, first_ticket=(last_ticket or 0) + 1)
+    rows = bulk_load(engine, batched(days_of_rows, batch_size), progress)
+    seconds = time.perf_counter() - start
+
+    # Drop the counter so the next ticket is re-seeded from the highest one issued
+    with engine.begin() as conn:
+        counters = QueueCounter.__table__
+        conn.execute(counters.delete().where(counters.c.queue_key == venue))
+    return {'venue': venue, 'rows': rows, 'seconds': seconds, 'rowsPerSecond': rows / seconds if seconds else 0}
@@ -0,0 +1,31 @@
+# Service types and their configurations
+services = {
+    'dine-in': {
+        'name': 'Dine-in',
+        'max_party_size': 20,
+        'average_service_time': 45,  # minutes
+        'servers': 12,  # parties served at once
+        'locations': ['Main Dining', 'Outdoor', 'Private Room']
+    },
+    'takeout': {
+        'name': 'Takeout',
+        'max_party_size': 1,
+        'average_service_time': 15,
+        'servers': 2,
+        'locations': ['Takeout Counter']
+    },
+    'delivery': {
+        'name': 'Delivery',
+        'max_party_size': 1,
+        'average_service_time': 30,
+        'servers': 3,
+        'locations': ['Delivery Station']
+    }
+}
+
+# Seats per location that advance bookings can reserve
+location_capacity = {
+    'Main Dining': 60,
+    'Outdoor': 30,
+    'Private Room': 20
+}
@@ -4,13 +4,15 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
-from models import QueueManager
+from features import SERVICE_TYPES
 
 class QueueManager:
     def __init__(self, data_file='data/queue_data.json'):
         self.data_file = data_file
         self.reservations = []
         self.service_history = []
+        # Next reservation id; stored with the data so ids are never reused, even after compaction
+        self.next_id = 1
         self.wait_time_model = RandomForestRegressor()
         self.load_data()
 
@@ -20,20 +22,24 @@ class QueueManager:
                 data = json.load(f)
                 self.reservations = data.get('reservations', [])
                 self.service_history = data.get('service_history', [])
+                # Files written before next_id was stored start after their highest id
+                self.next_id = data.get('next_id') or max((r['id'] for r in self.reservations), default=0) + 1
         except FileNotFoundError:
             self.save_data()  # Create initial empty file
 
     def save_data(self):
         data = {
             'reservations': self.reservations,
-            'service_history': self.service_history
+            'service_history': self.service_history,
+            'next_id': self.next_id
         }
         with open(self.data_file, 'w') as f:
             json.dump(data, f, indent=2)
 
     def add_reservation(self, reservation: Dict) -> Dict:
         """Add a new reservation to the queue"""
-        reservation['id'] = len(self.reservations) + 1
+        reservation['id'] = self.next_id
+        self.next_id += 1
         reservation['status'] = 'waiting'
         reservation['created_at'] = datetime.now().isoformat()
         reservation['estimated_wait'] = self.estimate_wait_time(reservation)
@@ -57,17 +63,21 @@ class QueueManager:
             return len([r for r in self.reservations if r['status'] == 'waiting']) * 15
 
         # Prepare features for prediction
-        recent_history = pd.DataFrame(self.service_history[-50:])
+        recent_history = self.service_history[-50:]
         if len(recent_history) > 0:
-            X = recent_history[['party_size', 'service_type_encoded', 'hour_of_day']]
-            y = recent_history['actual_wait_time']
+            # Re-encode service types so entries written with older encodings still agree
+            X = np.array([
+                [h['party_size'], SERVICE_TYPES.encode(h['service_type']), h['hour_of_day']]
+                for h in recent_history
+            ])
+            y = np.array([h['actual_wait_time'] for h in recent_history])
             
             self.wait_time_model.fit(X, y)
             
             # Prepare current reservation features
             current_features = np.array([[
                 reservation['party_size'],
-                hash(reservation['service_type']) % 5,  # Simple encoding
+                SERVICE_TYPES.encode(reservation['service_type']),
                 datetime.now().hour
             ]])
             
@@ -90,7 +100,7 @@ class QueueManager:
                         'reservation_id': res['id'],
                         'party_size': res['party_size'],
                         'service_type': res['service_type'],
-                        'service_type_encoded': hash(res['service_type']) % 5,
+                        'service_type_encoded': SERVICE_TYPES.encode(res['service_type']),
                         'hour_of_day': datetime.now().hour,
                         'actual_wait_time': (datetime.now() - datetime.fromisoformat(res['created_at'])).seconds // 60,
                         'status': status
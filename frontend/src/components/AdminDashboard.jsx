@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Box,
   Grid,
@@ -79,6 +79,9 @@ const AdminDashboard = () => {
   const [status, setStatus] = useState('');
   const [pollingInterval, setPollingInterval] = useState(null);
   const [waitTimeTrends, setWaitTimeTrends] = useState([]);
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState([]);
+  const queueVersion = useRef(null);
   const navigate = useNavigate();
 
   const headers = {
@@ -93,12 +96,12 @@ const AdminDashboard = () => {
       return;
     }
 
-    fetchQueue();
-    fetchAnalytics();
+    // One round trip for every panel; afterwards the queue is polled for deltas
+    fetchDashboard(['queue', 'analytics', 'waitTimes']);
 
     const interval = setInterval(() => {
       fetchQueue();
-      fetchAnalytics();
+      fetchDashboard(['analytics']);
     }, 10000);
 
     setPollingInterval(interval);
@@ -112,11 +115,32 @@ const AdminDashboard = () => {
 
   const fetchQueue = async () => {
     try {
-      const response = await axios.get('http://localhost:5000/api/queue', { headers });
-      if (response.data) {
-        setQueue(response.data);
-        setError('');
+      // Ask only for what changed since the last version we saw
+      const params = queueVersion.current !== null ? { since: queueVersion.current } : {};
+      const response = await axios.get('http://localhost:5000/api/queue', {
+        headers,
+        params,
+        validateStatus: (code) => (code >= 200 && code < 300) || code === 304
+      });
+      if (response.status === 304) {
+        return;
+      }
+      const data = response.data;
+      if (Array.isArray(data)) {
+        setQueue(data);
+      } else if (data.full) {
+        setQueue(data.entries);
+      } else {
+        setQueue((current) => {
+          const changed = new Set([...data.updated, ...data.inserted].map((entry) => entry.id));
+          const removed = new Set(data.removed);
+          return [...data.inserted, ...data.updated, ...current.filter(
+            (entry) => !changed.has(entry.id) && !removed.has(entry.id)
+          )].sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+        });
       }
+      queueVersion.current = response.headers['x-queue-version'];
+      setError('');
     } catch (error) {
       if (error.response?.status === 401) {
         navigate('/admin/login');
@@ -127,43 +151,58 @@ const AdminDashboard = () => {
     }
   };
 
-  const fetchAnalytics = async () => {
-    try {
-      const response = await axios.get('http://localhost:5000/api/analytics', { headers });
-      if (response.data) {
-        setAnalytics(response.data);
-      setError('');
-      }
-    } catch (error) {
-      setError('Failed to fetch analytics data');
-      console.error('Analytics fetch error:', error);
-    } finally {
-      setLoading(false);
+  useEffect(() => {
+    if (!searchQuery.trim()) {
+      setSearchResults([]);
+      return;
     }
-  };
+    // Wait for a pause in typing before looking the guest up
+    const timeout = setTimeout(async () => {
+      try {
+        const response = await axios.get('http://localhost:5000/api/admin/search', {
+          headers,
+          params: { q: searchQuery, limit: 20 }
+        });
+        setSearchResults(response.data.results);
+      } catch (error) {
+        console.error('Search error:', error);
+      }
+    }, 150);
+    return () => clearTimeout(timeout);
+  }, [searchQuery]);
 
-  const fetchWaitTimeTrends = async () => {
+  const fetchDashboard = async (panels) => {
     try {
-      const response = await fetch('http://localhost:5000/api/analytics/wait-times', {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('sessionId')}`
-        }
+      const response = await axios.get('http://localhost:5000/api/admin/dashboard', {
+        headers,
+        params: { panels: panels.join(',') }
       });
-      
-      if (!response.ok) {
-        throw new Error('Failed to fetch wait time trends');
+      const data = response.data;
+      if (data.queue) {
+        setQueue(data.queue);
+        queueVersion.current = data.queueVersion;
+      }
+      if (data.analytics) {
+        setAnalytics(data.analytics);
       }
-      
-      const data = await response.json();
-      setWaitTimeTrends(data);
+      if (data.waitTimes) {
+        setWaitTimeTrends(data.waitTimes);
+      }
+      setError('');
     } catch (error) {
-      console.error('Error fetching wait time trends:', error);
+      if (error.response?.status === 401) {
+        navigate('/admin/login');
+      } else {
+        setError('Failed to fetch dashboard data');
+        console.error('Dashboard fetch error:', error);
+      }
+    } finally {
+      setLoading(false);
     }
   };
 
   useEffect(() => {
-    fetchWaitTimeTrends();
-    const interval = setInterval(fetchWaitTimeTrends, 30000); // Update every 30 seconds
+    const interval = setInterval(() => fetchDashboard(['waitTimes']), 30000); // Update every 30 seconds
     return () => clearInterval(interval);
   }, []);
 
@@ -199,7 +238,7 @@ const AdminDashboard = () => {
       );
       setDialogOpen(false);
       await fetchQueue();
-      await fetchAnalytics();
+      await fetchDashboard(['analytics']);
       setError('');
     } catch (error) {
       setError('Failed to update status');
@@ -285,7 +324,14 @@ const AdminDashboard = () => {
           <Paper sx={{ p: 2 }}>
             <Box display="flex" justifyContent="space-between" alignItems="center" mb={2}>
               <Typography variant="h6">Queue Management</Typography>
-              <Box>
+              <Box display="flex" alignItems="center">
+                <TextField
+                  size="small"
+                  placeholder="Search name, phone or email"
+                  value={searchQuery}
+                  onChange={(e) => setSearchQuery(e.target.value)}
+                  sx={{ mr: 1 }}
+                />
                 <IconButton onClick={fetchQueue} color="primary">
                   <RefreshIcon />
                 </IconButton>
@@ -307,7 +353,7 @@ const AdminDashboard = () => {
                   </TableRow>
                 </TableHead>
                 <TableBody>
-                  {queue.map((reservation) => (
+                  {(searchQuery.trim() ? searchResults : queue).map((reservation) => (
                     <TableRow key={reservation.id}>
                       <TableCell>{reservation.name}</TableCell>
                       <TableCell>{reservation.party_size}</TableCell>
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Box,
   Paper,
@@ -31,6 +31,10 @@ const CheckIn = () => {
   const [error, setError] = useState('');
   const [queueStatus, setQueueStatus] = useState(null);
   const [snackbar, setSnackbar] = useState({ open: false, message: '', severity: 'success' });
+  const [myPosition, setMyPosition] = useState(null);
+  // The socket handlers outlive renders, so they read the ticket and its venue from refs
+  const entryIdRef = useRef(null);
+  const venueRef = useRef(null);
 
   useEffect(() => {
     const socket = io('http://localhost:5000', {
@@ -57,6 +61,36 @@ const CheckIn = () => {
       }
     });
 
+    // Everyone behind a join or departure moves by one place; shifts are sent for every venue
+    socket.on('queue_shift', (data) => {
+      if (data.venue !== venueRef.current) {
+        return;
+      }
+      setMyPosition(prev => (
+        prev && data.delta && prev.position >= data.fromPosition
+          ? { position: prev.position + data.delta, eta: (prev.position + data.delta) * data.minutesPerParty }
+          : prev && { ...prev, eta: prev.position * data.minutesPerParty }
+      ));
+    });
+
+    socket.on('eta_update', (data) => {
+      if (data.entryId === entryIdRef.current) {
+        setMyPosition({ position: data.position, eta: data.estimatedWaitTime });
+      }
+    });
+
+    socket.on('queue_threshold', (data) => {
+      if (data.entryId === entryIdRef.current) {
+        setSnackbar({
+          open: true,
+          message: data.threshold === 'next_in_line'
+            ? `You're number ${data.position} in line - please head to the reception area`
+            : 'Your table will be ready in about 5 minutes',
+          severity: 'info'
+        });
+      }
+    });
+
     fetchData();
     return () => socket.disconnect();
   }, []);
@@ -87,6 +121,9 @@ const CheckIn = () => {
       });
 
       setFormData(prev => ({ ...prev, entryId: response.data.entryId }));
+      entryIdRef.current = response.data.entryId;
+      venueRef.current = response.data.venue;
+      setMyPosition({ position: response.data.queuePosition, eta: response.data.estimatedWaitTime });
       setSnackbar({
         open: true,
         message: `Successfully joined queue. Your position: ${response.data.queuePosition}`,
@@ -145,6 +182,16 @@ const CheckIn = () => {
                     {queueStatus?.estimatedWaitTime ? `${Math.round(queueStatus.estimatedWaitTime)} min` : 'N/A'}
                   </Typography>
                 </Grid>
+                {myPosition && (
+                  <Grid item xs={12}>
+                    <Typography color="textSecondary">
+                      Your Place in Line
+                    </Typography>
+                    <Typography variant="h5">
+                      #{myPosition.position} &middot; about {Math.round(myPosition.eta)} min
+                    </Typography>
+                  </Grid>
+                )}
               </Grid>
             </CardContent>
           </Card>
@@ -36,6 +36,12 @@ import { useNavigate } from 'react-router-dom';
 
 const steps = ['Personal Information', 'Reservation Details', 'Confirmation'];
 
+// Booking times come from the API in UTC; show them in the guest's local time
+const formatSlotTime = (start) =>
+  new Date(start).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+const formatSlotDateTime = (start) =>
+  new Date(start).toLocaleString([], { dateStyle: 'medium', timeStyle: 'short' });
+
 const NewReservation = () => {
   const [activeStep, setActiveStep] = useState(0);
   const [formData, setFormData] = useState({
@@ -52,8 +58,30 @@ const NewReservation = () => {
   const [success, setSuccess] = useState(false);
   const [reservationNumber, setReservationNumber] = useState(null);
   const [showPassword, setShowPassword] = useState(false);
+  const [bookingMode, setBookingMode] = useState('now');
+  const [bookingDate, setBookingDate] = useState('');
+  const [slots, setSlots] = useState([]);
+  const [selectedSlot, setSelectedSlot] = useState('');
   const navigate = useNavigate();
 
+  useEffect(() => {
+    if (bookingMode !== 'later' || !bookingDate || !formData.party_size) {
+      setSlots([]);
+      return;
+    }
+    const params = new URLSearchParams({
+      date: bookingDate,
+      party_size: formData.party_size,
+      service_type: formData.service_type,
+      location: formData.location
+    });
+    fetch(`http://localhost:5000/api/bookings/availability?${params}`)
+      .then(response => response.json())
+      .then(data => setSlots(data.slots || []))
+      .catch(() => setSlots([]));
+    setSelectedSlot('');
+  }, [bookingMode, bookingDate, formData.party_size, formData.service_type, formData.location]);
+
   const validateStep = (step) => {
     const newErrors = {};
     
@@ -68,6 +96,7 @@ const NewReservation = () => {
       if (!formData.party_size) newErrors.party_size = 'Party size is required';
       else if (formData.party_size < 1) newErrors.party_size = 'Party size must be at least 1';
       else if (formData.party_size > 20) newErrors.party_size = 'Maximum party size is 20';
+      if (bookingMode === 'later' && formData.service_type === 'dine-in' && !selectedSlot) newErrors.slot = 'Please choose a time';
     }
 
     setErrors(newErrors);
@@ -107,12 +136,13 @@ const NewReservation = () => {
     setError('');
 
     try {
-      const response = await fetch('http://localhost:5000/api/reservations', {
+      const booking = bookingMode === 'later' && formData.service_type === 'dine-in';
+      const response = await fetch(`http://localhost:5000/api/${booking ? 'bookings' : 'reservations'}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
         },
-        body: JSON.stringify(formData)
+        body: JSON.stringify(booking ? { ...formData, start: selectedSlot } : formData)
       });
 
       const data = await response.json();
@@ -121,6 +151,10 @@ const NewReservation = () => {
         throw new Error(data.error || 'Failed to create reservation');
       }
 
+      if (data.cancelToken) {
+        // Needed to cancel the booking later (DELETE /api/bookings/<id> with X-Booking-Token)
+        localStorage.setItem(`bookingToken:${data.reservation.id}`, data.cancelToken);
+      }
       setReservationNumber(data.reservation.id);
       setSuccess(true);
       setActiveStep(2); // Move to confirmation step
@@ -141,6 +175,9 @@ const NewReservation = () => {
       service_type: 'dine-in',
       location: 'Main Dining'
     });
+    setBookingMode('now');
+    setBookingDate('');
+    setSelectedSlot('');
     setActiveStep(0);
     setSuccess(false);
   };
@@ -273,6 +310,52 @@ const NewReservation = () => {
                 </Select>
               </FormControl>
             </Grid>
+            {formData.service_type === 'dine-in' && (
+              <Grid item xs={12}>
+                <FormControl fullWidth>
+                  <InputLabel>When</InputLabel>
+                  <Select
+                    value={bookingMode}
+                    onChange={(e) => setBookingMode(e.target.value)}
+                    label="When"
+                  >
+                    <MenuItem value="now">Join the queue now</MenuItem>
+                    <MenuItem value="later">Book a time</MenuItem>
+                  </Select>
+                </FormControl>
+              </Grid>
+            )}
+            {bookingMode === 'later' && formData.service_type === 'dine-in' && (
+              <>
+                <Grid item xs={12} sm={6}>
+                  <TextField
+                    fullWidth
+                    label="Date"
+                    type="date"
+                    value={bookingDate}
+                    onChange={(e) => setBookingDate(e.target.value)}
+                    InputLabelProps={{ shrink: true }}
+                  />
+                </Grid>
+                <Grid item xs={12} sm={6}>
+                  <FormControl fullWidth error={!!errors.slot} disabled={!slots.length}>
+                    <InputLabel>Time</InputLabel>
+                    <Select
+                      value={selectedSlot}
+                      onChange={(e) => setSelectedSlot(e.target.value)}
+                      label="Time"
+                    >
+                      {slots.map((slot) => (
+                        <MenuItem key={slot.start} value={slot.start}>
+                          {formatSlotTime(slot.start)} ({slot.seatsFree} seats free)
+                        </MenuItem>
+                      ))}
+                    </Select>
+                    {errors.slot && <Typography variant="caption" color="error">{errors.slot}</Typography>}
+                  </FormControl>
+                </Grid>
+              </>
+            )}
           </Grid>
         );
       case 2:
@@ -301,6 +384,11 @@ const NewReservation = () => {
               <Typography variant="body2">
                 Location: {formData.location}
               </Typography>
+              {bookingMode === 'later' && selectedSlot && (
+                <Typography variant="body2">
+                  Booked for: {formatSlotDateTime(selectedSlot)}
+                </Typography>
+              )}
               <Box sx={{ mt: 3 }}>
                 <Button
                   variant="contained"